@@ -1,14 +1,21 @@
 """ Cnd Runner: Runs OS Commands locally """
 import sys
 import os
-import subprocess
-import shlex
 import logging
 
+from tools.util.async_cmd_runner import AsyncCmdRunner
+
 logger = logging.getLogger(__name__)
 
 class CmdRunner():
     """ Cnd Runner: Runs OS Commands locally """
+    # keys of job results
+    CMD = AsyncCmdRunner.CMD
+    RETURN_CODE = AsyncCmdRunner.RETURN_CODE
+    TIME = AsyncCmdRunner.TIME
+    OUTPUT = AsyncCmdRunner.OUTPUT
+    SKIPPED = AsyncCmdRunner.SKIPPED
+    TIMEOUT = AsyncCmdRunner.TIMEOUT
 
     def __init__(self,cwd:str=None) -> None:
         """ constructor """
@@ -20,35 +27,15 @@ class CmdRunner():
             logger.error(f"{cwd} is not a path, check input")
         self._cwd = os.path.abspath(cwd)
 
-    def run_cmd(self,os_cmd:str):
-        """ runs command line command """        
-        logger.info(f"RUN COMMAND [{os_cmd}]")
+    def run_cmd(self,os_cmd:str,prefix:str=None,timeout:float=None):
+        """ runs command line command, prefix is put in front of each logged output line """
         if not os_cmd:
             logger.warning("No command submitted, return")
             return
-        oscmd_shlex=shlex.split(os_cmd)
-        # special case: output contains keywords (in this case its displaying a logfile)
-        self._output=[]
-        self._return_code=0
-        try:
-            # encoding for german umlauts
-            with subprocess.Popen(oscmd_shlex, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                    errors='ignore',universal_newlines=True,encoding="utf8",cwd=self._cwd) as popen:
-                for line in popen.stdout:
-                    self._output.append(line)
-                    line=line.replace("\n","")
-                    logger.info(line)
-
-            # popen.stdout.close()
-            if popen.stderr:
-                logger.error(f"ERROR OCCURED: {popen.stderr}")
-
-            self._return_code = popen.returncode
-            if self._return_code:
-                raise subprocess.CalledProcessError(self._return_code, os_cmd)
-        except subprocess.CalledProcessError as e:
-            self._return_code=1
-            logger.error(f"EXCEPTION OCCURED {e}, command {os_cmd}")
+        result = AsyncCmdRunner(self._cwd).run_cmd(os_cmd,name=prefix,timeout=timeout)
+        self._output = result[AsyncCmdRunner.OUTPUT]
+        # return code None: process timed out
+        self._return_code = 0 if result[AsyncCmdRunner.RETURN_CODE] == 0 else 1
         return self._return_code
 
     def get_output(self,as_string=True):
@@ -63,6 +50,24 @@ class CmdRunner():
             out = "".join([l.strip() for l in out])
         return out
 
+    def run_jobs(self,cmds,depends_on:dict=None,max_workers:int=None,stop_on_error:bool=True,
+                 timeout:float=None)->dict:
+        """ runs a list or dict (job name:command) of commands concurrently
+            depends_on: dict job name:[job names] the job has to wait for (job graph),
+            for a list the job names are the list indices
+            max_workers: max number of parallel commands (default cpu count)
+            stop_on_error: jobs depending on a failed job are skipped
+            timeout: max time in seconds for each job
+            returns dict job name:job result (cmd,return_code,time,output,skipped,timeout)
+        """
+        if not cmds:
+            logger.warning("No commands submitted, return")
+            return {}
+        runner = AsyncCmdRunner(self._cwd,max_concurrency=max_workers,timeout=timeout)
+        out = runner.run_cmds(cmds,depends_on,stop_on_error)
+        self._return_code = 1 if any([r[CmdRunner.RETURN_CODE] != 0 for r in out.values()]) else 0
+        return out
+
 if __name__ == "__main__":
     loglevel = logging.DEBUG
     logging.basicConfig(format='%(asctime)s %(levelname)s %(module)s:[%(name)s.%(funcName)s(%(lineno)d)]: %(message)s',
@@ -12,6 +12,7 @@ from tools.cmd_client.persistence_helper import PersistenceHelper
 from tools.cmd_client.parse_helper import ParseHelper
 from tools.cmd_client.config_resolver import ConfigResolver
 from tools.cmd_client.action_resolver import ActionResolver
+from tools.cmd_client.config_cache import ConfigCache
 logger = logging.getLogger(__name__)
 class Config():
     """ handles configuration """
@@ -20,18 +21,37 @@ class Config():
                  params_template:str=None,
                  subparser_template:str=None,
                  default_params:list=None,
+                 use_cache:bool=True,
                  **kwargs) -> None:
-        """ constructor """
+        """ constructor, if use_cache is set the resolved configuration and the argparse
+            specification are read from / saved to cache file next to the config file
+        """
         if not os.path.isfile(f_config):
             logger.warning(f"{f_config} is missing as Config File, skip")
             return
         self._f_config = f_config
-        self._config_dict = PersistenceHelper.read_yaml(f_config)
+        config_cache = None
+        cache = None
+        if use_cache:
+            default_param_values = [p.value for p in default_params] if default_params else None
+            parser_key = str([params_template,subparser_template,default_param_values,
+                              sorted(kwargs.items())])
+            config_cache = ConfigCache(f_config,parser_key)
+            cache = config_cache.load()
+        if cache:
+            self._config_dict = cache[ConfigCache.CONFIG]
+            parser_spec = cache[ConfigCache.PARSER_SPEC]
+        else:
+            self._config_dict = PersistenceHelper.read_yaml(f_config)
+            parser_spec = None
 
         self._argparser = ParseHelper(self,params_template,subparser_template,
-                                      default_params,**kwargs)
+                                      default_params,parser_spec,**kwargs)
         self._action_resolver = ActionResolver()
-        self._config_resolver = ConfigResolver(self._config_dict,self._action_resolver)
+        self._config_resolver = ConfigResolver(self._config_dict,self._action_resolver,
+                                               resolved=cache is not None)
+        if config_cache and self._config_dict and not cache:
+            config_cache.save(self._config_dict,self._argparser.parser_spec)
         self._configuration = {}
         self._get_configuration()
 
@@ -0,0 +1,104 @@
+""" Cache for the resolved configuration and argparse specification,
+    saved as pickle file next to the configuration yaml
+"""
+import os
+import logging
+import hashlib
+import pickle
+import tools.cmd_client.constants as C
+
+logger = logging.getLogger(__name__)
+
+class ConfigCache():
+    """ compiled configuration cache, the cache key consists of the hash of the yaml file,
+        the working dir (relative paths are resolved against it), the parser settings and the state of all file system objects referenced in the
+        configuration (existence, modification time for files)
+    """
+    CACHE_SUFFIX = ".cache.pkl"
+    VERSION = 2
+    # config attributes containing file system references
+    REFERENCE_KEYS = [C.PATH_KEY,C.FILE_KEY,C.EXECUTABLE_KEY,C.RESOLVED_PATH,C.RESOLVED_FILE]
+    # cache dict keys
+    KEY = "key"
+    CONFIG = "config"
+    PARSER_SPEC = "parser_spec"
+    REFERENCES = "references"
+
+    def __init__(self,f_config:str,parser_key:str="") -> None:
+        """ constructor, parser key identifies the argparse settings """
+        self._f_config = os.path.abspath(f_config)
+        self._f_cache = self._f_config+ConfigCache.CACHE_SUFFIX
+        self._key = None
+        with open(self._f_config,"rb") as f:
+            config_hash = hashlib.sha256(f.read()).hexdigest()
+        self._key = f"{ConfigCache.VERSION}:{config_hash}:{os.getcwd()}:{parser_key}"
+
+    @property
+    def f_cache(self)->str:
+        """ cache file """
+        return self._f_cache
+
+    @staticmethod
+    def get_os_state(f:str):
+        """ state of a file system reference: (is_dir,is_file,modification time of files) """
+        if os.path.isdir(f):
+            return (True,False,None)
+        if os.path.isfile(f):
+            return (False,True,os.path.getmtime(f))
+        return (False,False,None)
+
+    @staticmethod
+    def get_references(config_dict:dict)->dict:
+        """ collects all file system references from config dict, returns
+            dict with reference and its state
+        """
+        references = {}
+        stack = [config_dict]
+        while stack:
+            d = stack.pop()
+            for k,v in d.items():
+                if isinstance(v,dict):
+                    stack.append(v)
+                elif isinstance(v,str) and k in ConfigCache.REFERENCE_KEYS and not v in references:
+                    references[v] = ConfigCache.get_os_state(v)
+        return references
+
+    def load(self)->dict:
+        """ loads the cache, returns dict with config and parser spec
+            or None if the cache is missing or outdated
+        """
+        if not os.path.isfile(self._f_cache):
+            logger.debug(f"No config cache {self._f_cache}")
+            return None
+        try:
+            with open(self._f_cache,"rb") as f:
+                cache = pickle.load(f)
+        except (OSError,pickle.UnpicklingError,EOFError,AttributeError):
+            logger.warning(f"Couldn't read config cache {self._f_cache}",exc_info=True)
+            return None
+        if not isinstance(cache,dict) or cache.get(ConfigCache.KEY) != self._key:
+            logger.info(f"Config cache {self._f_cache} is outdated (config changed)")
+            return None
+        for reference,os_state in cache[ConfigCache.REFERENCES].items():
+            if ConfigCache.get_os_state(reference) != os_state:
+                logger.info(f"Config cache {self._f_cache} is outdated ([{reference}] changed)")
+                return None
+        logger.info(f"Using config cache {self._f_cache}")
+        return cache
+
+    def save(self,config_dict:dict,parser_spec:dict)->str:
+        """ saves resolved config and parser specification, returns cache file """
+        cache = {ConfigCache.KEY:self._key,
+                 ConfigCache.CONFIG:config_dict,
+                 ConfigCache.PARSER_SPEC:parser_spec,
+                 ConfigCache.REFERENCES:ConfigCache.get_references(config_dict)}
+        f_temp = self._f_cache+".tmp"
+        try:
+            with open(f_temp,"wb") as f:
+                pickle.dump(cache,f,protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f_temp,self._f_cache)
+        except (OSError,pickle.PicklingError):
+            logger.warning(f"Couldn't write config cache {self._f_cache}",exc_info=True)
+            return None
+        logger.info(f"Saved config cache {self._f_cache}")
+        return self._f_cache
@@ -25,9 +25,10 @@ class ConfigResolver():
     REGEX_PARAM=r"\[.+?\]"
     REGEX_PLACEHOLDER=r"\{.+?\}"
 
-    def __init__(self,config_dict:dict,action_resolver:ActionResolver) -> None:
-        """ constructor """
+    def __init__(self,config_dict:dict,action_resolver:ActionResolver,resolved:bool=False) -> None:
+        """ constructor, resolved: config dict was already resolved (eg from config cache) """
         self._config_dict = config_dict
+        self._pattern_templates = {}
         if not config_dict:
             logger.warning("No Configuration was provided")
             return
@@ -35,8 +36,9 @@ class ConfigResolver():
         self._config_types = self.get_config_types()
         self._action_resolver = action_resolver
         # put together all files and paths, resolve
-        self._resolve_references()
-        self._resolve_patterns()
+        if not resolved:
+            self._resolve_references()
+            self._resolve_patterns()
         self._action_resolver.config_dict = self._config_dict
         pass
 
@@ -44,36 +46,9 @@ class ConfigResolver():
     def get_filled_pattern(pattern,**kwargs):
         """ replaces patterns in brackets with same name in kwargs
             if param is None, the expression will be dropped
+            (pattern is compiled once into a PatternTemplate)
         """
-        out = pattern
-        regex = ConfigResolver.REGEX_PLACEHOLDER
-        placeholders = re.findall(regex,pattern)
-        regex = ConfigResolver.REGEX_PARAM
-        # get all placeholders
-        for placeholder in placeholders:
-            # within each placeholder, get the param
-            placeholder_out = placeholder
-            params = re.findall(regex,placeholder)
-            complete = True
-            for param in params:
-                attribute = param[1:-1].strip()
-                value = kwargs.get(attribute)
-                if not value:
-                    logger.info(f"Attribute {attribute} not found in parameters")
-                    complete = False
-                    break
-                logger.debug(f"Replacing {param} using {value}")
-                placeholder_out=placeholder_out.replace(param,value)
-            if complete:
-                out = out.replace(placeholder,placeholder_out[1:-1])
-            else:
-                out = out.replace(placeholder,"")
-
-        # strip double spaces
-        out = out.strip()
-        while '  ' in out:
-            out = out.replace('  ', ' ')
-        return out
+        return PatternTemplate.get_template(pattern).render(**kwargs)
 
     def get_config_types(self)->list:
         """ get validated available config types as validated Enum Keys"""
@@ -644,6 +619,7 @@ class ConfigResolver():
         if not pattern:
             logger.warning(f"No pattern found in cofiguration for pattern [{name}]")
             return
+        template = self._get_pattern_template(name,pattern)
 
         params_dict = {}
         # supply all params given in config as template params
@@ -677,9 +653,7 @@ class ConfigResolver():
             if is_file_type:
                 # wrap in quotes, do not do this in case we already have quotes in the pattern
                 logger.debug(f"Adding quotes for param {param_name} (file type), value [{param_value}]")
-                re_quotes=r"\"\["+param_name
-                has_quotes=re.findall(re_quotes,pattern)
-                if not has_quotes:
+                if not template.has_quotes(param_name):
                     param_value='"'+param_value.strip('\"')+'"'
             # special case: for py_bat pattern replace dashes
             if is_py_bat and param_name == C.PARAMS_KEY:
@@ -688,19 +662,109 @@ class ConfigResolver():
                 param_value = '"'+C.PARAMS_MARKER+param_value+C.PARAMS_MARKER+'"'
             params_dict[param_name]=param_value
 
-        filled_pattern = ConfigResolver.get_filled_pattern(pattern,**params_dict)
+        filled_pattern = template.render(**params_dict)
         # repair quote hack
-        has_double_quotes = True
-        while has_double_quotes:
-            if '""' in filled_pattern:
-                filled_pattern = filled_pattern.replace('""','"')
-            elif "''" in filled_pattern:
-                filled_pattern = filled_pattern.replace("'","'")
-            else:
-                has_double_quotes = False                
-
+        filled_pattern = PatternTemplate.REGEX_DOUBLE_QUOTES.sub('"',filled_pattern)
+        filled_pattern = PatternTemplate.REGEX_SINGLE_QUOTES.sub("'",filled_pattern)
         return filled_pattern
 
+    def _get_pattern_template(self,name:str,pattern:str):
+        """ returns the compiled template for pattern name, compiles it on first use """
+        template = self._pattern_templates.get(name)
+        if template is None or template.pattern != pattern:
+            template = PatternTemplate.get_template(pattern)
+            self._pattern_templates[name] = template
+        return template
+
+class PatternTemplate():
+    """ pattern compiled into a list of segments: plain text or optional groups.
+        An optional group is a placeholder {text [param] text}, it is rendered
+        without the curly brackets if all of its params have a value, otherwise dropped
+    """
+    REGEX_PLACEHOLDER = re.compile(ConfigResolver.REGEX_PLACEHOLDER)
+    REGEX_PARAM = re.compile(ConfigResolver.REGEX_PARAM)
+    REGEX_SPACES = re.compile(" {2,}")
+    REGEX_DOUBLE_QUOTES = re.compile('"{2,}')
+    REGEX_SINGLE_QUOTES = re.compile("'{2,}")
+    # compiled templates by pattern
+    _templates = {}
+
+    def __init__(self,pattern:str) -> None:
+        self._pattern = pattern
+        # segments: either text or a tuple of (text,param attribute or None) parts
+        self._segments = []
+        self._has_quotes = {}
+        pos = 0
+        for placeholder in PatternTemplate.REGEX_PLACEHOLDER.finditer(pattern):
+            if placeholder.start() > pos:
+                self._segments.append(pattern[pos:placeholder.start()])
+            self._segments.append(PatternTemplate._compile_group(placeholder.group()[1:-1]))
+            pos = placeholder.end()
+        if pos < len(pattern):
+            self._segments.append(pattern[pos:])
+
+    @staticmethod
+    def _compile_group(placeholder:str)->tuple:
+        """ splits the placeholder content into text and param parts """
+        group = []
+        pos = 0
+        for param in PatternTemplate.REGEX_PARAM.finditer(placeholder):
+            if param.start() > pos:
+                group.append((placeholder[pos:param.start()],None))
+            group.append((param.group(),param.group()[1:-1].strip()))
+            pos = param.end()
+        if pos < len(placeholder):
+            group.append((placeholder[pos:],None))
+        return tuple(group)
+
+    @staticmethod
+    def get_template(pattern:str):
+        """ returns compiled template for the pattern (cached) """
+        template = PatternTemplate._templates.get(pattern)
+        if template is None:
+            template = PatternTemplate(pattern)
+            PatternTemplate._templates[pattern] = template
+        return template
+
+    @property
+    def pattern(self)->str:
+        """ the pattern string """
+        return self._pattern
+
+    def has_quotes(self,param_name:str)->bool:
+        """ checks whether param is already wrapped in quotes in the pattern ("[param) """
+        has_quotes = self._has_quotes.get(param_name)
+        if has_quotes is None:
+            has_quotes = re.search(r"\"\["+param_name,self._pattern) is not None
+            self._has_quotes[param_name] = has_quotes
+        return has_quotes
+
+    def render(self,**kwargs)->str:
+        """ fills the template with values from kwargs in one pass,
+            params values are inserted as they are
+        """
+        out = []
+        for segment in self._segments:
+            if isinstance(segment,str):
+                out.append(segment)
+                continue
+            group = []
+            for text,attribute in segment:
+                if attribute is None:
+                    group.append(text)
+                    continue
+                value = kwargs.get(attribute)
+                if not value:
+                    logger.info(f"Attribute {attribute} not found in parameters")
+                    group = None
+                    break
+                logger.debug(f"Replacing {text} using {value}")
+                group.append(value)
+            if group:
+                out.append("".join(group))
+        # strip double spaces
+        return PatternTemplate.REGEX_SPACES.sub(" ","".join(out).strip())
+
 class CmdMap():
     """ Maps Input Parameters to Configuration Items """
     def __init__(self,config_dict:dict) -> None:
@@ -2,8 +2,10 @@
 import sys
 import os
 import logging
+import stat
 from pathlib import Path
 from datetime import datetime as DateTime
+from concurrent.futures import ThreadPoolExecutor
 
 from tools.util.recurse_dict import DictParser
 # from tools.util.tree import Tree
@@ -28,6 +30,11 @@ PATTERN_REF = "pattern_ref"
 WARNING = "warning"
 ACTIONS = EnumHelper.keys(C.ACTION,lower=True)
 LINE_KEY = PersistenceHelper.LINE_KEY
+OS_CONFIG_TYPES = [ C.ENVIRONMENT_WIN,C.ENVIRONMENT_BASH,
+                    C.EXECUTABLE_KEY,C.PATH_KEY,C.FILE_KEY,C.SCRIPT_WIN,
+                    C.SCRIPT_BASH,C.SHORTCUT]
+# number of threads used for file system checks
+STAT_WORKERS = 8
 
 class ConfigValidator():
     """ Validator Main Class  """
@@ -35,51 +42,128 @@ class ConfigValidator():
         """ Constructor """
         self._persistence = PersistenceHelper(f_config,f_validation)
         config = self._persistence.read(line_key=LINE_KEY)
-        self._config_dict = DictParser(config)
+        # lists are turned into dicts
+        self._config = DictParser.get_itemized(config)
+        # file system checks: os object > (is_dir,is_file)
+        self._stat_cache = {}
         # get all configuration leafs
         self._config_leaves = {}
+        # leaf keys by config type and config name
+        self._item_leaves = {}
         self._analyze_tree()
+        # validation rules by config type, called for each config element
+        self._rules = {}
+        self.register_rule(OS_CONFIG_TYPES,self._check_os_reference)
+        self.register_rule([C.PATTERN_KEY],self._check_pattern)
+        self.register_rule([C.CMD_SUBPARSER],self._check_subparser)
+        self.register_rule([C.CMD_MAP_KEY],self._check_cmd_map)
+        self.register_rule([C.CMD_INPUT_MAP],self._check_input_map)
+        self._subcommands = None
+        # check all file system objects at once
+        self._stat_os_objects()
         # we do two runs to apply resolved os objects
         for _ in range(2):
             logger.info("Resolve References")
             self._resolve_os_references()
 
     def _analyze_tree(self):
-        """ analyze the configuration tree get all config values """
-        config_tree = self.config_tree
+        """ analyze the configuration tree get all config values
+            (one pass over the itemized config)
+        """
         line = None
-        # get all leaves
-        leaf_ids = config_tree.get_leaves()
-        for leaf_id in leaf_ids:
-            # get the complete key path for each leaf
-            key_list = config_tree.get_key_path(leaf_id)[1:]
-            # skip the line attribute to be added
-            if isinstance(key_list,list) and key_list[-1]==LINE_KEY:
-                continue
-            key_path = "/".join(key_list)
-            value = self._config_dict.itemized_dict
-            if value:
-                for key in key_list:
-                    value = value[key]
-                    if isinstance(value,dict):
-                        line = value.get(LINE_KEY)
-            if value:
-                self._config_leaves[key_path]={KEY_PATH:key_list,VALUE:value,LINE_KEY:line}
+        config = self._config
+        if not config:
+            return
+        # stack of dict items, key path and line of the dict
+        stack = [(iter(config.items()),[],None)]
+        while stack:
+            items,parent_keys,parent_line = stack[-1]
+            for key,value in items:
+                # skip the line attribute to be added
+                if key == LINE_KEY:
+                    continue
+                key_list = [*parent_keys,key]
+                if isinstance(value,dict):
+                    if value:
+                        stack.append((iter(value.items()),key_list,value.get(LINE_KEY)))
+                        break
+                    line = None
+                # a leaf gets the line of its dict (top level values keep the last line)
+                elif parent_keys:
+                    line = parent_line
+                if value:
+                    key_path = "/".join(key_list)
+                    self._config_leaves[key_path]={KEY_PATH:key_list,VALUE:value,LINE_KEY:line}
+                    self._item_leaves.setdefault(tuple(key_list[:2]),[]).append(key_path)
+            else:
+                stack.pop()
         logger.info(f"Processed Leaves in Config: {len(self._config_leaves)} elements")
 
+    def register_rule(self,config_types:list,rule)->None:
+        """ registers a validation rule, rule(config_type,config_name,config_info)
+            is called for each element of the config types
+        """
+        for config_type in config_types:
+            self._rules.setdefault(config_type,[]).append(rule)
+
     def check(self)->None:
-        """ do overall check """
-        self._check_os_references()
-        self._check_patterns()
-        self._check_subparsers()
-        self._check_cmd_maps()
-        self._check_input_maps()
+        """ do overall check: one pass over all config elements,
+            applying the registered rules
+        """
+        config = self._config
+        if not config:
+            return
+        for config_type,config_type_info in config.items():
+            rules = self._rules.get(config_type)
+            if not rules or not isinstance(config_type_info,dict):
+                continue
+            for config_name,config_info in config_type_info.items():
+                if config_name == LINE_KEY:
+                    continue
+                for rule in rules:
+                    rule(config_type,config_name,config_info)
+
+    def _stat(self,os_object)->tuple:
+        """ file system check (cached), returns is_dir,is_file """
+        os_stat = self._stat_cache.get(os_object)
+        if os_stat is None:
+            os_stat = (False,False)
+            if isinstance(os_object,str):
+                try:
+                    st_mode = os.stat(os_object).st_mode
+                    os_stat = (stat.S_ISDIR(st_mode),stat.S_ISREG(st_mode))
+                except (OSError,ValueError):
+                    pass
+            self._stat_cache[os_object] = os_stat
+        return os_stat
+
+    def _is_dir(self,os_object)->bool:
+        """ checks for existing path """
+        return self._stat(os_object)[0]
+
+    def _is_file(self,os_object)->bool:
+        """ checks for existing file """
+        return self._stat(os_object)[1]
+
+    def _stat_os_objects(self)->None:
+        """ checks all path and file values of os config types at once """
+        os_objects = set()
+        for leaf_info in self._config_leaves.values():
+            key_list = leaf_info[KEY_PATH]
+            if not key_list[0] in OS_CONFIG_TYPES:
+                continue
+            if key_list[-1] in [C.PATH_KEY,C.FILE_KEY] and isinstance(leaf_info[VALUE],str):
+                os_objects.add(leaf_info[VALUE])
+        os_objects = [o for o in os_objects if not o in self._stat_cache]
+        with ThreadPoolExecutor(max_workers=STAT_WORKERS) as executor:
+            list(executor.map(self._stat,os_objects))
+        logger.info(f"Checked {len(os_objects)} file system objects")
 
     def get_config_element(self,*args,info:bool=False):
         """ returns the subtree element of the configuration
             returns value and optionally key path and line
         """
-        out = self._config_dict.itemized_dict
+        out = self._config
         warning_s = None
         if not out:
             return
@@ -116,7 +200,7 @@ class ConfigValidator():
         # skip it was resolved already
         if path and not os_path:
             # check if we have direct links to files
-            is_os_path = os.path.isdir(path)
+            is_os_path = self._is_dir(path)
             # resolve any paths
             if is_os_path:
                 os_path = os.path.abspath(path)
@@ -125,9 +209,9 @@ class ConfigValidator():
                 os_path = self.get_config_element(C.PATH_KEY,path,C.PATH_KEY)
                 os_path_resolved = self.get_config_element(C.PATH_KEY,path,C.RESOLVED_PATH)
                 # direct path
-                if os_path and os.path.isdir(os_path):
+                if os_path and self._is_dir(os_path):
                     is_os_path = True
-                if not is_os_path and os_path_resolved and os.path.isdir(os_path_resolved):
+                if not is_os_path and os_path_resolved and self._is_dir(os_path_resolved):
                     is_os_path = True
                     os_path = os_path_resolved
 
@@ -142,21 +226,21 @@ class ConfigValidator():
         file = config_info.get(C.FILE_KEY)
         os_file = config_info.get(C.RESOLVED_FILE)
         if file and not os_file:
-            is_os_file = os.path.isfile(file)
+            is_os_file = self._is_file(file)
             if is_os_file:
                 os_file = os.path.abspath(file)
             else:
                 # try to concatenate path and file
                 if os_path:
                     os_file = os.path.join(os_path,file)
-                    if os.path.isfile(os_file):
+                    if self._is_file(os_file):
                         is_os_file = True
                 if not is_os_file and config_type in CONFIG_TYPES:
                     os_file = self.get_config_element(C.FILE_KEY,file,C.FILE_KEY)
                     os_file_resolved = self.get_config_element(C.FILE_KEY,file,C.RESOLVED_PATH)
-                    if os_file and os.path.isfile(os_file):
+                    if os_file and self._is_file(os_file):
                         is_os_file = True
-                    if not is_os_file and os_file_resolved and os.path.isfile(os_file_resolved):
+                    if not is_os_file and os_file_resolved and self._is_file(os_file_resolved):
                         is_os_file = True
                         os_file = os_file_resolved
 
@@ -172,35 +256,30 @@ class ConfigValidator():
 
     def _resolve_os_references(self)->None:
         """ resolves os references """
-        config_types = [ C.ENVIRONMENT_WIN,C.ENVIRONMENT_BASH,
-                         C.EXECUTABLE_KEY,C.PATH_KEY,C.FILE_KEY,C.SCRIPT_WIN,
-                         C.SCRIPT_BASH,C.SHORTCUT]
         # check through config types
-        for config_type in config_types:
+        for config_type in OS_CONFIG_TYPES:
             config_type_info = self.get_config_element(config_type)
             for config_name,config_info in config_type_info.items():
                 if not isinstance(config_info,dict):
                     continue
                 self._resolve_os_reference(config_type,config_name)
 
-    def _check_subparsers(self)->None:
-        """ checks integrity of subparser elements """
-        subparser_dict = self.get_config_element(C.CMD_SUBPARSER)
-        for subparser_key,subparser_info in subparser_dict.items():
-            if subparser_key == LINE_KEY:
+    def _check_subparser(self,config_type:str,subparser_key:str,subparser_info:dict)->None:
+        """ rule: checks integrity of subparser elements """
+        if not isinstance(subparser_info,dict):
+            return
+        for subcommand,cmdparam_template in subparser_info.items():
+            if subcommand == LINE_KEY:
                 continue
-            for subcommand,cmdparam_template in subparser_info.items():
-                if subcommand == LINE_KEY:
-                    continue
-                # get the param template
-                cmdparam_template_info = self.get_config_element(C.CMD_PARAM,cmdparam_template)
-                if not cmdparam_template_info:
-                    leaf_key=[C.CMD_SUBPARSER,subparser_key,subcommand,cmdparam_template]
-                    warning = f"cmd_subparser [{'>'.join(leaf_key)}], template {cmdparam_template} missing in {C.CMD_PARAM}"
-                    logger.warning(warning)
-                    self._add_config_leaf_warning(leaf_key,warning)
-                else:
-                    logger.info(f"Valid Map: Subcommand [{subcommand}] ({subparser_key}) => cmd_template [{cmdparam_template}]")
+            # get the param template
+            cmdparam_template_info = self.get_config_element(C.CMD_PARAM,cmdparam_template)
+            if not cmdparam_template_info:
+                leaf_key=[C.CMD_SUBPARSER,subparser_key,subcommand,cmdparam_template]
+                warning = f"cmd_subparser [{'>'.join(leaf_key)}], template {cmdparam_template} missing in {C.CMD_PARAM}"
+                logger.warning(warning)
+                self._add_config_leaf_warning(leaf_key,warning)
+            else:
+                logger.info(f"Valid Map: Subcommand [{subcommand}] ({subparser_key}) => cmd_template [{cmdparam_template}]")
 
     def _check_cmd_map_pattern(self,map_key:str,cmd_map:dict)->None:
         """ checks the cmd_map pattern """
@@ -277,19 +356,17 @@ class ConfigValidator():
                 self._add_leaf(leaf_key,**leaf_info)
         pass
 
-    def _check_cmd_maps(self)->None:
-        """ checks the parse args to commands mapping  """
-        cmd_map_dict = self.get_config_element(C.CMD_MAP_KEY)
-        for cmd_map_key,cmd_map_info in cmd_map_dict.items():
-            if cmd_map_key == LINE_KEY:
-                continue
-            cmd_map = cmd_map_info.get(C.MAP,{})
-            map_type = cmd_map.get(C.TYPE)
-            match map_type:
-                case C.PATTERN_KEY:
-                    self._check_cmd_map_pattern(cmd_map_key,cmd_map)
-                case C.ACTION_KEY:
-                    self._check_cmd_map_action(cmd_map_key,cmd_map)
+    def _check_cmd_map(self,config_type:str,cmd_map_key:str,cmd_map_info:dict)->None:
+        """ rule: checks the parse args to commands mapping  """
+        if not isinstance(cmd_map_info,dict):
+            return
+        cmd_map = cmd_map_info.get(C.MAP,{})
+        map_type = cmd_map.get(C.TYPE)
+        match map_type:
+            case C.PATTERN_KEY:
+                self._check_cmd_map_pattern(cmd_map_key,cmd_map)
+            case C.ACTION_KEY:
+                self._check_cmd_map_action(cmd_map_key,cmd_map)
 
     def _get_subcommands(self):
         """ gets all subcommands """
@@ -303,74 +380,65 @@ class ConfigValidator():
         subcommands = [cmd for cmd in subcommands if cmd != LINE_KEY]
         return subcommands
 
-    def _check_input_maps(self)->None:
-        """ checks the input maps """
-        subcommands = self._get_subcommands()
-        subcommands.extend([C.DEFAULT,C.MAIN])
-        cmd_input_map_dict = self.get_config_element(C.CMD_INPUT_MAP)
-        for cmd_input_map_type,cmd_input_map_type_info in cmd_input_map_dict.items():
-            if cmd_input_map_type == LINE_KEY:
-                continue
-            logger.info(f"Processing Input Map {cmd_input_map_type} (L{cmd_input_map_type_info.get(LINE_KEY)})")
-            # check input map type
-            if not cmd_input_map_type in subcommands:
-                leaf_key=[C.CMD_INPUT_MAP,cmd_input_map_type]
-                line = cmd_input_map_type_info.get(LINE_KEY)
-                warning_s = f"Subcommand {cmd_input_map_type} (L{line})is not a valid type, check {C.CMD_SUBPARSER} section"
-                logger.warning(warning_s)
-                self._add_config_leaf_warning(leaf_key,warning_s)
-                continue
+    def _check_input_map(self,config_type:str,cmd_input_map_type:str,cmd_input_map_type_info:dict)->None:
+        """ rule: checks the input maps """
+        if self._subcommands is None:
+            self._subcommands = self._get_subcommands()
+            self._subcommands.extend([C.DEFAULT,C.MAIN])
+        subcommands = self._subcommands
+        logger.info(f"Processing Input Map {cmd_input_map_type} (L{cmd_input_map_type_info.get(LINE_KEY)})")
+        # check input map type
+        if not cmd_input_map_type in subcommands:
+            leaf_key=[C.CMD_INPUT_MAP,cmd_input_map_type]
+            line = cmd_input_map_type_info.get(LINE_KEY)
+            warning_s = f"Subcommand {cmd_input_map_type} (L{line})is not a valid type, check {C.CMD_SUBPARSER} section"
+            logger.warning(warning_s)
+            self._add_config_leaf_warning(leaf_key,warning_s)
+            return
 
-            for cmd_input_map, cmd_input_map_info in cmd_input_map_type_info.items():
-                if cmd_input_map == LINE_KEY or not isinstance(cmd_input_map_info,dict):
-                    continue
-                config_type = cmd_input_map_info.get(C.TYPE)
-                mappings = cmd_input_map_info.get(C.MAP)
-                pattern = cmd_input_map_info.get(C.PATTERN_KEY)
-                for _,mapping_info in mappings.items():
-                    source = mapping_info.get(C.SOURCE)
-                    param = source.get(C.PARAM_KEY)
-                    key = source.get(C.KEY)
-                    argparse_param = mapping_info.get(C.PARAM_KEY)
-                    leaf_key=[config_type,param,key]
-                    source_info = self.get_config_element(*leaf_key,info=True)
-                    warning_s = source_info.get(WARNING)
-                    line = source_info.get(LINE_KEY)
-                    p = [cmd_input_map_type,cmd_input_map,"(L"+line+")"]
-                    s = f"{'>'.join(p)}: "
+        for cmd_input_map, cmd_input_map_info in cmd_input_map_type_info.items():
+            if cmd_input_map == LINE_KEY or not isinstance(cmd_input_map_info,dict):
+                continue
+            source_type = cmd_input_map_info.get(C.TYPE)
+            mappings = cmd_input_map_info.get(C.MAP)
+            pattern = cmd_input_map_info.get(C.PATTERN_KEY)
+            for _,mapping_info in mappings.items():
+                source = mapping_info.get(C.SOURCE)
+                param = source.get(C.PARAM_KEY)
+                key = source.get(C.KEY)
+                argparse_param = mapping_info.get(C.PARAM_KEY)
+                leaf_key=[source_type,param,key]
+                source_info = self.get_config_element(*leaf_key,info=True)
+                warning_s = source_info.get(WARNING)
+                line = source_info.get(LINE_KEY)
+                p = [cmd_input_map_type,cmd_input_map,"(L"+line+")"]
+                s = f"{'>'.join(p)}: "
+                if warning_s:
+                    logger.warning(s+warning_s)
+                    self._add_config_leaf_warning(leaf_key,warning_s)
+                else:
+                    info_s = f"CMD_INPUT_MAP {s}: ({'>'.join(leaf_key)}) => ARGPARSE PARAMETER [{argparse_param}]"
+                    logger.info(info_s)
+                if pattern: # validate pattern
+                    leaf_key_pattern = [C.PATTERN_KEY,pattern,C.PARAM_KEY,argparse_param]
+                    pattern_info = self.get_config_element(*leaf_key_pattern,info=True)
+                    line = pattern_info.get(LINE_KEY)
+                    warning_s = pattern_info.get(WARNING)
                     if warning_s:
                         logger.warning(s+warning_s)
-                        self._add_config_leaf_warning(leaf_key,warning_s)
+                        self._add_config_leaf_warning(leaf_key_pattern,warning_s)
                     else:
-                        info_s = f"CMD_INPUT_MAP {s}: ({'>'.join(leaf_key)}) => ARGPARSE PARAMETER [{argparse_param}]"
-                        logger.info(info_s)
-                    if pattern: # validate pattern
-                        leaf_key_pattern = [C.PATTERN_KEY,pattern,C.PARAM_KEY,argparse_param]
-                        pattern_info = self.get_config_element(*leaf_key_pattern,info=True)
-                        line = pattern_info.get(LINE_KEY)
-                        warning_s = pattern_info.get(WARNING)
-                        if warning_s:
-                            logger.warning(s+warning_s)
-                            self._add_config_leaf_warning(leaf_key_pattern,warning_s)
-                        else:
-                            logger.info(f"Map {s}: Mapping pattern {pattern} to {leaf_key_pattern}: Argparse [{argparse_param}]")
-
-    def _check_os_references(self)->None:
-        """" checks for os references (either file or path objects) """
-        config_types = [ C.ENVIRONMENT_WIN,C.ENVIRONMENT_BASH,
-                         C.EXECUTABLE_KEY,C.PATH_KEY,C.FILE_KEY,C.SCRIPT_WIN,
-                         C.SCRIPT_BASH,C.SHORTCUT]
-        warnings=[]
-        # now go through all leaves in the configuration check whether files were resolved
-        for leaf,leaf_info in self._config_leaves.items():
-            if leaf.endswith(LINE_KEY):
-                continue
-            config_type, config_name = leaf_info[KEY_PATH][:2]
-            if not config_type in config_types:
-                continue
-            config_info = self.get_config_element(config_type,config_name)
-            resolved_file = config_info.get(C.RESOLVED_FILE)
-            resolved_path = config_info.get(C.RESOLVED_PATH)
+                        logger.info(f"Map {s}: Mapping pattern {pattern} to {leaf_key_pattern}: Argparse [{argparse_param}]")
+
+    def _check_os_reference(self,config_type:str,config_name:str,config_info:dict)->None:
+        """ rule: checks for os references (either file or path objects) """
+        if not isinstance(config_info,dict):
+            return
+        resolved_file = config_info.get(C.RESOLVED_FILE)
+        resolved_path = config_info.get(C.RESOLVED_PATH)
+        # now go through all leaves of the element check whether files were resolved
+        for leaf in self._item_leaves.get((config_type,config_name),[]):
+            leaf_info = self._config_leaves[leaf]
             warning = False
             if leaf.endswith(C.FILE_KEY):
                 leaf_info[C.RESOLVED_FILE]=resolved_file
@@ -385,10 +453,7 @@ class ConfigValidator():
                 leaf_key = leaf_info.get(KEY_PATH)
                 warning = f"Could not resolve OS object [{'>'.join(leaf_key)}]"
                 logger.warning(warning)
-                warnings.append([leaf_key,warning])
-        for warning in warnings:
-            self._add_config_leaf_warning(warning[0],warning[1])
-
+                self._add_config_leaf_warning(leaf_key,warning)
 
     def _add_config_leaf_warning(self,leaf_key:list,error:str)->None:
         """ adds an error to the leaf dict """
@@ -420,38 +485,35 @@ class ConfigValidator():
             leaf[kw_key] = value
         self._config_leaves[key]=leaf
 
-    def _check_patterns(self)->None:
-        """ checks pattern """
-        # for leaf,leaf_info in self._config_leaves.items():
-        config_info = self.get_config_element(C.PATTERN_KEY)
-        for pattern_key,pattern_info in config_info.items():
-            if not isinstance(pattern_info,dict):
+    def _check_pattern(self,config_type:str,pattern_key:str,pattern_info:dict)->None:
+        """ rule: checks pattern """
+        if not isinstance(pattern_info,dict):
+            return
+        pattern = pattern_info.get(C.PATTERN_KEY)
+        param_info = pattern_info.get(C.PARAM_KEY,{})
+        for param,param_dict in param_info.items():
+            if not isinstance(param_dict,dict):
                 continue
-            pattern = pattern_info.get(C.PATTERN_KEY)
-            param_info = pattern_info.get(C.PARAM_KEY,{})
-            for param,param_dict in param_info.items():
-                if not isinstance(param_dict,dict):
-                    continue
-                param_type = param_dict.get(C.TYPE)
-                leaf_warn = [C.PATTERN_KEY,pattern_key,C.PARAM_KEY,param]
-                # check if param is in pattern
-                if not f"[{param}]" in pattern:
-                    warning = f"Pattern [{pattern_key}]: Parameter [{param}] not in pattern"
+            param_type = param_dict.get(C.TYPE)
+            leaf_warn = [C.PATTERN_KEY,pattern_key,C.PARAM_KEY,param]
+            # check if param is in pattern
+            if not f"[{param}]" in pattern:
+                warning = f"Pattern [{pattern_key}]: Parameter [{param}] not in pattern"
+                logger.warning(warning)
+                self._add_config_leaf_warning(leaf_warn,warning)
+            # check if executable was resolved
+            if param_type == C.EXECUTABLE_KEY:
+                executable = self.get_config_element(C.EXECUTABLE_KEY,param,C.RESOLVED_FILE)
+                if not executable:
+                    warning=f"Pattern [{pattern_key}]: Executable [{param}] can not be resolved"
                     logger.warning(warning)
                     self._add_config_leaf_warning(leaf_warn,warning)
-                # check if executable was resolved
-                if param_type == C.EXECUTABLE_KEY:
-                    executable = self.get_config_element(C.EXECUTABLE_KEY,param,C.RESOLVED_FILE)
-                    if not executable:
-                        warning=f"Pattern [{pattern_key}]: Executable [{param}] can not be resolved"
-                        logger.warning(warning)
-                        self._add_config_leaf_warning(leaf_warn,warning)
-                    pass
+                pass
 
     @property
     def config_tree(self):
         """ gets the config tree """
-        return self._config_dict.tree
+        return DictParser(self._config,lazy=True).tree
 
     def _report_get_objects(self)->dict:
         """ get objects as output data """
@@ -13,19 +13,50 @@ class ParseHelper():
     ARGS =  "args"
     KWARGS = "kwargs"
     CMDPARAM_DEFAULT = "cmdparam_default"
+    # keys of parser specification
+    PARSE_ARGS = "parse_args"
+    ARGUMENTS = "arguments"
+    SUBPARSERS = "subparsers"
+    SUBCOMMAND = "subcommand"
+    HELP = "help"
 
     def __init__(self,config,
                  params_template:str=None,
                  subparser_template:str=None,
                  params_default:list=None,
+                 parser_spec:dict=None,
                  **kwargs) -> None:
-        """ constuctor, uses the params dict from config file """
+        """ constuctor, uses the params dict from config file
+            parser_spec: argparse specification (as returned by property parser_spec),
+            if supplied the configuration is not evaluated
+        """
         self._params_template=params_template
         self._subparser_template=subparser_template
         self._config = config
-        self._cmd_params_dict = config.get_config(C.CONFIG.CMD_PARAM)
-        self._cmd_subparser_dict = config.get_config(C.CONFIG.CMD_SUBPARSER)
+        if parser_spec is None:
+            self._cmd_params_dict = config.get_config(C.CONFIG.CMD_PARAM)
+            self._cmd_subparser_dict = config.get_config(C.CONFIG.CMD_SUBPARSER)
+            parser_spec = self._get_parser_spec(params_default,**kwargs)
+        self._parser_spec = parser_spec
+        self._main_parser = ParseHelper._create_parser(parser_spec)
+
+    @property
+    def params_template(self):
+        """ return the params template """
+        return self._params_template
+
+    @property
+    def subparser_template(self):
+        """ return the subparams template """
+        return self._subparser_template
+
+    @property
+    def parser_spec(self)->dict:
+        """ argparse specification (plain dict, can be serialized) """
+        return self._parser_spec
 
+    def _get_parser_spec(self,params_default:list=None,**kwargs)->dict:
+        """ gets the argparse specification from configuration """
         # check for any additonal values relevant for configuration
         parse_args = {}
         prog = kwargs.get(C.PARSER_ATTRIBUTE.PROG.value)
@@ -37,44 +68,45 @@ class ParseHelper():
         epilog = kwargs.get(C.PARSER_ATTRIBUTE.EPILOG.value)
         if epilog:
             parse_args[C.PARSER_ATTRIBUTE.EPILOG.value]=epilog
-        self._main_parser = argparse.ArgumentParser(**parse_args)
+        parser_spec = {ParseHelper.PARSE_ARGS:parse_args,ParseHelper.ARGUMENTS:[],
+                       ParseHelper.SUBPARSERS:None}
         # add additional params from default input args
         default_arguments = self._get_default_params_filters(params_default)
         if default_arguments:
-            self._add_arguments(self._main_parser,default_arguments)
+            parser_spec[ParseHelper.ARGUMENTS].extend(default_arguments)
         # add without subparser arguments / valid for main argparser
         if self._params_template is not None:
-            self._add_template()
+            arguments = self._get_args_dict(self._params_template)
+            if arguments:
+                parser_spec[ParseHelper.ARGUMENTS].extend(arguments)
         # add any subparsers
         if self._subparser_template is not None:
-            self._add_subparser_template()
+            parser_spec[ParseHelper.SUBPARSERS] = self._get_subparser_spec()
         else:
             logger.error("no parser or subparser was submitted, check settings")
-            return
-
-    @property
-    def params_template(self):
-        """ return the params template """
-        return self._params_template
-
-    @property
-    def subparser_template(self):
-        """ return the subparams template """
-        return self._subparser_template
+        return parser_spec
 
-    def _add_template(self):
-        """ adding a single template to parser """
-        # add params from the template
-        arguments = self._get_args_dict(self._params_template)
-        self._add_arguments(self._main_parser,arguments)
+    @staticmethod
+    def _create_parser(parser_spec:dict)->argparse.ArgumentParser:
+        """ creates the argparser from specification """
+        parser = argparse.ArgumentParser(**parser_spec[ParseHelper.PARSE_ARGS])
+        ParseHelper._add_arguments(parser,parser_spec[ParseHelper.ARGUMENTS])
+        subparser_specs = parser_spec[ParseHelper.SUBPARSERS]
+        if subparser_specs is not None:
+            subparsers = parser.add_subparsers(dest="command")
+            for subparser_spec in subparser_specs:
+                subparser = subparsers.add_parser(subparser_spec[ParseHelper.SUBCOMMAND],
+                                                  help=subparser_spec[ParseHelper.HELP])
+                ParseHelper._add_arguments(subparser,subparser_spec[ParseHelper.ARGUMENTS])
+        return parser
 
-    def _add_subparser_template(self):
-        """ add subparser template """
+    def _get_subparser_spec(self)->list:
+        """ get subparser specification from subparser template """
         subparser_template_dict=self._cmd_subparser_dict.get(self._subparser_template)
         if subparser_template_dict is None:
             logger.error(f"Coulddn't find Subparser Template in cmd_subparsers > {self._subparser_template}")
             return None
-        subparsers = self._main_parser.add_subparsers(dest="command")
+        subparser_specs = []
         for subcommand,parse_template in subparser_template_dict.items():
             logger.info(f"Subparser Template {self._subparser_template}, subcommand {subcommand}, parse template {parse_template}")
             arguments = self._get_args_dict(parse_template)
@@ -82,10 +114,12 @@ class ParseHelper():
                 logger.warning(f"Couldn't find args template {parse_template}")
                 continue
             help_args = self._cmd_params_dict[parse_template].get(C.PARSER_ATTRIBUTE.HELP.value,"no help available")
-            subparser = subparsers.add_parser(subcommand,help=help_args)
-            self._add_arguments(subparser,arguments)
+            subparser_specs.append({ParseHelper.SUBCOMMAND:subcommand,ParseHelper.HELP:help_args,
+                                    ParseHelper.ARGUMENTS:arguments})
+        return subparser_specs
 
-    def _add_arguments(self,parser,arguments):
+    @staticmethod
+    def _add_arguments(parser,arguments):
         """ adds arguments to parser """
         for arg in arguments:
             args = arg[ParseHelper.ARGS]
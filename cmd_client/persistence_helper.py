@@ -5,13 +5,45 @@ from pathlib import Path
 import logging
 from datetime import datetime as DateTime
 import json
+import pickle
+from collections import OrderedDict
 import yaml
-from yaml import CLoader
-from yaml.composer import Composer
-from yaml.constructor import Constructor
 
 logger = logging.getLogger(__name__)
 
+# use libyaml (C implementation) if available
+YamlLoader = getattr(yaml,"CSafeLoader",yaml.SafeLoader)
+
+class YamlLineLoader(YamlLoader):
+    """ yaml loader adding the line number to each mapping (as dict key line_key) """
+
+    def __init__(self,stream:str,line_key:str) -> None:
+        super().__init__(stream)
+        self._stream = stream
+        self._line_key = line_key
+
+    def get_single_node(self):
+        """ composes the document, a root mapping gets the line of an explicit document start (---) """
+        node = super().get_single_node()
+        if isinstance(node,yaml.MappingNode):
+            num_lines = node.start_mark.line
+            lines = self._stream.split("\n",num_lines)[:num_lines]
+            for line_num in range(num_lines-1,-1,-1):
+                if lines[line_num].startswith("---"):
+                    node.__line__ = line_num + 1
+                    break
+        return node
+
+    def construct_mapping(self,node,deep=False):
+        """ constructs dict from mapping node and adds its line number """
+        # a mapping used as value gets the line of its key
+        for key_node,value_node in node.value:
+            if isinstance(value_node,yaml.MappingNode) and not hasattr(value_node,"__line__"):
+                value_node.__line__ = key_node.end_mark.line + 1
+        mapping = super().construct_mapping(node,deep=deep)
+        mapping[self._line_key] = str(getattr(node,"__line__",node.start_mark.line + 1))
+        return mapping
+
 class PersistenceHelper():
     """ Helper class to read / write (single) file """
 
@@ -23,6 +55,9 @@ class PersistenceHelper():
     LINE_KEY = "line" # dict key for lines attribute when reading yaml
 
     ALLOWED_FILE_TYPES = ["yaml","txt","json","plantuml","md"]
+    YAML_CACHE_SIZE = 32 # number of yaml files kept in cache
+    # cache of read yaml files (path,mtime,size,line_key):pickled data
+    _yaml_cache = OrderedDict()
 
     def __init__(self,f_read:str=None,f_save:str=None,**kwargs) -> None:
         """ constructor """
@@ -316,30 +351,34 @@ class PersistenceHelper():
         return lines
 
     @staticmethod
-    def read_yaml(filepath:str,line_key:str=None)->dict:
-        """ Reads YAML file (optionally with line numbers)"""
-        # https://stackoverflow.com/questions/13319067
-
-        def compose_node(parent, index):
-            # the line number where the previous token has ended (plus empty lines)
-            line = loader.line
-            node = Composer.compose_node(loader, parent, index)
-            node.__line__ = line + 1
-            return node
-        
-        def construct_mapping(node, deep=False):
-            mapping = Constructor.construct_mapping(loader, node, deep=deep)
-            mapping[line_key] = str(node.__line__)
-            return mapping
-
+    def read_yaml(filepath:str,line_key:str=None,use_cache:bool=True)->dict:
+        """ Reads YAML file (optionally with line numbers), data is cached
+            by file path and modification time
+        """
         if not os.path.isfile(filepath):
             logger.warning(f"File path {filepath} does not exist. Exiting...")
             return None
-        loader = yaml.Loader(open(filepath,encoding='utf-8').read())
-        if line_key:            
-            loader.compose_node = compose_node
-            loader.construct_mapping = construct_mapping
-        data = loader.get_single_data()
+        yaml_cache = PersistenceHelper._yaml_cache
+        stat = os.stat(filepath)
+        cache_key = (os.path.abspath(filepath),stat.st_mtime_ns,stat.st_size,line_key)
+        if use_cache and cache_key in yaml_cache:
+            logger.debug(f"Read {filepath} from cache")
+            yaml_cache.move_to_end(cache_key)
+            # always return a copy, data is changed by callers
+            return pickle.loads(yaml_cache[cache_key])
+        with open(filepath,encoding='utf-8') as stream:
+            if line_key:
+                loader = YamlLineLoader(stream.read(),line_key)
+            else:
+                loader = YamlLoader(stream)
+            try:
+                data = loader.get_single_data()
+            finally:
+                loader.dispose()
+        if use_cache:
+            yaml_cache[cache_key] = pickle.dumps(data)
+            if len(yaml_cache) > PersistenceHelper.YAML_CACHE_SIZE:
+                yaml_cache.popitem(last=False)
         return data
 
     @staticmethod
@@ -352,7 +391,7 @@ class PersistenceHelper():
         data = None
         try:
             with open(filepath, encoding='utf-8',mode='r') as stream:
-                data = yaml.load(stream,Loader=CLoader)
+                data = yaml.load(stream,Loader=YamlLoader)
         except:
             logger.error(f"Error opening {filepath} ****",exc_info=True)
         return data
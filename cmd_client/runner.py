@@ -96,7 +96,11 @@ class Runner():
             logger.info(f"*  [{cmd}]: {cmd_info}")
 
     def transform_cmds(self,cmd_list):
-        """ transforms the params for passing over to py_bat """
+        """ transforms the params for passing over to py_bat
+            (list of commands or dict name:command)
+        """
+        if isinstance(cmd_list,dict):
+            return dict(zip(cmd_list.keys(),self.transform_cmds(list(cmd_list.values()))))
         out_list = []
         for cmd in cmd_list:
             cmd_s = cmd.replace('"'+C.PARAMS_MARKER,"")
@@ -105,8 +109,8 @@ class Runner():
             out_list.append(cmd_s)
         return out_list
 
-    def run_cmd(self,parsed_args,open_files:bool=False)->str:
-        """ returns the os command """
+    def get_cmds(self,parsed_args)->dict:
+        """ runs the actions and returns the os commands as dict (name:command) """
         commands = self._config.get_cmd(parsed_args)
         sub_command = parsed_args.get(C.COMMAND,"MAIN COMMAND")
         cmd_dict = commands.get(C.PATTERN_KEY)
@@ -119,12 +123,11 @@ class Runner():
         else:
             logger.info("No actions")
 
-        cmds = None
+        cmds = {}
         if cmd_dict:
             num_cmds = len(cmd_dict)
-            cmds = list(cmd_dict.values())
             logger.info(f"Command [{sub_command}]: ({num_cmds}) Commands {list(cmd_dict.values())}")
-            cmds = self.transform_cmds(cmds)
+            cmds = self.transform_cmds(cmd_dict)
         else:
             logger.info("No commands Derived (actions were done before)")
 
@@ -135,12 +138,26 @@ class Runner():
             default_editor = self._config.get_configuration(C.CONFIGURATION_DEFAULT_EDITOR)
             files_created = action_dict.get(C.FILE_CREATED,{})
             Utils.open_files(default_editor,files_created)
+        return cmds
 
-        if isinstance(cmds,list):
+    def run_cmd(self,parsed_args,open_files:bool=False)->str:
+        """ returns the os command """
+        cmds = list(self.get_cmds(parsed_args).values())
+        if cmds:
             if len(cmds)>1:
                 logger.warning("There's more than one command, check the settings")
             return cmds[0]
 
+    def run_cmds(self,parsed_args,depends_on:dict=None,max_workers:int=None)->dict:
+        """ derives the os commands and runs them concurrently, depends_on
+            is a dict command name:[command names] to be run before,
+            returns dict command name:job result (return code, time, output)
+        """
+        cmds = self.get_cmds(parsed_args)
+        if not cmds:
+            return {}
+        return CmdRunner(self._cwd).run_jobs(cmds,depends_on,max_workers)
+
 if __name__ == "__main__":
     # here's a list of collected commamnds for test driving
     # aleays use option -h / --help to display commands
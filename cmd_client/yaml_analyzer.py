@@ -50,7 +50,7 @@ class YamlAnalyzer():
     def _read_config(self,line_key:str=None):
         """ reads the configuration """
         config = self._persistence.read(line_key=line_key)
-        self._config_dict = DictParser(config)
+        self._config_dict = DictParser(config,lazy=True)
 
     def _analyze_tree(self):
         """ analyze the configuration tree get all config values """
@@ -12,6 +12,9 @@ from pathlib import Path
 #import subprocess
 import json
 import traceback
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import yaml
 from yaml import CLoader
 import logging
@@ -27,23 +30,46 @@ logger = logging.getLogger(__name__)
 # byte order mark for some utf8 file types
 BOM = '\ufeff'
 
-# functions to read file content
-displayfunctions_dict={"url":"get_url_from_link",
-                       "txt":"read_txt_file",
-                       "jpg":"get_img_metadata_exiftool",
-                       "json":"read_json",
-                       "lnk":"get_fileref_from_shortcut"
-                      }
+# markdown headers and toc
+REGEX_MD_SPECIAL_CHARS=re.compile(r"[\\;:().,;/]")
+REGEX_MD_HEADER=re.compile("^(#+) (.+)$")
+REGEX_MD_LINK=re.compile(r"\[(.+)\]\(.+\)")
+MD_ANCHOR="[_LABEL_](#_LINK_)"
+MD_INDENT=2
+# code block fence: ``` or ~~~ indented up to 3 spaces
+REGEX_MD_CODE_FENCE=re.compile(r"^ {0,3}(`{3,}|~{3,})")
+MD_SUFFIX=".md"
+# max size (characters / bytes) of file content, larger contents are truncated
+MAX_CONTENT_SIZE=1024*1024
+# file types using exif data read recursively by exiftool
+EXIF_FILETYPES=["jpg"]
+# max number of extractions in progress for each worker (bounds memory of pending results)
+PENDING_PER_WORKER=4
 exif_info={}
+# root path of exif_info
+_exif_root=None
+_exif_lock=threading.Lock()
 
-def read_txt_file(filepath,encoding='utf-8',comment_marker="#",skip_blank_lines=True):
+def read_txt_file(filepath,encoding='utf-8',comment_marker="#",skip_blank_lines=True,max_size=None):
     """ reads data as lines from file
+        max_size: at most max_size characters are read (last line is truncated)
     """
     lines = []
     bom_check = False
+    size = 0
     try:
         with open(filepath,encoding=encoding,errors='backslashreplace') as fp:
-            for line in fp:
+            while True:
+                if max_size:
+                    if size >= max_size:
+                        break
+                    # long lines are only read up to max size
+                    line = fp.readline(max_size-size)
+                else:
+                    line = fp.readline()
+                if not line:
+                    break
+                size+=len(line)
                 if not bom_check:
                     bom_check = True
                     if line[0] == BOM:
@@ -130,39 +156,120 @@ def save_yaml(filepath,data:dict):
 
 
 
-def md2toc(f:str,as_string:bool=True):
-    """ reads contents of a markdown file, extracts header lines to table of contents
-        returns header lines as string or list
+def get_md_anchor(label:str)->str:
+    """ anchor link of a markdown header label """
+    link=REGEX_MD_SPECIAL_CHARS.sub("",label)
+    return link.replace(" ","-").lower()
+
+def get_md_headers(f:str)->list:
+    """ reads header lines of a markdown file in a single pass (headers in fenced code blocks
+        are ignored, indented code blocks are not detected)
+        returns list of [level,label,anchor]
     """
-    RE_SPECIAL_CHARS="[\\\;:().,;/]"
+    headers=[]
+    # fence of the open code block
+    code_fence=None
+    try:
+        with open(f,encoding='utf-8-sig',errors='backslashreplace') as fp:
+            for line in fp:
+                fence=REGEX_MD_CODE_FENCE.match(line)
+                if fence:
+                    if code_fence is None:
+                        code_fence=fence.group(1)
+                    elif fence.group(1).startswith(code_fence):
+                        # closing fence: same char, at least as long
+                        code_fence=None
+                    continue
+                if code_fence or not line.startswith("#"):
+                    continue
+                match=REGEX_MD_HEADER.match(line.strip())
+                if not match:
+                    continue
+                label=match.group(2).strip()
+                link_text=REGEX_MD_LINK.findall(label)
+                if link_text:
+                    label=link_text[0]
+                headers.append([len(match.group(1)),label,get_md_anchor(label)])
+    except:
+        logger.error(f"Exception reading file {f}",exc_info=True)
+    return headers
 
-    REGEX_HEADER = "^(#+) (.+)\n"
-    REGEX_LINK = r"\[(.+)\]\(.+\)"
-    MD_ANCHOR = "[_LABEL_](#_LINK_)"
-    MD_INDENT=2
+def headers2toc(headers:list,as_string:bool=True):
+    """ creates table of contents from header list (see get_md_headers) """
     lines_toc=[]
-    lines_in = read_txt_file(f,comment_marker="xxx")
-    for l in lines_in:
-        match = re.findall(REGEX_HEADER,l)
-        if match:
-            level=len(match[0][0])
-            label=match[0][1].strip()
-            link_text = re.findall(REGEX_LINK,label)
-            if link_text:
-                label = link_text[0]
-
-            # replace special characters
-            link=re.sub(RE_SPECIAL_CHARS,"",label)
-            link=link.replace(" ","-").lower()
-            anchor_link=MD_ANCHOR.replace("_LABEL_",label)
-            anchor_link=anchor_link.replace("_LINK_",link)
-            out_string=(level-1)*MD_INDENT*" "+"* "+anchor_link+" "*MD_INDENT
-            lines_toc.append(out_string)
+    for level,label,anchor in headers:
+        anchor_link=MD_ANCHOR.replace("_LABEL_",label)
+        anchor_link=anchor_link.replace("_LINK_",anchor)
+        lines_toc.append((level-1)*MD_INDENT*" "+"* "+anchor_link+" "*MD_INDENT)
     if as_string:
         return "\n".join(lines_toc)+"\n"
     else:
         return lines_toc
 
+def md2toc(f:str,as_string:bool=True):
+    """ reads contents of a markdown file, extracts header lines to table of contents
+        returns header lines as string or list
+    """
+    return headers2toc(get_md_headers(f),as_string)
+
+def index_md_headers(fp,f_cache:str=None,max_workers=None)->dict:
+    """ reads headers of all markdown files in path in parallel, headers are cached
+        by file modification time and size in f_cache (json), so only changed files are read
+        returns dict filepath: {"mtime","size","headers"}
+    """
+    md_index={}
+    cache={}
+    if f_cache and os.path.isfile(f_cache):
+        cache=read_json(f_cache) or {}
+    changed=[]
+    for subpath,_,files in os.walk(fp):
+        for f in files:
+            if not f.lower().endswith(MD_SUFFIX):
+                continue
+            f_md=str(Path(subpath).joinpath(f).absolute())
+            stat=os.stat(f_md)
+            cached=cache.get(f_md)
+            if cached and cached["mtime"] == stat.st_mtime and cached["size"] == stat.st_size:
+                md_index[f_md]=cached
+            else:
+                md_index[f_md]={"mtime":stat.st_mtime,"size":stat.st_size,"headers":None}
+                changed.append(f_md)
+    if changed:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for f_md,headers in zip(changed,executor.map(get_md_headers,changed)):
+                md_index[f_md]["headers"]=headers
+    logger.info(f"Indexed {len(md_index)} markdown files in {fp}, {len(changed)} files read")
+    # entries of files outside of path are kept
+    p_root=str(Path(fp).absolute())
+    cache_root=[f_md for f_md in cache.keys() if f_md.startswith(p_root+os.sep)]
+    if f_cache and (changed or set(md_index.keys()) != set(cache_root)):
+        cache={f_md:md_info for f_md,md_info in cache.items() if not f_md.startswith(p_root+os.sep)}
+        save_json(f_cache,{**cache,**md_index})
+    return md_index
+
+def get_md_tocs(fp,f_cache:str=None,as_string:bool=True,max_workers=None)->dict:
+    """ table of contents of all markdown files in path (see index_md_headers) """
+    md_index=index_md_headers(fp,f_cache,max_workers)
+    return {f_md:headers2toc(md_info["headers"],as_string) for f_md,md_info in md_index.items()}
+
+def md_cross_index(md_index:dict,fp_root=None,as_string:bool=True):
+    """ cross document index: header labels (sorted) with links to file anchors,
+        links are relative to fp_root (default: current dir)
+    """
+    if fp_root is None:
+        fp_root=os.getcwd()
+    label_dict={}
+    for f_md,md_info in md_index.items():
+        link=Path(os.path.relpath(f_md,fp_root)).as_posix().replace(" ","%20")
+        for _,label,anchor in md_info["headers"]:
+            label_dict.setdefault(label,[]).append(MD_ANCHOR.replace("_LABEL_",Path(f_md).stem)
+                                                   .replace("#_LINK_",link+"#"+anchor))
+    lines_index=[f"* {label}: "+", ".join(links) for label,links in sorted(label_dict.items(),key=lambda l:l[0].lower())]
+    if as_string:
+        return "\n".join(lines_index)+"\n"
+    else:
+        return lines_index
+
 def get_fileref_from_shortcut(f):
     """ reads file location from windows shortcut
         https://stackoverflow.com/questions/397125/reading-the-target-of-a-lnk-file-in-python
@@ -184,47 +291,195 @@ def get_img_metadata_exiftool(f):
     """ reading EXIF Data from search/ requires EXIFTOOL """
     return exif_info.get(str(f),"NO EXIF DATA FOUND")
 
-def read_file_info(fp,content=True,type_filters=[]):
-    """ reading file contents for supported file types """
-    global exif_info
-    subpath_dict={}
-
-    # read image metadata files
-    if content:
-        #read_exif=False
-        if (not bool(type_filters)) or ("jpg" in type_filters):
+def load_exif_info(fp):
+    """ reads exif data of all images in path recursively (only once for each path) """
+    global exif_info,_exif_root
+    fp=str(Path(fp).absolute())
+    with _exif_lock:
+        if _exif_root != fp:
             try:
                 logger.debug("GETTING EXIF DATA")
                 exif_info=img_info.exiftool_read_meta_recursive(fp,debug=False)
             except Exception:
                 logger.error("Exception reading exif files",exc_info=True)
+                exif_info={}
+            _exif_root=fp
+    return exif_info
+
+# functions to read file content for each file type
+content_extractors={"url":get_url_from_link,
+                    "txt":read_txt_file,
+                    "jpg":get_img_metadata_exiftool,
+                    "json":read_json,
+                    "lnk":get_fileref_from_shortcut
+                   }
+
+def register_extractor(filetype:str,extractor)->None:
+    """ registers function reading the content of a file type (function of file path) """
+    content_extractors[filetype]=extractor
+
+def truncate_content(file_content,max_size=MAX_CONTENT_SIZE):
+    """ truncates string / list of strings to max_size characters, returns (content,truncated) """
+    if not max_size:
+        return file_content,False
+    if isinstance(file_content,str):
+        return file_content[:max_size],len(file_content) > max_size
+    if isinstance(file_content,list):
+        size=0
+        for i,item in enumerate(file_content):
+            size+=len(str(item))
+            if size > max_size:
+                return file_content[:i],True
+    return file_content,False
+
+def extract_content(pf,filetype:str,max_size=MAX_CONTENT_SIZE,root=None)->dict:
+    """ reads content of a single file using the extractor of its file type,
+        files larger than max_size are only read partially (txt) or not at all
+        returns dict with content, size and truncated flag
+    """
+    try:
+        size=os.path.getsize(pf)
+    except OSError:
+        logger.error(f"File {pf} can't be accessed",exc_info=True)
+        return {"content":None,"size":None,"truncated":False}
+    out={"content":None,"size":size,"truncated":False}
+    extractor=content_extractors.get(filetype)
+    if extractor is None:
+        return out
+    if filetype in EXIF_FILETYPES:
+        load_exif_info(root or Path(pf).parent)
+    if max_size and size > max_size:
+        if extractor is not read_txt_file:
+            logger.info(f"File {pf} ({size} bytes) exceeds max size {max_size}, content is skipped")
+            out["truncated"]=True
+            return out
+        out["content"]=read_txt_file(pf,max_size=max_size)
+        out["truncated"]=True
+        return out
+    try:
+        file_content=extractor(pf)
+    except Exception:
+        logger.error(f"Exception reading content of {pf}",exc_info=True)
+        return out
+    out["content"],out["truncated"]=truncate_content(file_content,max_size)
+    return out
 
+class ContentHandle():
+    """ lazy file content, content is read on first access of content() """
+
+    def __init__(self,pf,filetype:str,max_size=MAX_CONTENT_SIZE,root=None) -> None:
+        self.filepath=pf
+        self.filetype=filetype
+        self._max_size=max_size
+        self._root=root
+        self._info=None
+
+    def _load(self)->dict:
+        if self._info is None:
+            self._info=extract_content(self.filepath,self.filetype,self._max_size,self._root)
+        return self._info
+
+    def content(self):
+        """ file content """
+        return self._load()["content"]
+
+    def size(self)->int:
+        """ file size """
+        return self._load()["size"]
+
+    def truncated(self)->bool:
+        """ content was truncated """
+        return self._load()["truncated"]
+
+    def __repr__(self) -> str:
+        return f"ContentHandle({str(self.filepath)!r})"
+
+def iter_file_info(fp,content=True,type_filters=[],max_size=MAX_CONTENT_SIZE,lazy=False,
+                   max_workers=None,on_folder=None):
+    """ walks the path and yields file info dicts (subpath,filename,filetype) in walk order.
+        contents are read in a thread pool with a bounded number of pending files, files with
+        a content extractor also get content, size and truncated keys (see extract_content).
+        lazy: content is a ContentHandle, size and truncated are read together with the content
+        (ContentHandle.size / truncated). on_folder: function called with each subpath
+    """
+    global _exif_root
+    root=Path(fp).absolute()
+    # exif data is read again (once) for each walk
+    with _exif_lock:
+        _exif_root=None
+    if max_workers is None:
+        max_workers=min(32,(os.cpu_count() or 1)+4)
+
+    def get_file_info(subpath,f,pf,filetype,extracted=None):
+        file_info={"subpath":subpath,"filename":f,"filetype":filetype}
+        if extracted:
+            file_info.update(extracted)
+        elif lazy:
+            file_info["content"]=ContentHandle(pf,filetype,max_size,root)
+        return file_info
 
     logger.debug("READING FILES")
-    # functions to decode
-    for subpath,_,files in os.walk(fp):
-        p_path=Path(subpath).absolute()
-        subpath_info=subpath_dict.get(subpath,{})
-        _=subpath_info.get("files",[])
-        file_dict={}
-        for f in files:
-            pf=Path.joinpath(p_path,f)
-            filetype=pf.suffix[1:]
-            # only process if in filter
-            if bool(type_filters) and not filetype in type_filters:
-                continue
-            #stem=pf.stem
-            #print(f"{f}, suffix: {suffix}, filetype: {filetype},")
-            display_func=displayfunctions_dict.get(filetype)
-            file_content=None
-            if content and display_func:
-                file_content=globals()[display_func](pf)
-            if content:
-                file_dict[f]={"filetype":filetype,"content":file_content}
-            else:
-                file_dict[f]={"filetype":filetype}
-        subpath_info["file_details"]=file_dict
-        subpath_dict[subpath]=subpath_info
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending=deque()
+        # walk absolute path (exiftool changes the working dir), subpaths are returned as in os.walk(fp)
+        for subpath_abs,_,files in os.walk(root):
+            subpath=os.path.relpath(subpath_abs,root)
+            subpath=fp if subpath == "." else os.path.join(fp,subpath)
+            if on_folder:
+                on_folder(subpath)
+            p_path=Path(subpath_abs)
+            for f in files:
+                pf=Path.joinpath(p_path,f)
+                filetype=pf.suffix[1:]
+                # only process if in filter
+                if bool(type_filters) and not filetype in type_filters:
+                    continue
+                if content and not lazy and filetype in content_extractors:
+                    if filetype in EXIF_FILETYPES:
+                        # exiftool changes the working dir of the process: read exif data
+                        # here before the first image job is queued, not in a worker
+                        load_exif_info(root)
+                    future=executor.submit(extract_content,pf,filetype,max_size,root)
+                else:
+                    future=None
+                pending.append((subpath,f,pf,filetype,future))
+                # results are yielded in order, at most max_workers*PENDING_PER_WORKER are pending
+                while pending and (pending[0][4] is None or len(pending) > max_workers*PENDING_PER_WORKER):
+                    subpath_,f_,pf_,filetype_,future_=pending.popleft()
+                    yield get_file_info(subpath_,f_,pf_,filetype_,future_.result() if future_ else None)
+        while pending:
+            subpath_,f_,pf_,filetype_,future_=pending.popleft()
+            yield get_file_info(subpath_,f_,pf_,filetype_,future_.result() if future_ else None)
+
+def save_file_info_jsonl(fp,f_jsonl,content=True,type_filters=[],max_size=MAX_CONTENT_SIZE,max_workers=None)->int:
+    """ streams file info of all files in path to a JSON Lines file (one file per line),
+        returns number of files
+    """
+    n=0
+    with open(f_jsonl,'w',encoding='utf-8') as jsonl_file:
+        for file_info in iter_file_info(fp,content,type_filters,max_size,lazy=False,max_workers=max_workers):
+            jsonl_file.write(json.dumps(file_info,ensure_ascii=False,default=str)+"\n")
+            n+=1
+    logger.info(f"Saved info of {n} files to {f_jsonl}")
+    return n
+
+def read_file_info(fp,content=True,type_filters=[],max_size=None,lazy=False,max_workers=None):
+    """ reading file contents for supported file types
+        max_size: contents are truncated to max_size (None: complete contents)
+        lazy: content is a ContentHandle only read on access
+    """
+    subpath_dict={}
+
+    def add_folder(subpath):
+        subpath_dict[subpath]={"file_details":{}}
+
+    for file_info in iter_file_info(fp,content,type_filters,max_size,lazy,max_workers,on_folder=add_folder):
+        file_details={"filetype":file_info["filetype"]}
+        if content:
+            file_details["content"]=file_info.get("content")
+            if file_info.get("truncated"):
+                file_details["truncated"]=True
+        subpath_dict[file_info["subpath"]]["file_details"][file_info["filename"]]=file_details
     return subpath_dict
 
 def print_file_info(file_info_dict):
@@ -15,7 +15,12 @@
 import json
 import os
 import pprint
+import hashlib
+import itertools
+import time
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
 from subprocess import Popen
 from subprocess import PIPE
 import pandas as pd
@@ -71,6 +76,12 @@ FILTER_DROSTE_DICT = {
 SKIP_TYPES = ["separator","link","note"]
 STRING_PARAM_TYPES = ["text","point"]
 QUOTE = '\"'
+# block size for reading input files when hashing
+HASH_BLOCK_SIZE = 1024 * 1024
+# suffix of gmic output files until the job succeeded
+TMP_SUFFIX = ".tmp"
+# status of jobs that couldn't be run
+JOB_ERROR = -1
 
 def get_param_string_from_dict(filter_dict:dict,params_cust:dict={},
     as_dict:bool=False,verbose:bool=False):
@@ -411,3 +422,139 @@ def rotate_droste(file_path,file_in,file_out,angle=180,cust_params:dict=None):
         file_out_current = file_prefix + "_" + cust_params["Rotate"].zfill(3) + "." + file_ext
         process_image(file_path,file_in,file_out_current,FILTER_DROSTE_DICT,cust_params)
         angle_current += angle
+
+def get_param_variations(filter_dict:dict,param_values:dict):
+    """ expands a dictionary of parameter names and lists of values into a list
+        of custom parameter dictionaries (cartesian product of all values), eg
+        {"Rotate":[0,90],"Zoom":[1,2]} returns 4 parameter sets
+        parameter names not contained in filter are ignored
+    """
+    param_list = get_param_list(filter_dict)
+    param_names = []
+    value_lists = []
+    for param_name,values in param_values.items():
+        if not param_name in param_list:
+            print(f"Parameter {param_name} is not a parameter of filter {filter_dict['name']}")
+            continue
+        param_names.append(param_name)
+        value_lists.append([str(v) for v in values])
+
+    return [dict(zip(param_names,values)) for values in itertools.product(*value_lists)]
+
+def get_file_hash(filepath:str):
+    """ returns sha256 of file contents, file is read in blocks """
+    file_hash = hashlib.sha256()
+    with open(filepath,"rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE),b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+def get_job_list(file_path:str,file_list:list,filter_list:list,param_variations:list=None,
+                 output_path:str=None):
+    """ expands images x filters x parameter sets into a list of job dictionaries
+        file_path: path of input images / working directory of gmic
+        file_list: list of image file names
+        filter_list: list of filter dictionaries
+        param_variations: list of custom parameter dicts (see get_param_variations),
+                          applied to each filter, filter defaults if None
+        output_path: output folder (default: file_path)
+        output file name contains a hash of the input file, filter and parameter string,
+        so that the output file can be used as cache for identical renders
+    """
+    if not param_variations:
+        param_variations = [{}]
+    if output_path is None:
+        output_path = file_path
+    # gmic runs in file_path, cache lookup in the current dir: use absolute paths
+    file_path = os.path.abspath(file_path)
+    output_path = os.path.abspath(output_path)
+
+    job_list = []
+    for file_in in file_list:
+        file_hash = get_file_hash(os.path.join(file_path,file_in))
+        file_stem,file_ext = os.path.splitext(file_in)
+        for filter_dict,cust_params in itertools.product(filter_list,param_variations):
+            command = filter_dict['command']
+            param_str = get_param_string_from_dict(filter_dict,cust_params)
+            cache_key = hashlib.sha256((file_hash+command+param_str).encode()).hexdigest()
+            file_out = os.path.join(output_path,f"{file_stem}_{command}_{cache_key[:12]}{file_ext}")
+            job = {"file_path":file_path,"file_in":file_in,"file_out":file_out,
+                   "filter_name":filter_dict['name'],"command":command,
+                   "param_str":param_str,"cache_key":cache_key}
+            job_list.append(job)
+
+    return job_list
+
+def run_job(job:dict):
+    """ executes a single gmic job (worker function of run_batch)
+        output is written to a temporary file that is renamed only if gmic succeeds,
+        so that failed renders are not used as cache
+        returns job dict with status code, output and processing time
+    """
+    file_root,file_ext = os.path.splitext(job["file_out"])
+    file_tmp = f"{file_root}{TMP_SUFFIX}{file_ext}"
+    command_params = ["gmic","-input",job["file_in"],job["command"],job["param_str"],
+                      "to_rgb","-output",file_tmp]
+    time_start = time.perf_counter()
+    job_result = dict(job)
+    try:
+        process = subprocess.run(command_params,cwd=job["file_path"],capture_output=True,
+                                 text=True,check=False)
+        job_result["status"] = process.returncode
+        job_result["output"] = process.stdout + process.stderr
+    except OSError as e:
+        job_result["status"] = JOB_ERROR
+        job_result["output"] = str(e)
+    if job_result["status"] == 0 and os.path.isfile(file_tmp):
+        os.replace(file_tmp,job["file_out"])
+    elif os.path.isfile(file_tmp):
+        os.remove(file_tmp)
+    job_result["time"] = time.perf_counter() - time_start
+    return job_result
+
+def run_batch(job_list:list,max_workers:int=None,use_cache:bool=True,verbose:bool=True):
+    """ runs a list of jobs (see get_job_list) in a process pool (default size: number
+        of cores). Jobs whose output file already exists are skipped if use_cache is set.
+        Note that the calling script needs a if __name__ == "__main__" guard on Windows
+        returns list of job results with status (None for cached jobs) and time
+    """
+    job_results = []
+    jobs_todo = []
+    for job in job_list:
+        if use_cache and os.path.isfile(job["file_out"]):
+            job_result = dict(job)
+            job_result["status"] = None
+            job_result["time"] = 0.
+            job_results.append(job_result)
+        else:
+            jobs_todo.append(job)
+
+    num_jobs = len(job_list)
+    if verbose:
+        print(f"\n-- BATCH: {num_jobs} jobs, {len(job_results)} cached, "+
+              f"{len(jobs_todo)} to process on {max_workers or os.cpu_count()} workers ----")
+
+    time_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(run_job,job):job for job in jobs_todo}
+        for future in as_completed(futures):
+            try:
+                job_result = future.result()
+            except Exception as e:
+                # failing job (eg broken worker process) doesn't abort the batch
+                job_result = dict(futures[future])
+                job_result["status"] = JOB_ERROR
+                job_result["output"] = f"{type(e).__name__}: {e}"
+                job_result["time"] = 0.
+            job_results.append(job_result)
+            if verbose:
+                print(f"   [{str(len(job_results)).zfill(len(str(num_jobs)))}/{num_jobs}] "+
+                      f"{job_result['filter_name']}: {job_result['file_out']}, "+
+                      f"CODE: {job_result['status']} ({job_result['time']:.2f}s)")
+                if job_result["status"] != 0:
+                    print(job_result["output"])
+
+    if verbose:
+        print(f"-- BATCH FINISHED in {time.perf_counter()-time_start:.2f}s ----------------------")
+
+    return job_results
@@ -3,9 +3,13 @@
 import os
 import json
 import logging
+import subprocess
 
 from json import JSONDecodeError
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageDraw, ImageFont
 
 from tools_console.persistence import Persistence
 from tools_console.cmd_runner import CmdRunner as Runner
@@ -13,6 +17,55 @@ from tools import img_file_info_xls as fi
 
 log = logging.getLogger(__name__)
 
+def render_ana_image(f_in:str,f_out:str,metadata:dict,image_size:int=1000,quality:int=80,
+                     draw_config:dict=None)->tuple:
+    """ renders analysis image in process using Pillow: resized image (width image_size) with
+        focus box and analysis text below, metadata is not copied.
+        returns output file and focus box (None if image couldn't be rendered)
+    """
+    if draw_config is None:
+        draw_config=ImageAnalyzer.PIL_BOX_CONFIG
+    try:
+        with Image.open(f_in) as img:
+            width,height=img.size
+            height_out=max(1,round(height*image_size/width))
+            # jpeg: decoder scales down by power of 2 while decoding
+            img.draft("RGB",(image_size,height_out))
+            img=img.convert("RGB").resize((image_size,height_out),Image.Resampling.LANCZOS)
+    except OSError as e:
+        log.error("Couldn't read image %s (%s)",f_in,e)
+        return None,None
+
+    # focus box for the rendered image size
+    metadata=dict(metadata,ImageWidth=image_size,ImageHeight=height_out)
+    box=ImageAnalyzer.get_focus_box(metadata)
+    draw=ImageDraw.Draw(img)
+    if box:
+        draw.rectangle([tuple(box[0]),tuple(box[2])],outline=draw_config["box_color"],
+                       width=draw_config["stroke_width"])
+
+    # analysis text appended below image
+    text=ImageAnalyzer.create_analysis_text(metadata,cr="\n")
+    try:
+        font=ImageFont.truetype(draw_config["font"],draw_config["font_size"])
+    except OSError:
+        try:
+            font=ImageFont.load_default(size=draw_config["font_size"])
+        except TypeError:
+            # Pillow < 10.1: fixed size bitmap font
+            font=ImageFont.load_default()
+    x0,y0,x1,y1=draw.multiline_textbbox((0,0),text,font=font)
+    margin=draw_config["margin"]
+    img_out=Image.new("RGB",(max(image_size,x1+2*margin),height_out+y1+2*margin),draw_config["background"])
+    img_out.paste(img,(0,0))
+    ImageDraw.Draw(img_out).multiline_text((margin,height_out+margin),text,fill=draw_config["text_color"],font=font)
+    try:
+        img_out.save(f_out,quality=quality)
+    except OSError as e:
+        log.error("Couldn't write image %s (%s)",f_out,e)
+        return None,box
+    return f_out,box
+
 class ImageAnalyzer():
     """ Analyzes Image Metadata and will write output.
     """
@@ -63,6 +116,10 @@ class ImageAnalyzer():
                     "_TRANSPARENCY_":"0.0" }
 
 
+    # settings for focus box and text when rendering with Pillow
+    PIL_BOX_CONFIG={"font":"lucon.ttf","font_size":16,"box_color":"orange","stroke_width":5,
+                    "text_color":"black","background":"white","margin":4}
+
     def __init__(self,fp:str=".") -> None:
         log.debug("start")
         self._exiftool = ImageAnalyzer.CMD_EXIFTOOL
@@ -343,15 +400,86 @@ class ImageAnalyzer():
                 cmd_out=runner.get_output()
                 log.info("Command Line returned: %s",cmd_out)
 
-    def analyze(self)->dict:
+    def read_metadata(self)->list:
+        """ reads metadata of original jpg files with a single exiftool call
+
+        Returns:
+            list: image file metadata (SourceFile is the file name)
+        """
+        log.debug("start")
+        exif_attributes=["-"+a for a in self._exif_attributes]
+        cmd_exif=[self._exiftool,"-json",*exif_attributes,"-c","%.6f","-charset","latin",
+                  "-charset","filename=latin1","-s","-q","-ext","jpg","."]
+        try:
+            process=subprocess.run(cmd_exif,cwd=self._fp,stdout=subprocess.PIPE,check=False)
+        except OSError as e:
+            log.error("Error running exiftool %s",e)
+            return []
+        files_metadata=[]
+        try:
+            files_metadata=json.loads(process.stdout.decode("utf-8",errors="ignore"))
+        except JSONDecodeError as e:
+            err_details={"msg":e.msg,"col":str(e.colno),"line":str(e.lineno)}
+            log.error("JSON Decode Error: %(msg)s error occured in output at column %(col)s, line %(line)s",err_details)
+        for file_metadata in files_metadata:
+            file_metadata["SourceFile"]=Path(file_metadata["SourceFile"]).name
+        return files_metadata
+
+    def render_ana_images(self,image_size:int=1000,quality:int=80,max_workers:int=None)->list:
+        """creates analysis images in process with Pillow in a process pool,
+           original images are decoded downscaled, no temporary files and no change of
+           working directory
+
+        Args:
+            image_size (int, optional): Image width. Defaults to 1000.
+            quality (int, optional): Quality. Defaults to 80.
+            max_workers (int, optional): number of processes. Defaults to cpu count.
+
+        Returns:
+            list: image file metadata
+        """
+        log.debug("start")
+        Path.mkdir(self._p_analysis,exist_ok=True)
+        files_metadata=self.read_metadata()
+        jobs=[]
+        for file_metadata in files_metadata:
+            filename=Path(file_metadata["SourceFile"])
+            filename=filename.stem+"_ana"+filename.suffix
+            file_metadata["TargetFile"]=os.path.join(self._p_analysis,filename)
+            file_metadata["Description"]=ImageAnalyzer.create_analysis_text(file_metadata)
+            jobs.append((os.path.join(self._fp,file_metadata["SourceFile"]),file_metadata["TargetFile"],
+                         dict(file_metadata),image_size,quality))
+        if not jobs:
+            return files_metadata
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results=list(executor.map(render_ana_image,*zip(*jobs)))
+        for file_metadata,(result,box) in zip(files_metadata,results):
+            file_metadata["FocusBox"]=box
+            if result:
+                log.info("Writing file %s",result)
+            else:
+                log.error("Error writing file %s",file_metadata['TargetFile'])
+        return files_metadata
+
+    def analyze(self,use_magick:bool=False,image_size:int=1000,quality:int=80,max_workers:int=None)->dict:
         """ creates analysis images
+        Args:
+            use_magick (bool, optional): render with image magick instead of Pillow. Defaults to False.
+            image_size (int, optional): Image width. Defaults to 1000.
+            quality (int, optional): Quality. Defaults to 80.
+            max_workers (int, optional): number of processes (Pillow). Defaults to cpu count.
         Returns:
             dict: returns the metadata dictionary
         """
         log.debug("start")
+        if not use_magick:
+            metadata = self.render_ana_images(image_size,quality,max_workers)
+            if metadata:
+                Persistence.save_json(os.path.join(self._p_analysis,self._file_meta),metadata)
+            return metadata
         old_cwd=os.getcwd()
         # create small sizze copies in a temporary folder
-        self.copy_images()
+        self.copy_images(image_size,quality)
         metadata = self.create_ana_images()
         os.chdir(self._p_analysis)
         if metadata:
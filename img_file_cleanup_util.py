@@ -2,6 +2,10 @@
 
 import os
 import shutil
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tools import img_file_info_xls as file_info
 
@@ -41,62 +45,253 @@ DELETE_PROFILE={"RAW":{"FILETYPES":FILETYPE_RAW,
                       "IGNORE_PATHS" :IGNORE_PATHS,
                       "DELETE_PATHS" :DELETE_PATHS}}
 
+# file operations of the cleanup engine
+OP_DELETE="delete"
+OP_RMDIR="rmdir"
+OP_MKDIR="mkdir"
+OP_MOVE="move"
+# journal of cleanup operations in root folder, used to resume or rollback a cleanup
+JOURNAL_FILE=".img_cleanup_journal.jsonl"
+# parallel file operations (helps on network drives)
+MAX_WORKERS=8
+
 # move folder destination for given filetype
 FILETYPE_TARGET_FOLDER={"jpg":"70POST",
                         "arw":"10RAW",
                         "dng":"10PANO",
                         "insp":"10PANO"}
 
-def delete(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
-                 save:bool=True,verbose:bool=True,ignore_files:list=IGNORE_FILES,
-                 ignore_paths:list=IGNORE_PATHS,delete_paths:list=DELETE_PATHS,
-                 del_filetypes:list=FILETYPE_DEL,
-                 force_fld_del:bool=True)->list:
+def _is_done(op:dict)->bool:
+    """ checks whether operation was already executed (finished before its journal entry was written) """
+    op_type=op["op"]
+    if op_type in [OP_DELETE,OP_RMDIR]:
+        return not os.path.exists(op["from"])
+    if op_type==OP_MOVE:
+        return not os.path.exists(op["from"]) and os.path.exists(op["to"])
+    if op_type==OP_MKDIR:
+        return os.path.isdir(op["from"])
+    return False
+
+def _run_op(op:dict,resume:bool=False)->int:
+    """ executes a single file operation, returns number of freed bytes,
+        None if operation is skipped (move target exists)
     """
-    Recursively deletes files and folders in a selective manner
+    if resume and _is_done(op):
+        return 0
+    op_type=op["op"]
+    if op_type==OP_DELETE:
+        size=os.stat(op["from"]).st_size
+        os.remove(op["from"])
+        return size
+    if op_type==OP_MOVE:
+        if os.path.exists(op["to"]):
+            return None
+        os.rename(op["from"],op["to"])
+    elif op_type==OP_MKDIR:
+        os.mkdir(op["from"])
+    elif op_type==OP_RMDIR:
+        os.rmdir(op["from"])
+    return 0
+
+def _write_journal(fp_journal,entries:list,lock=None,mode="a"):
+    """ appends entries as json lines to journal """
+    if fp_journal is None:
+        return
+    lines="".join([json.dumps(e)+"\n" for e in entries])
+    if lock is None:
+        lock=threading.Lock()
+    with lock:
+        with open(fp_journal,mode,encoding="utf-8") as f:
+            f.write(lines)
+            f.flush()
+
+def read_journal(fp_journal:str)->dict:
+    """ reads cleanup journal, returns dict with plan (list of operations),
+        done (dict index:freed bytes), skipped (list of indices) and failed (dict index:error)
+    """
+    journal={"plan":[],"done":{},"skipped":[],"failed":{}}
+    with open(fp_journal,encoding="utf-8") as f:
+        for line in f:
+            # last line might be incomplete after interruption
+            try:
+                entry=json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "plan" in entry:
+                journal["plan"]=entry["plan"]
+            elif "done" in entry:
+                journal["done"][entry["done"]]=entry.get("bytes",0)
+                journal["failed"].pop(entry["done"],None)
+            elif "skipped" in entry:
+                journal["skipped"].append(entry["skipped"])
+                journal["failed"].pop(entry["skipped"],None)
+            elif "failed" in entry:
+                journal["failed"][entry["failed"]]=entry.get("error")
+    return journal
+
+def execute_operations(operations:list,fp_journal:str=None,max_workers:int=MAX_WORKERS,
+                       verbose:bool=True,done:dict=None,overwrite_journal:bool=False)->dict:
+    """
+    Executes file operations: folders are created first, then files are moved / deleted
+    in parallel, then folders are removed (deepest folders first). Each finished operation
+    is written to the journal, so that an interrupted cleanup can be resumed / rolled back.
+    Moves onto existing files are skipped, on resume operations that were executed but not
+    journaled before the interruption count as done
     Parameters:
-        fp (str): directory root
-        filetype_classes_dict (dict): dictionary to outline additional metrics in file dict
-        save (bool): persist changes
+        operations (list): list of dicts {"op":delete|move|mkdir|rmdir,"from":path,"to":path}
+        fp_journal (str): journal file (None: no journal)
+        max_workers (int): number of parallel file operations
         verbose (bool): output information
-        ignore_files (list): list of files not to be deleted
-        ignore_paths (list): list of paths not to be deleted
-        delete_paths (list): path substrings to indicate folders to be deleted
-        del_filetypes (list): file type extensions that should be deleted
-        force_fld_del (bool): Force deletion of folders even if it contains ignore files
+        done (dict): index:freed bytes of operations already done or skipped (resume)
+        overwrite_journal (bool): start even if a journal of an interrupted cleanup exists
     Returns:
-        dict: list of deleted files and folders
-
+        dict: report with number of operations, skipped and failed operations, freed bytes
+              and operations per second
+    """
+    resume=done is not None
+    if done is None:
+        # journal of an interrupted cleanup is the only way to resume / rollback it
+        if fp_journal and os.path.isfile(fp_journal) and not overwrite_journal:
+            raise FileExistsError(f"JOURNAL EXISTS: {fp_journal}, resume / rollback it or set overwrite_journal")
+        done={}
+        _write_journal(fp_journal,[{"plan":operations}],mode="w")
+    lock=threading.Lock()
+    report={"num_ops":0,"num_skipped":0,"num_failed":0,"bytes_freed":0,"skipped":[],"failed":[]}
+    start=time.perf_counter()
+
+    def run(i):
+        op=operations[i]
+        try:
+            size=_run_op(op,resume)
+        except OSError as e:
+            _write_journal(fp_journal,[{"failed":i,"error":str(e)}],lock)
+            return i,None,e
+        if size is None:
+            _write_journal(fp_journal,[{"skipped":i}],lock)
+        else:
+            _write_journal(fp_journal,[{"done":i,"bytes":size}],lock)
+        return i,size,None
+
+    todo=[i for i in range(len(operations)) if i not in done]
+    mkdirs=sorted([i for i in todo if operations[i]["op"]==OP_MKDIR],key=lambda i:len(Path(operations[i]["from"]).parts))
+    files=[i for i in todo if operations[i]["op"] in [OP_MOVE,OP_DELETE]]
+    rmdirs=sorted([i for i in todo if operations[i]["op"]==OP_RMDIR],key=lambda i:-len(Path(operations[i]["from"]).parts))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # folders depend on each other, files not
+        results=[run(i) for i in mkdirs]
+        results.extend(executor.map(run,files))
+        results.extend([run(i) for i in rmdirs])
+    for i,size,error in results:
+        if error is None and size is None:
+            report["num_skipped"]+=1
+            report["skipped"].append(operations[i])
+            if verbose:
+                print(f"    FILE EXISTS: {operations[i]['to']}")
+        elif error is None:
+            report["num_ops"]+=1
+            report["bytes_freed"]+=size
+        else:
+            report["num_failed"]+=1
+            report["failed"].append({**operations[i],"error":str(error)})
+            if verbose:
+                print(f"    FAILED {operations[i]['op']} {operations[i]['from']}: {error}")
+    report["time"]=round(time.perf_counter()-start,3)
+    report["ops_per_sec"]=round(report["num_ops"]/report["time"],1) if report["time"]>0 else 0
+    if verbose:
+        print(f"*   EXECUTED ({report['num_ops']}) OPERATIONS, ({report['num_skipped']}) SKIPPED, ({report['num_failed']}) FAILED")
+        print(f"    FREED {report['bytes_freed']/1024/1024:.1f} MB, {report['ops_per_sec']} OPERATIONS/s")
+    return report
+
+def _finish_journal(fp_journal,report:dict,keep_journal:bool)->None:
+    """ removes journal after successful execution """
+    if fp_journal and report["num_failed"]==0 and not keep_journal:
+        os.remove(fp_journal)
+
+def resume(fp_journal:str,max_workers:int=MAX_WORKERS,verbose:bool=True,keep_journal:bool=False)->dict:
+    """ resumes interrupted cleanup from journal (failed operations are retried), returns report """
+    journal=read_journal(fp_journal)
+    if verbose:
+        print(f"*   RESUME {fp_journal}, ({len(journal['done'])}/{len(journal['plan'])}) DONE")
+    done={**journal["done"],**{i:0 for i in journal["skipped"]}}
+    report=execute_operations(journal["plan"],fp_journal,max_workers,verbose,done=done)
+    _finish_journal(fp_journal,report,keep_journal)
+    return report
+
+def rollback(fp_journal:str,verbose:bool=True)->dict:
+    """ reverts moves and created folders of a journaled cleanup (deleted files can't be restored),
+        operations executed but not journaled before an interruption are reverted as well
     """
+    journal=read_journal(fp_journal)
+    operations=journal["plan"]
+    done=list(journal["done"].keys())
+    done.extend([i for i,op in enumerate(operations) if i not in journal["done"]
+                 and i not in journal["skipped"] and _is_done(op)])
+    reverse_ops=[]
+    num_deleted=0
+    for i in reversed(done):
+        op=operations[i]
+        if op["op"]==OP_MOVE:
+            reverse_ops.append({"op":OP_MOVE,"from":op["to"],"to":op["from"]})
+        elif op["op"]==OP_MKDIR:
+            reverse_ops.append({"op":OP_RMDIR,"from":op["from"]})
+        elif op["op"]==OP_RMDIR:
+            reverse_ops.append({"op":OP_MKDIR,"from":op["from"]})
+        else:
+            num_deleted+=1
+    if verbose and num_deleted:
+        print(f"    ({num_deleted}) DELETED FILES CAN'T BE RESTORED")
+    report=execute_operations(reverse_ops,None,verbose=verbose)
+    if report["num_failed"]==0 and report["num_skipped"]==0:
+        os.remove(fp_journal)
+    return report
+
+def _execute(fp:str,operations:list,journal:str,max_workers:int,keep_journal:bool,verbose:bool,
+             overwrite_journal:bool)->dict:
+    """ executes planned operations with journal in root folder by default """
+    if journal is None:
+        journal=os.path.join(fp,JOURNAL_FILE)
+    report=execute_operations(operations,journal,max_workers,verbose,overwrite_journal=overwrite_journal)
+    _finish_journal(journal,report,keep_journal)
+    return report
+
+def _is_ignored_path(folder:str,ignore_paths:list)->bool:
+    """ checks whether folder name contains any of the (lower case) ignore paths """
+    folder=folder.lower()
+    return any([ip in folder for ip in ignore_paths])
+
+def plan_delete(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,verbose:bool=True,
+                ignore_files:list=IGNORE_FILES,ignore_paths:list=IGNORE_PATHS,
+                delete_paths:list=DELETE_PATHS,del_filetypes:list=FILETYPE_DEL,
+                force_fld_del:bool=True)->dict:
+    """ plans deletion (see delete), returns dict with lists of folders and files to be deleted """
     file_dict = file_info.get_file_dict(fp,regex_file_rules_dict={},
                             filetype_classes_dict=filetype_classes_dict)
-    del_filetypes=[ft.lower() for ft in del_filetypes]
+    del_filetypes={ft.lower() for ft in del_filetypes}
+    ignore_files_set=set(ignore_files)
+    ignore_files_lower={fi.lower() for fi in ignore_files}
+    ignore_paths=[ip.lower() for ip in ignore_paths]
 
     file_delete_list=[]
     folder_delete_list=[]
-    filetypes_del_dict={}
 
     for fp,fp_info in file_dict.items():
         p = Path(fp)
         folder=p.stem
-        #parent=fp_info["parent"].stem
         file_list=fp_info["files"]
 
         # skip folder if it's an ignore folder
-        if len([ip for ip in ignore_paths if ip.lower() in folder.lower()]) > 0:
+        if _is_ignored_path(folder,ignore_paths):
             if verbose:
                 print(f"*   SKIP    {fp}")
             continue
 
         # check if it's a delete folder
-        if len([dp for dp in delete_paths if dp in folder]) > 0:
+        if any([dp in folder for dp in delete_paths]):
             # delete all files in folder except ignore files
             if force_fld_del:
                 ignored_files = []
             else:
-                ignored_files=[f for f in file_list
-                                for fi in ignore_files
-                                if  fi.lower() == f.lower()]
+                ignored_files=[f for f in file_list if f.lower() in ignore_files_lower]
             delete_files=[os.path.join(p,f) for f in file_list if f not in ignored_files]
 
             if len(ignored_files)==0:
@@ -117,21 +312,54 @@ def delete(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
             if verbose:
                 print(f"#   DELETE FILES\n    {fp}")
             for f in file_list:
-                if f in ignore_files:
+                if f in ignore_files_set:
                     continue
-
-                filetype=Path(f).suffix[1:].lower()
+                filetype=os.path.splitext(f)[1][1:].lower()
                 if filetype in del_filetypes:
                     print(f"    - delete {f}")
                     file_delete_list.append(os.path.join(p,f))
 
+    return {"folders":folder_delete_list,"files":file_delete_list}
+
+def delete(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
+                 save:bool=True,verbose:bool=True,ignore_files:list=IGNORE_FILES,
+                 ignore_paths:list=IGNORE_PATHS,delete_paths:list=DELETE_PATHS,
+                 del_filetypes:list=FILETYPE_DEL,
+                 force_fld_del:bool=True,journal:str=None,max_workers:int=MAX_WORKERS,
+                 keep_journal:bool=False,overwrite_journal:bool=False)->list:
+    """
+    Recursively deletes files and folders in a selective manner
+    Parameters:
+        fp (str): directory root
+        filetype_classes_dict (dict): dictionary to outline additional metrics in file dict
+        save (bool): persist changes
+        verbose (bool): output information
+        ignore_files (list): list of files not to be deleted
+        ignore_paths (list): list of paths not to be deleted
+        delete_paths (list): path substrings to indicate folders to be deleted
+        del_filetypes (list): file type extensions that should be deleted
+        force_fld_del (bool): Force deletion of folders even if it contains ignore files
+        journal (str): journal file to resume an interrupted cleanup (default JOURNAL_FILE in fp)
+        max_workers (int): number of parallel file operations
+        keep_journal (bool): keep journal after successful cleanup
+        overwrite_journal (bool): start even if a journal of an interrupted cleanup exists
+    Returns:
+        dict: list of deleted files and folders (and execution report)
+
+    """
+    plan=plan_delete(fp,filetype_classes_dict,verbose,ignore_files,ignore_paths,
+                     delete_paths,del_filetypes,force_fld_del)
+    file_delete_list=plan["files"]
+    folder_delete_list=plan["folders"]
+
     if verbose:
+        filetypes_del_dict={}
         print("\n########################### ")
         print(f"#   DELETE FOLDERS ({len(folder_delete_list)})")
         for p in folder_delete_list:
             print(f"-   {p}")
         for f in file_delete_list:
-            suffix = Path(f).suffix[1:]
+            suffix = os.path.splitext(f)[1][1:]
             filetypes_del_dict[suffix]=filetypes_del_dict.get(suffix,0)+1
         print(f"#   DELETE FILES ({len(file_delete_list)})")
         for ft,ft_num in filetypes_del_dict.items():
@@ -141,43 +369,26 @@ def delete(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
     if save:
         if (len(folder_delete_list)+len(file_delete_list))>0:
             if input("Delete (y): ")=="y":
-                num_del=0
-                for f in file_delete_list:
-                    os.remove(f)
-                    num_del+=1
-                print(f"* DELETED ({num_del}) FILES")
-                num_del=0
-                for p in folder_delete_list:
-                    os.rmdir(p)
-                    num_del+=1
-                print(f"* DELETED ({num_del}) FOLDERS")
+                operations=[{"op":OP_DELETE,"from":f} for f in file_delete_list]
+                operations.extend([{"op":OP_RMDIR,"from":p} for p in folder_delete_list])
+                plan["report"]=_execute(fp,operations,journal,max_workers,keep_journal,verbose,
+                                        overwrite_journal)
 
-    return {"folders":folder_delete_list,"files":file_delete_list}
-
-def move(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
-               ignore_paths:list=IGNORE_PATHS,
-               ignore_files:list=IGNORE_FILES,
-               filetype_target_folder:dict=FILETYPE_TARGET_FOLDER,
-               save:bool=True,verbose:bool=True)->list:
-    """
-    Recursively move files and folders in a selective manner
-    Parameters:
-        fp (str): directory root
-        filetype_classes_dict (dict): dictionary to outline additional metrics in file dict
-        ignore_paths (list): list of paths not to be moved
-        ignore_files (list): list of files not to be moved
-        filetype_target_folder (dict): assignment to which subfolder a file needs to be moved
-        save (bool): persist changes
-        verbose (bool): output information
-    Returns:
-        dict: list of moved files and created folders
-
-    """
+    return plan
 
+def plan_move(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
+              ignore_paths:list=IGNORE_PATHS,ignore_files:list=IGNORE_FILES,
+              filetype_target_folder:dict=FILETYPE_TARGET_FOLDER,verbose:bool=True)->dict:
+    """ plans file moves (see move), returns dict with lists of folders to be created and file moves """
     file_dict = file_info.get_file_dict(fp,regex_file_rules_dict={},
                             filetype_classes_dict=filetype_classes_dict)
 
     ignore_paths=[ip.lower() for ip in ignore_paths]
+    ignore_files_lower={fi.lower() for fi in ignore_files}
+    # suffix: filetypes of target folder dict
+    suffix_filetypes={}
+    for filetype in filetype_target_folder.keys():
+        suffix_filetypes.setdefault(filetype.lower(),[]).append(filetype)
 
     folder_create_list=[]
     file_moves_list=[]
@@ -189,38 +400,63 @@ def move(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
         folder=p.stem
 
         # ignore path, do not process this folder
-        if sum([1 for ip in ignore_paths if ip in folder.lower()]) > 0:
+        if _is_ignored_path(folder,ignore_paths):
             continue
 
-        file_list=fp_info["files"]
-        file_list_filter=[]
-
-        # filter any files that are not to be moved
-        for f in file_list:
-            if len([f for fi in ignore_files if fi.lower() == f.lower()]) == 0:
-                file_list_filter.append(f)
-        file_list=file_list_filter
+        # move files grouped by file type, files that are not to be moved are filtered
+        move_files_dict={}
+        for f in fp_info["files"]:
+            if f.lower() in ignore_files_lower:
+                continue
+            for filetype in suffix_filetypes.get(os.path.splitext(f)[1][1:].lower(),[]):
+                move_files_dict.setdefault(filetype,[]).append(f)
 
         for filetype,target_path in filetype_target_folder.items():
-
-            move_files = [f for f in file_list if Path(f).suffix[1:].lower() == filetype.lower()]
+            move_files=move_files_dict.get(filetype)
             if move_files:
 
                 target_fullpath=os.path.join(p,target_path)
 
                 # create directory if not there
-                if not os.path.isdir(target_fullpath):
+                if not os.path.isdir(target_fullpath) and target_fullpath not in folder_create_list:
                     folder_create_list.append(target_fullpath)
 
                 # create move paths
-                files_from=[os.path.join(p,f) for f in move_files]
-                files_to=[os.path.join(p,target_fullpath,f) for f in move_files]
-                file_moves=list(zip(files_from,files_to))
-                file_move_list=[{"from":f[0],"to":f[1]} for f in file_moves]
+                file_move_list=[{"from":os.path.join(p,f),"to":os.path.join(target_fullpath,f)} for f in move_files]
                 file_moves_list.extend(file_move_list)
                 if verbose and len(file_move_list)>0:
                     print(f"    Moving {len(file_move_list)} ({filetype}) files to ..\\{target_path}")
 
+    return {"folders":folder_create_list,"files":file_moves_list}
+
+def move(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
+               ignore_paths:list=IGNORE_PATHS,
+               ignore_files:list=IGNORE_FILES,
+               filetype_target_folder:dict=FILETYPE_TARGET_FOLDER,
+               save:bool=True,verbose:bool=True,journal:str=None,
+               max_workers:int=MAX_WORKERS,keep_journal:bool=False,overwrite_journal:bool=False)->list:
+    """
+    Recursively move files and folders in a selective manner
+    Parameters:
+        fp (str): directory root
+        filetype_classes_dict (dict): dictionary to outline additional metrics in file dict
+        ignore_paths (list): list of paths not to be moved
+        ignore_files (list): list of files not to be moved
+        filetype_target_folder (dict): assignment to which subfolder a file needs to be moved
+        save (bool): persist changes
+        verbose (bool): output information
+        journal (str): journal file to resume / rollback moves (default JOURNAL_FILE in fp)
+        max_workers (int): number of parallel file operations
+        keep_journal (bool): keep journal after successful moves (for rollback)
+        overwrite_journal (bool): start even if a journal of an interrupted cleanup exists
+    Returns:
+        dict: list of moved files and created folders (and execution report)
+
+    """
+    plan=plan_move(fp,filetype_classes_dict,ignore_paths,ignore_files,filetype_target_folder,verbose)
+    folder_create_list=plan["folders"]
+    file_moves_list=plan["files"]
+
     if verbose:
         print("\n########################### ")
         print(f"#   NEW FOLDERS ({len(folder_create_list)})")
@@ -232,22 +468,12 @@ def move(fp:str,filetype_classes_dict:dict=FILETYPE_CLASSES_DICT,
     if save:
         if (len(folder_create_list)+len(file_moves_list))>0:
             if input("Move (y)? ")=="y":
-                num_move=0
-                for p in folder_create_list:
-                    os.mkdir(p)
-                    num_move+=1
-                print(f"*   CREATED ({num_move}) FOLDERS")
-
-                num_move=0
-                for f in file_moves_list:
-                    if os.path.isfile(f["to"]):
-                        print(f"    FILE EXISTS: {f['to']}")
-                        continue
-                    os.rename(f["from"],f["to"])
-                    num_move+=1
-                print(f"*   MOVED ({num_move}) FILES")
+                operations=[{"op":OP_MKDIR,"from":p} for p in folder_create_list]
+                operations.extend([{"op":OP_MOVE,**f} for f in file_moves_list])
+                plan["report"]=_execute(fp,operations,journal,max_workers,keep_journal,verbose,
+                                        overwrite_journal)
 
-    return {"folders":folder_create_list,"files":file_moves_list}
+    return plan
 
 def copy_img_file(fp:str,geo_file:str="gps.jpg",
                   verbose:bool=True,save:bool=True)->list:
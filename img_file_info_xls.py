@@ -12,6 +12,7 @@ from PIL.ExifTags import TAGS
 from image_meta.geo import Geo
 from image_meta.exif import ExifTool
 from image_meta.persistence import Persistence
+from tools.util.geo_cache import GeoCache
 
 import json
 import os
@@ -19,6 +20,7 @@ import re
 import shlex
 import shutil
 import subprocess
+import tempfile
 import traceback
 import time
 import datetime
@@ -26,17 +28,34 @@ import logging
 from datetime import datetime as DateTime
 from datetime import date
 from pathlib import Path
-from bs4 import BeautifulSoup as bs
+from concurrent.futures import ThreadPoolExecutor
+import xml.etree.ElementTree as ET
 import pandas as pd
+import numpy as np
 # import lxml.etree as etree
 import pytz
 import pprint
 # from pytz import timezone
 from tools import img_file_info_xls as img_file
-import codecs
 
 URL_OSM="https://www.openstreetmap.org/#map=16/lat/lon"
 
+# persistent reverse geocoding cache, max distance (km) of cached coordinates
+GEO_CACHE_FILE=os.path.join(Path.home(),".img_geo_cache.json")
+GEO_CACHE_RADIUS=0.1
+# min seconds between nominatim requests
+GEO_REQUEST_INTERVAL=2
+
+# GPX point elements (waypoints, track points, route points)
+GPX_WAYPOINT="wpt"
+GPX_TRACKPOINT="trkpt"
+GPX_ROUTEPOINT="rtept"
+GPX_POINTS=[GPX_WAYPOINT,GPX_TRACKPOINT,GPX_ROUTEPOINT]
+# timezone offset of gpx timestamps
+REGEX_TIME_OFFSET=re.compile(r"[+-]\d{2}:?\d{2}$")
+# earth radius in km
+EARTH_RADIUS=6371.0
+
 
 
 # Relevant fields
@@ -72,6 +91,7 @@ IGNORE_FOLDERS=["insp","post"]
 
 # gets the first number sequence in file name = index ddddddddd_xx_yyyy_ddd_
 REGEX_FILE_NUMBER=r"^(\d+)?_.+?_(\d+)"
+REGEX_FILE_NUMBER_COMPILED=re.compile(REGEX_FILE_NUMBER)
 
 # Regex for Date Prefix YYYYMMDD_
 REGEX_DATE_PREFIX=r"^(\d{8})_"
@@ -142,9 +162,6 @@ CMD_EXIF_CHANGE_ATTRIBUTES='EXIFTOOL EXIF_ATTRIBUTES TARGET'
 # delete all metadata recursively
 CMD_EXIF_DELETE_ALL='EXIFTOOL -all= -r * -ext jpg'
 
-# exiftool command to copy over metadata from one file to the other
-CMD_EXIF_COPY_SINGLE='EXIFTOOL -TagsFromFile SRC_FILE "-all:all>all:all" TRG_FILE'
-
 # read all metadata recursively for jpg files
 CMD_EXIF_READ_RECURSIVE_TEMPLATE='EXIFTOOL -j EXIF_ATTRIBUTES -c "%.6f" -charset latin -s -r -Directory * -ext jpg'
 
@@ -152,6 +169,13 @@ CMD_EXIF_READ_RECURSIVE_TEMPLATE='EXIFTOOL -j EXIF_ATTRIBUTES -c "%.6f" -charset
 # read all metadata recursively for image files
 CMD_EXIF_READ_ALL_RECURSIVE_TEMPLATE='EXIFTOOL -j EXIF_ATTRIBUTES -c "%.6f" -L -s -r -n -Directory *'
 
+# exiftool argfile arguments to copy over metadata, one -execute block per file
+ARGS_EXIF_COPY=["-TagsFromFile","SRC_FILE","-all:all>all:all","TRG_FILE","-execute"]
+# number of copy operations per exiftool call
+EXIF_COPY_BATCH_SIZE=500
+# counts successful copies in exiftool output
+REGEX_EXIF_FILES_UPDATED=re.compile(r"^\s*(\d+) image files updated",re.M)
+
 # CMD EXIFTOOL COMMAND TO COPY GPS CORDINATES from '
 CMD_EXIFTOOL_GPS='EXIFTOOL -geosync=TIME_OFFSET -geotag "*.LOGTYPE" "*.FILETYPE"'
 
@@ -347,89 +371,138 @@ def read_exif(f:str,exif_fields:str=ALL_EXIF_TAGS,software:str=SOFTWARE,
     #return out_dict
     return out_dict
 
-def get_subpath_info_dict(fp:str,type_raw=TYPE_RAW,type_meta=TYPE_META,
-                        type_jpg=TYPE_JPG,type_cleanup=TYPE_CLEANUP):
-    """ reads file information in a given folder path """
-    print(f"*** Check Image Files in {fp} ***")
-    p_root=Path(fp)
-    subpath_dict={}
-    for subpath,_,files in os.walk(fp):
-        # get aboslute path
-        processed_file_checked=False
-        for f in files:
-
-            # print(Path(subpath).is_relative_to(p_root))
-            # only consider direct parent paths
-            if Path(subpath).parent!=p_root:
-                continue
-
-            p_img_parent_folder = Path(subpath).stem
-            subpath_info=subpath_dict.get(p_img_parent_folder,{})
-            subpath_info["subpath"]=subpath
-
-            num_files=subpath_info.get("num_files",0)
-            subpath_info["num_files"]=num_files+1
-            f_absolute=os.path.join(subpath,f)
-            p=Path(f)
-            f_stem=p.stem
-
-            suffix = ""
-            if len(p.suffix) >= 1:
-                suffix_list=subpath_info.get("suffix_list",[])
-                suffix=p.suffix[1:]
-                if not suffix in suffix_list:
-                    suffix_list.append(suffix)
-                subpath_info["suffix_list"]=suffix_list
-
-            # check for a single exported file whether it already contains metadata
-            needs_jpg_export=subpath_info.get("needs_jpg_export",True)
-            if suffix.lower() in type_jpg:
-                needs_jpg_export = False
-                # check file for first occurence
-                if not processed_file_checked:
-                    subpath_info["checked_jpg"]=f
-                    file_exif=read_exif(f_absolute)
-                    subpath_info["Software"]=file_exif.get("Software",None)
-                    subpath_info["Make"]=file_exif.get("Make",None)
-                    subpath_info["Model"]=file_exif.get("Model",None)
-                    subpath_info["LensModel"]=file_exif.get("LensModel",None)
-                    subpath_info["url_gps"]=file_exif.get("url_gps",None)
-                    subpath_info["ImageDescription"]=file_exif.get("ImageDescription",None)
-                    subpath_info["DateTimeOriginal"]=file_exif.get("DateTimeOriginal",None)
-                    subpath_info["has_gps"]=file_exif.get("has_gps",None)
-                    subpath_info["has_description"]=file_exif.get("has_description",None)
-                    subpath_info["edited"]=file_exif.get("edited",None)
-                processed_file_checked=True
-            subpath_info["needs_jpg_export"]=needs_jpg_export
-
-            contains_raw=subpath_info.get("contains_raw",False)
-            if suffix.lower() in type_raw:
-                contains_raw = True
-            subpath_info["contains_raw"] = contains_raw
-
-            needs_rename=subpath_info.get("needs_rename",False)
+def scan_folders(fp:str,max_level:int=None):
+    """ scans folder tree top down with os.scandir, yields (subpath,level,files,num_entries)
+        for each folder (level 0 is fp), subfolders deeper than max_level are not scanned
+        (same folder order as os.walk, symbolic links to folders are not followed)
+    """
+    stack=[(fp,0)]
+    while stack:
+        subpath,level=stack.pop()
+        files=[]
+        subfolders=[]
+        num_entries=0
+        try:
+            with os.scandir(subpath) as entries:
+                for entry in entries:
+                    num_entries+=1
+                    try:
+                        is_dir=entry.is_dir()
+                    except OSError:
+                        is_dir=False
+                    if not is_dir:
+                        files.append(entry.name)
+                    elif not entry.is_symlink() and (max_level is None or level<max_level):
+                        subfolders.append(entry.path)
+        except OSError as e:
+            log.warning(f"Can't scan folder {subpath}: {e}")
+            continue
+        yield subpath,level,files,num_entries
+        stack.extend([(f,level+1) for f in reversed(subfolders)])
 
+def get_regex_matcher(regex_file_rules_dict:dict=REGEX_RULE_DICT):
+    """ one compiled (case insensitive) matcher for all regex rules, returns function
+        filename -> list of matching rules (rules are evaluated with re.match)
+    """
+    rules=list(regex_file_rules_dict.keys())
+    regex_list=list(regex_file_rules_dict.values())
+    # each rule as optional lookahead, so all rules are evaluated in one match
+    regex_all="".join([f"(?:(?=(?P<r{i}>{regex})))?" for i,regex in enumerate(regex_list)])
+    try:
+        if any([re.search(r"\\\d|\(\?P=|\(\?[aiLmsux]+\)",regex) for regex in regex_list]):
+            raise re.error("backreferences / global flags can't be combined")
+        matcher=re.compile(regex_all,re.I)
+        group_names=[f"r{i}" for i in range(len(rules))]
+        def match(f:str)->list:
+            m=matcher.match(f)
+            return [rule for rule,group in zip(rules,group_names) if m.group(group) is not None]
+    except re.error:
+        # rules that can't be combined are matched one by one
+        regex_compiled=[(rule,re.compile(regex,re.I)) for rule,regex in regex_file_rules_dict.items()]
+        def match(f:str)->list:
+            return [rule for rule,regex in regex_compiled if regex.match(f) is not None]
+    return match
+
+def get_suffix_class_map(filetype_classes_dict:dict=FILETYPE_CLASSES_DICT)->dict:
+    """ maps (lower case) suffix to list of filetype classes """
+    suffix_class_map={}
+    for filetype_class,filetype_list in filetype_classes_dict.items():
+        for file_type in filetype_list:
+            suffix_class_map.setdefault(file_type.lower(),[]).append(filetype_class)
+    return suffix_class_map
+
+def get_subpath_info(subpath:str,files:list,subpath_info:dict=None,type_raw=TYPE_RAW,type_meta=TYPE_META,
+                     type_jpg=TYPE_JPG,type_cleanup=TYPE_CLEANUP)->dict:
+    """ image processing status of the files of a folder """
+    if subpath_info is None:
+        subpath_info={}
+    type_raw=set(type_raw)
+    type_meta=set(type_meta)
+    type_jpg=set(type_jpg)
+    type_cleanup=set(type_cleanup)
+    processed_file_checked=False
+    for f in files:
+        subpath_info["subpath"]=subpath
+        subpath_info["num_files"]=subpath_info.get("num_files",0)+1
+        f_stem,suffix=os.path.splitext(f)
+        if suffix=="" and f.startswith("."):
+            f_stem,suffix=f,""
+        suffix=suffix[1:]
+        if suffix:
+            suffix_list=subpath_info.get("suffix_list",[])
+            if not suffix in suffix_list:
+                suffix_list.append(suffix)
+            subpath_info["suffix_list"]=suffix_list
+        suffix=suffix.lower()
+
+        # check for a single exported file whether it already contains metadata
+        needs_jpg_export=subpath_info.get("needs_jpg_export",True)
+        if suffix in type_jpg:
+            needs_jpg_export = False
+            # check file for first occurence
+            if not processed_file_checked:
+                subpath_info["checked_jpg"]=f
+                file_exif=read_exif(os.path.join(subpath,f))
+                for exif_key in ["Software","Make","Model","LensModel","url_gps","ImageDescription",
+                                 "DateTimeOriginal","has_gps","has_description","edited"]:
+                    subpath_info[exif_key]=file_exif.get(exif_key,None)
+            processed_file_checked=True
+        subpath_info["needs_jpg_export"]=needs_jpg_export
+
+        contains_raw=subpath_info.get("contains_raw",False)
+        needs_rename=subpath_info.get("needs_rename",False)
+        if suffix in type_raw:
+            contains_raw = True
             # for ease of implementation check for length
             # check with regex for out of cam patterns
-            if suffix.lower() in type_raw:
-                if len(f_stem)==8 or len(f_stem)==26:
-                    needs_rename=True
-            subpath_info["needs_rename"]=needs_rename
-
-            # check whether files need to be cleaned up
-            #print("STEM FUFFIX",f_stem,suffix)
-            needs_cleanup=subpath_info.get("needs_cleanup",False)
-            # check for metadata
-            if suffix.lower() in type_meta:
-                if f_stem not in ["default","metadata","metadata_exif"]:
-                    needs_cleanup = True
-            if suffix.lower() in type_cleanup:
+            if len(f_stem)==8 or len(f_stem)==26:
+                needs_rename=True
+        subpath_info["contains_raw"] = contains_raw
+        subpath_info["needs_rename"]=needs_rename
+
+        # check whether files need to be cleaned up
+        needs_cleanup=subpath_info.get("needs_cleanup",False)
+        # check for metadata
+        if suffix in type_meta:
+            if f_stem not in ["default","metadata","metadata_exif"]:
                 needs_cleanup = True
+        if suffix in type_cleanup:
+            needs_cleanup = True
+        subpath_info["needs_cleanup"]=needs_cleanup
+    return subpath_info
 
-            subpath_info["needs_cleanup"]=needs_cleanup
-
-            subpath_dict[p_img_parent_folder]=subpath_info
-
+def get_subpath_info_dict(fp:str,type_raw=TYPE_RAW,type_meta=TYPE_META,
+                        type_jpg=TYPE_JPG,type_cleanup=TYPE_CLEANUP):
+    """ reads file information in a given folder path """
+    print(f"*** Check Image Files in {fp} ***")
+    subpath_dict={}
+    # only direct subpaths are considered
+    for subpath,level,files,_ in scan_folders(fp,max_level=1):
+        if level!=1 or not files:
+            continue
+        p_img_parent_folder = Path(subpath).stem
+        subpath_dict[p_img_parent_folder]=get_subpath_info(subpath,files,subpath_dict.get(p_img_parent_folder),
+                                                           type_raw,type_meta,type_jpg,type_cleanup)
     return subpath_dict
 
 def save_subpath_info_dict(subpath_info_dict,fp_json=None,fp_xls=None):
@@ -444,7 +517,7 @@ def save_subpath_info_dict(subpath_info_dict,fp_json=None,fp_xls=None):
         print(f"Saved XLSX: {Path(fp_xls).absolute()}")
 
 def num_path_in_name(file_dict:dict,p:str):
-    """ checks how many files contain path in name """
+    """ checks how many files contain path in name (NUM_PATH_IN_NAME of get_file_dict) """
     files=file_dict[p].get("files",[])
     p_parent=Path(p).stem.lower()
     return sum([1 for f in files if p_parent in (Path(f).stem).lower()])
@@ -455,93 +528,82 @@ def get_file_dict(fp:str,regex_file_rules_dict=REGEX_RULE_DICT,
     """ returns a dict with information about files
         also accepts a regex file list to check for rules
     """
+    return get_folder_info(fp,regex_file_rules_dict,filetype_classes_dict,exif_file_types,
+                           subpath_info=False,verbose=verbose)[0]
+
+def get_folder_info(fp:str,regex_file_rules_dict=REGEX_RULE_DICT,
+                    filetype_classes_dict=FILETYPE_CLASSES_DICT,exif_file_types=None,
+                    subpath_info=True,verbose=False):
+    """ classifies all folders in one scan, returns file dict (see get_file_dict) and
+        subpath info dict (see get_subpath_info_dict, None if subpath_info is False)
+    """
     file_dict={}
+    subpath_dict={} if subpath_info else None
     p_root=Path(fp)
     if verbose:
         print(f"Analysing file path: {p_root}")
-    p_root_lvl=len(p_root.parts)
-
-    # analyze on folder level
-    for subpath,_,files in os.walk(fp):
-        p=Path(subpath)
-
-        # check for empty subpath
-
-        if len(os.listdir(subpath))==0:
-            p_parent=Path(os.path.join(*(p.parts)[:-1]))
-            p_lvl=len(p.parts)-p_root_lvl
-            subpath_dict=file_dict.get(subpath,{})
-            subpath_dict["level"]=p_lvl
-            subpath_dict["parent"]=p_parent
-            subpath_dict["num_files"]=0
-            subpath_dict["file_types"]={}
-            subpath_dict["files"]=[]
-            file_dict[subpath]=subpath_dict
+    match_rules=get_regex_matcher(regex_file_rules_dict)
+    rules=list(regex_file_rules_dict.keys())
+    suffix_class_map=get_suffix_class_map(filetype_classes_dict)
+    filetype_classes=list(filetype_classes_dict.keys())
+    if exif_file_types:
+        exif_file_types=set(exif_file_types)
+
+    for subpath,p_lvl,files,num_entries in scan_folders(fp):
+        # folders containing only subfolders are skipped
+        if num_entries>0 and not files:
             continue
-
+        p=Path(subpath)
+        p_info={"level":p_lvl,"parent":p.parent,"num_files":len(files),"file_types":{},"files":files}
+        file_dict[subpath]=p_info
+
+        # single pass over files: file types, regex rules and path in file name
+        p_parent=p.stem.lower()
+        num_in_name=0
+        rule_matches=dict.fromkeys(rules,0)
+        file_types=p_info["file_types"]
         for f in files:
-            p_parent=Path(os.path.join(*(p.parts)[:-1]))
-            #print(f,p_parent)
-            p_lvl=len(p.parts)-p_root_lvl
-            #print(pf_lvl,p)
-            subpath_dict=file_dict.get(subpath,{})
-            file_list=subpath_dict.get("files",[])
-            file_list.append(f)
-            # get number of files and build up statistics
-            fp=Path(os.path.join(subpath,f))
-            filetypes_dict=subpath_dict.get("file_types",{})
-            suffix=fp.suffix[1:]
-            filetypes_dict[suffix]=filetypes_dict.get(suffix,0)+1
-            subpath_dict["level"]=p_lvl
-            subpath_dict["parent"]=p_parent
-            subpath_dict["num_files"]=subpath_dict.get("num_files",0)+1
-            subpath_dict["file_types"]=filetypes_dict
-            subpath_dict["files"]=file_list
-            file_dict[subpath]=subpath_dict
-
-    # analyze file names with regex rules
-    for p,p_info in file_dict.items():
-        files=p_info.get("files",[])
-
-        # check whether files match to path name
-        p_info["NUM_PATH_IN_NAME"]=num_path_in_name(file_dict,p)
-
-        # process regexes / check how many rules match
-        for regex_rule,regex_string in regex_file_rules_dict.items():
-            regex_to_test=re.compile(regex_string,re.I)
-            num_matches=sum([1 for f in files if regex_to_test.match(f) is not None])
-            p_info[regex_rule]=num_matches
-
-        # check file types
-        file_type_dict=p_info.get("file_types",{})
-        for file_type,file_num in file_type_dict.items():
+            f_stem,suffix=os.path.splitext(f)
+            if suffix=="" and f.startswith("."):
+                f_stem=f
+            suffix=suffix[1:]
+            file_types[suffix]=file_types.get(suffix,0)+1
+            if p_parent in f_stem.lower():
+                num_in_name+=1
+            for rule in match_rules(f):
+                rule_matches[rule]+=1
+        p_info["NUM_PATH_IN_NAME"]=num_in_name
+        p_info.update(rule_matches)
+        for file_type,file_num in file_types.items():
             p_info[(file_type.upper())]=file_num
 
         # check for containing filetype classes
-        for filetype_class,filetype_list in filetype_classes_dict.items():
-            p_info[filetype_class]=False
-            for file_type in file_type_dict.keys():
-                ftl = file_type.lower()
-
-                # special case: # tpl is 2 and rule REGEX_METADATA_FILES
-                # -> do not count it towards rule of metadata
-                if ftl == "tpl" and p_info.get("REGEX_METADATA_FILES",0)==2:
-                    continue
-
-                if ftl in filetype_list:
-                    p_info[filetype_class]=True
+        p_info.update(dict.fromkeys(filetype_classes,False))
+        for file_type in file_types.keys():
+            ftl=file_type.lower()
+            # special case: # tpl is 2 and rule REGEX_METADATA_FILES
+            # -> do not count it towards rule of metadata
+            if ftl == "tpl" and p_info.get("REGEX_METADATA_FILES",0)==2:
+                continue
+            for filetype_class in suffix_class_map.get(ftl,[]):
+                p_info[filetype_class]=True
 
         # read exif files
         if exif_file_types:
             file_exif_dict={}
             for f in files:
-                fp=Path(os.path.join(p,f))
-                if not fp.suffix[1:] in exif_file_types:
+                if not os.path.splitext(f)[1][1:] in exif_file_types:
                     continue
-                file_exif_dict[f]=read_exif(fp)
+                file_exif_dict[f]=read_exif(Path(os.path.join(subpath,f)))
             if file_exif_dict:
                 p_info["FILE_EXIF_DICT"]=file_exif_dict
-    return file_dict
+
+        # direct subpaths containing files
+        if subpath_dict is not None and p_lvl==1 and files:
+            p_img_parent_folder = p.stem
+            subpath_dict[p_img_parent_folder]=get_subpath_info(subpath,files,subpath_dict.get(p_img_parent_folder))
+
+    return file_dict,subpath_dict
 
 def get_filepath_stat_df(file_dict:dict):
     """ gets filepath stats as dataframe """
@@ -1461,29 +1523,54 @@ def change_metadata(target,exif_attribute_dict=EXIF_LENS_LENSBABY_TRIO,save=True
 
     return ret_code
 
-def copy_metadata(copy_dict:dict,display=True,save=False,exiftool="exiftool.exe",debug=True,target_filetypes=["jpg"]):
-    """ perform/display metadata copy operations, returns number of renamed files """
+def exiftool_copy_batch(copy_list:list,exiftool="exiftool.exe",debug=True)->int:
+    """ copies metadata for a list of (source file,target file) in a single exiftool call
+        using an argfile, returns number of updated files
+    """
+    args=[]
+    for source_file,target_file in copy_list:
+        args.extend([a.replace("SRC_FILE",source_file).replace("TRG_FILE",target_file) for a in ARGS_EXIF_COPY])
+    with tempfile.NamedTemporaryFile("w",suffix=".args",encoding="utf-8",delete=False) as f_args:
+        f_args.write("\n".join(args)+"\n")
+    try:
+        process=subprocess.run([exiftool,"-@",f_args.name,"-common_args","-charset","filename=utf8"],
+                               stdout=subprocess.PIPE,stderr=subprocess.STDOUT)
+        output=process.stdout.decode("utf-8",errors="ignore")
+    except OSError as e:
+        print(f"EXIFTOOL EXCEPTION OCCURED {e}")
+        return 0
+    finally:
+        os.remove(f_args.name)
+    num_updated=sum([int(n) for n in REGEX_EXIF_FILES_UPDATED.findall(output)])
+    if debug:
+        print(f"CMD {exiftool} -@ ({len(copy_list)} copy operations), {num_updated} files updated [{process.returncode}]")
+    return num_updated
+
+def copy_metadata(copy_dict:dict,display=True,save=False,exiftool="exiftool.exe",debug=True,target_filetypes=["jpg"],
+                  batch_size=EXIF_COPY_BATCH_SIZE,max_workers=None):
+    """ perform/display metadata copy operations, returns number of renamed files
+        copy operations are batched into exiftool argfiles (batch_size operations per exiftool call),
+        batches are run in max_workers parallel exiftool processes (default cpu count)
+    """
 
     # check exiftool executable
     exiftool_used=program_found(exiftool)
 
     if exiftool_used:
         print(f"\nCopy Metadata Using EXIFTOOL {exiftool_used}")
-        cmd_exiftool=CMD_EXIF_COPY_SINGLE.replace("EXIFTOOL",exiftool)
     else:
         return -1
 
-    num_files=0
-    fp_old=os.getcwd()
+    target_filetypes=tuple([ft.lower() for ft in target_filetypes])
+    copy_list=[]
     if display:
         print("\n### COPY METADATA ###")
     for fp,copy_dict in copy_dict.items():
-        os.chdir(fp)
         print(f"\n** PATH: {fp}")
         for file_group,file_info in copy_dict.items():
             source_files=file_info.get("source_files",[])
             target_files=file_info.get("target_files",[])
-            target_files=[tf for tf in target_files for ft in target_filetypes if tf.lower().endswith(ft.lower())]
+            target_files=[tf for tf in target_files if tf.lower().endswith(target_filetypes)]
 
             # skip if there is nothing to copy
             if not (target_files and source_files ):
@@ -1491,30 +1578,26 @@ def copy_metadata(copy_dict:dict,display=True,save=False,exiftool="exiftool.exe"
                 continue
 
             # use only the first matching item
-            if source_files:
-                source_file=source_files[0]
-            else:
-                if display:
-                    print(f"?  No metadata source files found for file group {file_group}")
-                continue
+            source_file=source_files[0]
 
             if display:
                 print(f"-  {source_file} (SOURCE)")
 
             for target_file in target_files:
-                num_files+=1
+                copy_list.append((os.path.join(fp,source_file),os.path.join(fp,target_file)))
                 if display:
-                    print(f"   ({str(num_files).zfill(2)}) -> {target_file} ")
+                    print(f"   ({str(len(copy_list)).zfill(2)}) -> {target_file} ")
 
-                if save:
-                    cmd_copy_metadata=cmd_exiftool.replace("SRC_FILE",'"'+source_file+'"')
-                    cmd_copy_metadata=cmd_copy_metadata.replace("TRG_FILE",'"'+target_file+'"')
-                    ret_code=run_cmd(cmd_copy_metadata,debug=debug)
-                    if not ret_code == 0:
-                        num_files -= 1
+    num_files=len(copy_list)
+    if save and copy_list:
+        batches=[copy_list[i:i+batch_size] for i in range(0,len(copy_list),batch_size)]
+        if max_workers is None:
+            max_workers=os.cpu_count() or 1
+        # each batch runs in its own exiftool process
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            num_files=sum(executor.map(lambda batch:exiftool_copy_batch(batch,exiftool_used,debug),batches))
 
     print(f"\n### COPYING METADATA FOR {num_files} FILES")
-    os.chdir(fp_old)
     return num_files
 
 def get_copy_dict(metadata_dict,marker_exif_attributes=["Model"],filename_signatures=[],debug=True):
@@ -1525,6 +1608,7 @@ def get_copy_dict(metadata_dict,marker_exif_attributes=["Model"],filename_signat
     if debug:
         print(f"EXIF     MARKERS: '{marker_exif_attributes}'")
         print(f"FILENAME MARKERS: '{filename_signatures}'")
+    filename_signatures=[sig.lower() for sig in filename_signatures]
 
     for fp,path_dict in metadata_dict.items():
         if debug:
@@ -1535,33 +1619,22 @@ def get_copy_dict(metadata_dict,marker_exif_attributes=["Model"],filename_signat
         for f,file_info in file_dict.items():
             contains_metadata=False
             if marker_exif_attributes:
-                contains_metadata=[file_info.get(att,"") for att in marker_exif_attributes]
-                contains_metadata=all([bool(att) for att in contains_metadata])
+                contains_metadata=all([bool(file_info.get(att,"")) for att in marker_exif_attributes])
 
-            contains_filename_signature=any([sig.lower() in f.lower() for sig in filename_signatures])
-            is_source_file=any([contains_metadata,contains_filename_signature])
+            f_lower=f.lower()
+            contains_filename_signature=any([sig in f_lower for sig in filename_signatures])
+            is_source_file=contains_metadata or contains_filename_signature
 
             if debug:
                 print(f"-  {f} METADATA: {contains_metadata}, FILENAME: {contains_filename_signature}, SOURCE: {is_source_file}")
 
-            # check whether file contains metadata based on
-            re_file_number=re.findall(REGEX_FILE_NUMBER,f)
-            # print(re_file_number)
-            if re_file_number:
-                re_file_number=re_file_number[0]
-                if len(re_file_number)==2:
-                    file_number=re_file_number[1]
-                    #print(file_number)
-                    # add filename to file group list
-                    file_group_dict=file_groups_dict.get(file_number,{})
-                    if is_source_file:
-                        file_list_name="source_files"
-                    else:
-                        file_list_name="target_files"
-                    file_list=file_group_dict.get(file_list_name,[])
-                    file_list.append(f)
-                    file_group_dict[file_list_name]=file_list
-                    file_groups_dict[file_number]=file_group_dict
+            # add filename to file group list of file number
+            re_file_number=REGEX_FILE_NUMBER_COMPILED.search(f)
+            if re_file_number is None:
+                continue
+            file_number=re_file_number.group(2)
+            file_list_name="source_files" if is_source_file else "target_files"
+            file_groups_dict.setdefault(file_number,{}).setdefault(file_list_name,[]).append(f)
         copy_dict[fp]=file_groups_dict
     return copy_dict
 
@@ -1642,6 +1715,244 @@ def move_manual_images(fp=None,fp_dict_in=None,debug=False,save=False):
     print(f"*** {num_moved} files were moved to {str(len(create_dirs))} new directories")
     return num_moved
 
+def _gpx_tag(tag:str)->str:
+    """ element tag without xml namespace """
+    return tag.rsplit("}",1)[-1]
+
+def _gpx_times(time_list:list)->np.ndarray:
+    """ converts gpx ISO timestamps (UTC) into array of epoch seconds (nan if missing) """
+    times=np.full(len(time_list),np.nan)
+    valid=[i for i,t in enumerate(time_list) if t]
+    if not valid:
+        return times
+    time_valid=[time_list[i].strip() for i in valid]
+    if not any([REGEX_TIME_OFFSET.search(t) for t in time_valid]):
+        # vectorized parsing for the usual Zulu time format
+        dt=np.array([t.rstrip("Z") for t in time_valid],dtype="datetime64[ms]")
+        times[valid]=dt.astype(np.int64)/1000
+    else:
+        for i in valid:
+            dt=DateTime.fromisoformat(time_list[i].strip().replace("Z","+00:00"))
+            if dt.tzinfo is None:
+                dt=dt.replace(tzinfo=pytz.utc)
+            times[i]=dt.timestamp()
+    return times
+
+def read_gpx(fp,points=GPX_POINTS)->dict:
+    """ reads gpx file as stream (low memory for large track logs)
+        Arguments:
+            fp (str): File Path to gpx file
+            points (list): gpx point elements to read (wpt,trkpt,rtept)
+        Returns:
+            dict: numpy arrays lat, lon (float), time (epoch seconds UTC, nan if missing),
+                  ele (nan if missing) and lists type (point element) and name of points
+    """
+    lat=[]
+    lon=[]
+    ele=[]
+    time_list=[]
+    types=[]
+    names=[]
+    point_values={}
+    # utf-8-sig skips BOM
+    with open(fp,encoding="utf-8-sig") as file:
+        for event,element in ET.iterparse(file,events=("start","end")):
+            tag=_gpx_tag(element.tag)
+            if event=="start":
+                if tag in points:
+                    point_values={}
+                continue
+            if tag in ["time","ele","name"]:
+                point_values.setdefault(tag,element.text)
+            elif tag in points:
+                try:
+                    lat.append(float(element.attrib["lat"]))
+                    lon.append(float(element.attrib["lon"]))
+                except (KeyError,ValueError) as e:
+                    log.warning(f"Invalid {tag} in {fp}: {e}")
+                else:
+                    ele_value=point_values.get("ele")
+                    ele.append(float(ele_value) if ele_value else np.nan)
+                    time_list.append(point_values.get("time"))
+                    types.append(tag)
+                    names.append(point_values.get("name"))
+                point_values={}
+                element.clear()
+            elif tag in ["trk","trkseg","rte"]:
+                element.clear()
+    log.debug(f"Read {len(lat)} points from {fp}")
+    return {"lat":np.array(lat,dtype=float),"lon":np.array(lon,dtype=float),
+            "ele":np.array(ele,dtype=float),"time":_gpx_times(time_list),
+            "type":types,"name":names}
+
+class GpxIndex():
+    """ time and spatial index of gpx points to match many images in one call
+        times are epoch seconds (UTC), distances are in km
+    """
+
+    def __init__(self,lat,lon,time=None) -> None:
+        """ constructor, points without time are only used for spatial matching """
+        self.lat=np.asarray(lat,dtype=float)
+        self.lon=np.asarray(lon,dtype=float)
+        if time is None:
+            time=np.full(len(self.lat),np.nan)
+        time=np.asarray(time,dtype=float)
+        # time sorted index
+        self._time_idx=np.flatnonzero(~np.isnan(time))
+        self._time_idx=self._time_idx[np.argsort(time[self._time_idx],kind="stable")]
+        self._times=time[self._time_idx]
+        self.time=time
+        self._xyz=GpxIndex.to_xyz(self.lat,self.lon)
+        self._kdtree=None
+
+    @staticmethod
+    def from_gpx(fp_list,points=GPX_POINTS):
+        """ creates index from one or more gpx files """
+        if isinstance(fp_list,(str,Path)):
+            fp_list=[fp_list]
+        gpx_list=[read_gpx(fp,points) for fp in fp_list]
+        return GpxIndex(np.concatenate([g["lat"] for g in gpx_list]),
+                        np.concatenate([g["lon"] for g in gpx_list]),
+                        np.concatenate([g["time"] for g in gpx_list]))
+
+    @staticmethod
+    def to_xyz(lat,lon)->np.ndarray:
+        """ lat lon to cartesian coordinates on unit sphere """
+        lat=np.radians(np.asarray(lat,dtype=float))
+        lon=np.radians(np.asarray(lon,dtype=float))
+        return np.column_stack([np.cos(lat)*np.cos(lon),np.cos(lat)*np.sin(lon),np.sin(lat)])
+
+    def __len__(self):
+        return len(self.lat)
+
+    @property
+    def kdtree(self):
+        """ kd tree (scipy) of points, None if scipy is not installed """
+        if self._kdtree is None:
+            try:
+                from scipy.spatial import cKDTree
+            except ImportError:
+                log.info("scipy not installed, nearest points are searched without kd tree")
+                self._kdtree=False
+            else:
+                self._kdtree=cKDTree(self._xyz)
+        return self._kdtree or None
+
+    def match_time(self,times,max_diff:float=None,interpolate:bool=False)->dict:
+        """ finds gps positions for all times (epoch seconds) at once
+            Arguments:
+                times (array): epoch seconds (UTC)
+                max_diff (float): max time difference in seconds, otherwise no match (index -1, nan)
+                interpolate (bool): interpolate position linear between neighbouring points
+            Returns:
+                dict: numpy arrays index (nearest point), lat, lon, time_diff (seconds)
+        """
+        times=np.asarray(times,dtype=float)
+        n=len(times)
+        out={"index":np.full(n,-1),"lat":np.full(n,np.nan),"lon":np.full(n,np.nan),
+             "time_diff":np.full(n,np.nan)}
+        num_points=len(self._times)
+        if num_points==0 or n==0:
+            return out
+        right=np.clip(np.searchsorted(self._times,times),1,max(num_points-1,1))
+        left=right-1
+        if num_points==1:
+            left=right=np.zeros(n,dtype=int)
+        diff_left=np.abs(times-self._times[left])
+        diff_right=np.abs(self._times[right]-times)
+        nearest=np.where(diff_right<diff_left,right,left)
+        time_diff=np.minimum(diff_left,diff_right)
+        lat=self.lat[self._time_idx[nearest]]
+        lon=self.lon[self._time_idx[nearest]]
+        if interpolate and num_points>1:
+            t_left=self._times[left]
+            t_right=self._times[right]
+            inside=(times>=t_left)&(times<=t_right)&(t_right>t_left)
+            w=np.zeros(n)
+            w[inside]=(times[inside]-t_left[inside])/(t_right[inside]-t_left[inside])
+            lat=np.where(inside,(1-w)*self.lat[self._time_idx[left]]+w*self.lat[self._time_idx[right]],lat)
+            lon=np.where(inside,(1-w)*self.lon[self._time_idx[left]]+w*self.lon[self._time_idx[right]],lon)
+        valid=~np.isnan(times)
+        if max_diff is not None:
+            valid&=time_diff<=max_diff
+        out["index"][valid]=self._time_idx[nearest][valid]
+        out["lat"][valid]=lat[valid]
+        out["lon"][valid]=lon[valid]
+        out["time_diff"][valid]=time_diff[valid]
+        return out
+
+    def match_space(self,lat,lon,max_dist:float=None,chunk_size:int=1024)->dict:
+        """ finds nearest gps points for all coordinates at once
+            Arguments:
+                lat, lon (array): coordinates
+                max_dist (float): max distance in km, otherwise no match (index -1, nan)
+                chunk_size (int): chunk size for search without kd tree
+            Returns:
+                dict: numpy arrays index (nearest point) and distance (km, great circle)
+        """
+        xyz=GpxIndex.to_xyz(lat,lon)
+        n=len(xyz)
+        out={"index":np.full(n,-1),"distance":np.full(n,np.nan)}
+        if len(self)==0 or n==0:
+            return out
+        if self.kdtree is not None:
+            chord,index=self.kdtree.query(xyz)
+        else:
+            index=np.empty(n,dtype=int)
+            chord=np.empty(n)
+            for i in range(0,n,chunk_size):
+                d=((xyz[i:i+chunk_size,None,:]-self._xyz[None,:,:])**2).sum(axis=2)
+                index[i:i+chunk_size]=np.argmin(d,axis=1)
+                chord[i:i+chunk_size]=np.sqrt(d[np.arange(len(d)),index[i:i+chunk_size]])
+        distance=2*EARTH_RADIUS*np.arcsin(np.clip(chord/2,0,1))
+        valid=~np.isnan(distance)
+        if max_dist is not None:
+            valid&=distance<=max_dist
+        out["index"][valid]=index[valid]
+        out["distance"][valid]=distance[valid]
+        return out
+
+def geotag_images(img_datetime_dict:dict,fp_gpx,time_offset:int=0,max_diff:float=300,
+                  interpolate:bool=True,tz_code="Europe/Berlin")->dict:
+    """ matches images to gpx tracks / waypoints in one call
+        Arguments:
+            img_datetime_dict (dict): image name: datetime (naive datetimes are local time)
+                                      or exif string (YYYY:MM:DD HH:MM:SS, local time)
+            fp_gpx (str/list): gpx file(s)
+            time_offset (int): seconds added to image times (gps time - camera time)
+            max_diff (float): max time difference in seconds
+            interpolate (bool): interpolate position between track points
+            tz_code (pytz.tzcode): Valid pytz timezone code for local times
+        Returns:
+            dict: image name: {lat,lon,time_diff,url_osm} for all matched images
+    """
+    timezone_loc=pytz.timezone(tz_code)
+    names=list(img_datetime_dict.keys())
+    times=np.full(len(names),np.nan)
+    for i,name in enumerate(names):
+        dt=img_datetime_dict[name]
+        if isinstance(dt,str):
+            try:
+                dt=DateTime.strptime(dt[:19],"%Y:%m:%d %H:%M:%S")
+            except ValueError:
+                log.warning(f"Invalid datetime {dt} for image {name}")
+                continue
+        if dt is None:
+            continue
+        if dt.tzinfo is None:
+            dt=timezone_loc.localize(dt)
+        times[i]=dt.timestamp()+time_offset
+    gpx_index=GpxIndex.from_gpx(fp_gpx)
+    matched=gpx_index.match_time(times,max_diff=max_diff,interpolate=interpolate)
+    out={}
+    for i in np.flatnonzero(matched["index"]>=0):
+        lat=round(float(matched["lat"][i]),5)
+        lon=round(float(matched["lon"][i]),5)
+        out[names[i]]={"lat":lat,"lon":lon,"time_diff":float(matched["time_diff"][i]),
+                       "url_osm":URL_OSM.replace("lat",str(lat)).replace("lon",str(lon))}
+    log.info(f"Geotagged {len(out)} of {len(names)} images")
+    return out
+
 def read_waypoints(fp,show=False,tz_code="Europe/Berlin"):
     """ Extracts waypoints from waypoint log
         Arguments:
@@ -1657,55 +1968,50 @@ def read_waypoints(fp,show=False,tz_code="Europe/Berlin"):
     timezone_utc = pytz.utc
 
     waypoint_dict={}
-    content=[]
 
-    with open(fp,'rb') as file:
-        content = file.read()
-        if content[:3] == codecs.BOM_UTF8:
-            content=content.decode("UTF-8-SIG")
-        else:
-            content=content.decode("UTF-8")
-        bs_content = bs(content, features="xml")
+    gpx=read_gpx(fp,points=[GPX_WAYPOINT])
 
     if show:
         print(f"--- READ FILE {fp}---")
-        print(bs_content.prettify())
+        print(f"\n*** <{len(gpx['lat'])}> Waypoints found")
 
     i = 0
 
-    waypoints=bs_content.find_all("wpt")
-
-    if show:
-        print(f"\n*** <{len(waypoints)}> Waypoints found")
-
-    for wp in waypoints:
-        try:
-            lat=str(round(float(wp["lat"]),5))
-            lon=str(round(float(wp["lon"]),5))
-            ts=wp.find("time").text
-            # timezone conversion
-            dt = datetime.datetime.strptime(ts,'%Y-%m-%dT%H:%M:%SZ')
-            dt_utc = dt.replace(tzinfo=timezone_utc)
-            dt_local=dt_utc.astimezone(timezone_loc)
-            i+=1
-            url_osm=URL_OSM
-            url_osm=url_osm.replace("lat",lat)
-            url_osm=url_osm.replace("lon",lon)
-            waypoint_dict[i]={"lat":lat,"lon":lon,
-                              "datetime_utc":dt_utc.strftime("%Y:%m:%d %H:%M:%S"),
-                              "datetime_local":dt_local.strftime("%Y:%m:%d %H:%M:%S"),
-                              "datetime":dt_local,
-                              "timezone":tz_code,
-                              "url_osm":url_osm
-                              }
-            if show:
-                print(f'({str(i)}) {waypoint_dict[i]["datetime_local"]} {waypoint_dict[i]["url_osm"]}')
-        except KeyError as e:
-            print(f"Key {e} doesn't exist" )
+    for lat,lon,ts in zip(gpx["lat"],gpx["lon"],gpx["time"]):
+        if np.isnan(ts):
+            print("Key time doesn't exist")
             continue
+        lat=str(round(float(lat),5))
+        lon=str(round(float(lon),5))
+        # timezone conversion
+        dt_utc=DateTime.fromtimestamp(int(ts),tz=timezone_utc)
+        dt_local=dt_utc.astimezone(timezone_loc)
+        i+=1
+        url_osm=URL_OSM
+        url_osm=url_osm.replace("lat",lat)
+        url_osm=url_osm.replace("lon",lon)
+        waypoint_dict[i]={"lat":lat,"lon":lon,
+                          "datetime_utc":dt_utc.strftime("%Y:%m:%d %H:%M:%S"),
+                          "datetime_local":dt_local.strftime("%Y:%m:%d %H:%M:%S"),
+                          "datetime":dt_local,
+                          "timezone":tz_code,
+                          "url_osm":url_osm
+                          }
+        if show:
+            print(f'({str(i)}) {waypoint_dict[i]["datetime_local"]} {waypoint_dict[i]["url_osm"]}')
 
     return waypoint_dict
 
+_geo_cache=None
+
+def get_geo_cache(f_cache=GEO_CACHE_FILE)->GeoCache:
+    """ reverse geocoding cache (nominatim requests only for cache misses) """
+    global _geo_cache
+    if _geo_cache is None:
+        _geo_cache=GeoCache(f_cache,backend=Geo.geo_reverse_from_nominatim,
+                            radius=GEO_CACHE_RADIUS,min_interval=GEO_REQUEST_INTERVAL)
+    return _geo_cache
+
 def get_latlon_reverse(fp:str,show=True,geo=True,latlon=None):
     """ gets reverse image gps info from either links in folder or
         from latlon list
@@ -1734,40 +2040,41 @@ def get_latlon_reverse(fp:str,show=True,geo=True,latlon=None):
     out_dict={}
     for f_url in url_list:
         url = Persistence.read_internet_shortcut(f_url)
-        file_dict={}
         if url:
             latlon=Geo.latlon_from_osm_url(url)
 
         if show:
             print(f"\n*** File [{os.path.join(p,f_url)}], coordinates: {latlon}")
         if latlon:
-            file_dict["latlon"]=latlon
-        else:
-            continue
+            out_dict[f_url]={"latlon":latlon}
+
+    if not (out_dict and geo):
+        return out_dict
+
+    # reverse search of all coordinates at once, using cached results
+    geo_list=get_geo_cache().reverse_batch([file_dict["latlon"] for file_dict in out_dict.values()])
+    for (f_url,file_dict),geo_nominatim_dict in zip(out_dict.items(),geo_list):
+        latlon=file_dict["latlon"]
+        if geo_nominatim_dict is None:
+            geo_nominatim_dict={}
+        geo_info=ExifTool.map_geo2exif(geo_nominatim_dict)
+        file_dict["url_geo_info"]=geo_info.get('SpecialInstructions',"NoGeoInfoUrl")
+        file_dict["url_osm"]=geo_nominatim_dict.get('url_osm',"")
+        file_dict["geo_description"]=geo_info.get('ImageDescription',"NoGeoDescription")
+        file_dict["geo_dict"]=geo_info
+        # get distance from original latlon vs returned latlon in meters
+        if file_dict["url_osm"] != "":
+            latlon_osm = Geo.latlon_from_osm_url(file_dict["url_osm"])
+            if latlon_osm:
+                file_dict["geo_difference"]=int(1000*Geo.get_distance(latlon,latlon_osm))
+
+        if show:
+            print(f"*** Reverse Coordinates ({f_url}) / Difference")
+            print(f"    {file_dict['url_geo_info']}")
+            print(f"    {file_dict['url_osm']}")
+            print(f"    {file_dict['geo_description']}")
+            print(f"    {file_dict.get('geo_difference')}m Difference GPS - Coordinates Returned")
 
-        if file_dict and geo:
-            geo_nominatim_dict=Geo.geo_reverse_from_nominatim(latlon)
-            time.sleep(2)
-            geo_info=ExifTool.map_geo2exif(geo_nominatim_dict)
-            file_dict["url_geo_info"]=geo_info.get('SpecialInstructions',"NoGeoInfoUrl")
-            file_dict["url_osm"]=geo_nominatim_dict.get('url_osm',"")
-            file_dict["geo_description"]=geo_info.get('ImageDescription',"NoGeoDescription")
-            file_dict["geo_dict"]=geo_info
-            # get distance from original latlon vs returned latlon in meters
-            if file_dict["url_osm"] != "":
-                latlon_osm = Geo.latlon_from_osm_url(file_dict["url_osm"])
-                if latlon_osm:
-                    file_dict["geo_difference"]=int(1000*Geo.get_distance(latlon,latlon_osm))
-
-            if show:
-                print(f"*** Reverse Coordinates ({f_url}) / Difference")
-                print(f"    {file_dict['url_geo_info']}")
-                print(f"    {file_dict['url_osm']}")
-                print(f"    {file_dict['geo_description']}")
-                print(f"    {file_dict.get('geo_difference')}m Difference GPS - Coordinates Returned")
-
-        if file_dict:
-            out_dict[f_url]=file_dict
     return out_dict
 
 def update_img_meta_config(fp_config:str,geo=True,show=False):
@@ -1903,7 +2210,7 @@ def update_img_meta_config(fp_config:str,geo=True,show=False):
     print(f"    GPS TIME: {dt_gps}, CAM TIME:{dt_cam_local}, OFFSET {dt_offset}s")
 
     if geo:
-        geo_nominatim_dict=Geo.geo_reverse_from_nominatim(config_dict.get("DEFAULT_LATLON",[0.0,0.0]))
+        geo_nominatim_dict=get_geo_cache().reverse(config_dict.get("DEFAULT_LATLON",[0.0,0.0])) or {}
         geo_info=ExifTool.map_geo2exif(geo_nominatim_dict)
         config_dict["URL_GEO_INFO"]=geo_info.get('SpecialInstructions',"NoGeoInfoUrl")
         config_dict["GEO_INFO"]=geo_info.get('ImageDescription',"NoGeoDescription")
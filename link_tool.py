@@ -16,6 +16,10 @@ import os
 from pathlib import Path
 import webbrowser
 from tools import file_module as fm
+from tools.util.link_checker import LinkChecker, is_dead, is_gone, STATUS, REDIRECT, ERROR, LAST_CHECKED, DEAD
+
+# link check results cache
+LINK_CACHE_FILE=os.path.join(Path.home(),".link_tool_cache.json")
 
 
 def read_url_json(f_file):
@@ -87,6 +91,42 @@ def open_links(link_list):
     for url in url_list:
         webbrowser.open(url, new=2)
 
-def save_links(fp,link_list):
-    """ saving link list as json file """
+def check_links(link_list,f_cache=LINK_CACHE_FILE,force=False,**kwargs):
+    """ checks links from list of dictionary items concurrently, results are cached in f_cache
+        (links checked within max_age are not requested again). kwargs are passed to LinkChecker
+        (max_concurrency, max_per_host, min_interval, timeout, max_age)
+        returns dict url: link check result
+    """
+    if not isinstance(link_list,list):
+        return {}
+    url_list=[link.get("url") for link in link_list if link.get("url")]
+    link_checker=LinkChecker(f_cache,**kwargs)
+    check_results=link_checker.check_links(url_list,force=force)
+    dead_links=[url for url,result in check_results.items() if is_dead(result)]
+    print(f"\n--- Checked ({len(check_results)}) Links, ({len(dead_links)}) dead Links")
+    _ = [print(f"-   {url} ({check_results[url][STATUS]})") for url in dead_links]
+    return check_results
+
+def annotate_links(link_list,check_results):
+    """ adds link check results (status, redirect, last checked, dead flag) to link items """
+    out=[]
+    for link in link_list:
+        result=check_results.get(link.get("url"))
+        if result:
+            link={**link,STATUS:result[STATUS],REDIRECT:result[REDIRECT],
+                  LAST_CHECKED:result[LAST_CHECKED],DEAD:is_dead(result)}
+            if result.get(ERROR):
+                link[ERROR]=result[ERROR]
+        out.append(link)
+    return out
+
+def save_links(fp,link_list,check_results=None,skip_dead=False):
+    """ saving link list as json file,
+        check_results: link check results (see check_links) to annotate links, dead links
+        are flagged, links that are definitely gone (404/410) are skipped (skip_dead)
+    """
+    if check_results:
+        if skip_dead:
+            link_list=[link for link in link_list if not is_gone(check_results.get(link.get("url")))]
+        link_list=annotate_links(link_list,check_results)
     fm.save_json(fp,link_list)
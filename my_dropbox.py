@@ -21,7 +21,11 @@
 import sys
 import os
 import shutil
+import hashlib
 from datetime import datetime
+from datetime import timezone
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
 import traceback
 import webbrowser
 import win32clipboard
@@ -34,12 +38,22 @@ from requests.exceptions import HTTPError
 from image_meta.persistence import Persistence
 from image_meta.util import Util
 
+# files above chunk size will be transferred in chunks (upload limit for single call is 150MB)
+CHUNK_SIZE = 8 * 1024 * 1024
+# block size used by dropbox to calculate content hash
+DROPBOX_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+# max number of bytes shown in download
+MAX_SHOW_CONTENT = 64 * 1024
+# file storing cursor and file hashes of folder synchronization
+SYNC_FILE = ".dropbox_sync.json"
+
 class MyDropbox:
     """ Access Files in Dropbox with OAUTH V2 access"""
 
     def __init__(self, app_key=None, app_secret=None, app_token=None, app_token_expiry=None,
                  refresh_token=None, remote_file=None, local_file=None, backup_path=None,
-                 app_json_path=None, show_info=False, create_instance=True):
+                 app_json_path=None, show_info=False, create_instance=True,
+                 chunk_size=CHUNK_SIZE, max_retries=3):
         """ Constructor, receives either parameters or path to a json file
             containing the same attributes.
             Args:
@@ -53,6 +67,8 @@ class MyDropbox:
                 if None, no backup will be created
                 show_info: show additional information
                 create_instance: intanciate dropbox reference
+                chunk_size: chunk size for up and downloads
+                max_retries: number of offset corrections in chunked uploads
         """
         # dropbox app key and secret
         self.app_key = app_key
@@ -70,6 +86,10 @@ class MyDropbox:
         self.remote_file = remote_file
         self.local_file = local_file
         self.backup_path = backup_path
+        # chunked transfer / open upload session for resuming uploads
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.upload_session = None
         # dropbox instance
         self.dbx = None
 
@@ -121,6 +141,7 @@ class MyDropbox:
         self.remote_file = None
         self.local_file = None
         self.backup_path = None
+        self.upload_session = None
 
     def get_remote_metadata(self):
         """ returns metadata of remote file """
@@ -340,8 +361,121 @@ class MyDropbox:
 
         return metadata_dict
 
-    def upload(self):
-        """ upload file to dropbox, returns dropbox metadata of upload file """
+    @staticmethod
+    def get_content_hash(filepath, block_size=None):
+        """ calculates the Dropbox content hash of a local file (sha256 over the
+            concatenated sha256 digests of 4MB blocks), file is read block by block
+            https://www.dropbox.com/developers/reference/content-hash
+        """
+        if not os.path.isfile(filepath):
+            return None
+
+        if block_size is None:
+            block_size = DROPBOX_HASH_BLOCK_SIZE
+
+        block_hashes = b""
+        with open(filepath, "rb") as f:
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    break
+                block_hashes += hashlib.sha256(block).digest()
+
+        return hashlib.sha256(block_hashes).hexdigest()
+
+    def is_in_sync(self, md=None):
+        """ checks whether local file and remote file have the same content hash
+            if metadata is not supplied, it will be retrieved from Dropbox
+        """
+        if not os.path.isfile(self.local_file):
+            return False
+
+        if md is None:
+            md = self.get_remote_metadata()
+
+        remote_hash = getattr(md, "content_hash", None)
+        if remote_hash is None:
+            return False
+
+        in_sync = (remote_hash == MyDropbox.get_content_hash(self.local_file))
+        if in_sync and self.show_info:
+            print(f" MyDropbox: {self.local_file} and {self.remote_file} have identical content")
+
+        return in_sync
+
+    @staticmethod
+    def get_correct_offset(error):
+        """ offset expected by the server for an incorrect offset error of an upload session
+            (append errors contain the offset error directly, finish errors as lookup
+            error), None for other errors
+        """
+        if callable(getattr(error, "is_lookup_failed", None)) and error.is_lookup_failed():
+            error = error.get_lookup_failed()
+        if callable(getattr(error, "is_incorrect_offset", None)) and error.is_incorrect_offset():
+            return error.get_incorrect_offset().correct_offset
+        return None
+
+    def upload_chunked(self, f, file_size, client_modified):
+        """ uploads an opened file in chunks using an upload session.
+            Session id and offset are kept in attribute upload_session, so that an
+            interrupted upload can be resumed by calling upload again
+        """
+        commit = dropbox.files.CommitInfo(path=self.remote_file,
+                                          mode=dropbox.files.WriteMode.overwrite,
+                                          client_modified=client_modified)
+
+        # session is only resumed for the unchanged file
+        mtime = os.path.getmtime(self.local_file)
+        session = self.upload_session
+        if ((session is None) or (session.get("local_file") != self.local_file) or
+                (session.get("size") != file_size) or (session.get("mtime") != mtime)):
+            f.seek(0)
+            res = self.dbx.files_upload_session_start(f.read(self.chunk_size))
+            session = {"local_file": self.local_file, "size": file_size, "mtime": mtime,
+                       "session_id": res.session_id, "offset": f.tell()}
+            self.upload_session = session
+            if self.show_info:
+                print(f" MyDropbox.upload: Started upload session {res.session_id}")
+        elif self.show_info:
+            print(f" MyDropbox.upload: Resume upload session {session['session_id']}"+
+                  f" at offset {session['offset']}")
+
+        md = None
+        num_retries = 0
+        while md is None:
+            f.seek(session["offset"])
+            cursor = dropbox.files.UploadSessionCursor(session_id=session["session_id"],
+                                                       offset=session["offset"])
+            try:
+                if (file_size - session["offset"]) <= self.chunk_size:
+                    md = self.dbx.files_upload_session_finish(f.read(self.chunk_size),
+                                                              cursor, commit)
+                else:
+                    self.dbx.files_upload_session_append_v2(f.read(self.chunk_size), cursor)
+                    session["offset"] = f.tell()
+                    if self.show_info:
+                        print(f" MyDropbox.upload: {session['offset']}/{file_size} bytes")
+            except ApiError as ex:
+                # server expects another offset: continue from there
+                correct_offset = MyDropbox.get_correct_offset(ex.error)
+                if (num_retries < self.max_retries) and (correct_offset is not None):
+                    num_retries += 1
+                    session["offset"] = correct_offset
+                    if self.show_info:
+                        print(f" MyDropbox.upload: correcting offset to {session['offset']}")
+                else:
+                    # session can't be resumed
+                    self.upload_session = None
+                    raise
+
+        self.upload_session = None
+        return md
+
+    def upload(self, force=False):
+        """ upload file to dropbox, returns dropbox metadata of upload file
+            files larger than the chunk size are uploaded in an upload session,
+            upload is skipped if remote file has same content hash (unless forced)
+        """
         md = None
 
         f_info_local = Persistence.get_filepath_info(self.local_file)
@@ -350,13 +484,24 @@ class MyDropbox:
             print(f" MyDropbox.upload: Local upload file {self.local_file} is not a file")
             return False
 
+        if not force:
+            md = self.get_remote_metadata()
+            if self.is_in_sync(md):
+                return md
+
+        file_size = os.path.getsize(self.local_file)
+
         with open(self.local_file, "rb") as f:
             if self.show_info:
-                print(f" MyDropbox.upload: Uploading file {self.local_file} to {self.remote_file} ")
+                print(f" MyDropbox.upload: Uploading file {self.local_file} to {self.remote_file} "+
+                      f"({file_size} bytes)")
             try:
-                md = self.dbx.files_upload(f.read(), self.remote_file,
-                                           mode=dropbox.files.WriteMode.overwrite,
-                                           client_modified=f_info_local["changed_on"])
+                if file_size <= self.chunk_size:
+                    md = self.dbx.files_upload(f.read(), self.remote_file,
+                                               mode=dropbox.files.WriteMode.overwrite,
+                                               client_modified=f_info_local["changed_on"])
+                else:
+                    md = self.upload_chunked(f, file_size, f_info_local["changed_on"])
 
                 # make a backup of local file if set up
                 self.backup_local()
@@ -368,11 +513,20 @@ class MyDropbox:
             except ApiError as ex:
                 print(f" MyDropbox.upload ApiError {ex.error}")
                 traceback.print_exception(*sys.exc_info())
+                md = None
+            except Exception:
+                # keeps upload session so that upload can be resumed
+                print(f" MyDropbox.upload ERROR, upload session {self.upload_session}")
+                traceback.print_exception(*sys.exc_info())
+                md = None
 
         return md
 
-    def download(self, show_content=False):
-        """ download file from dropbox, returns bytestring """
+    def download(self, show_content=False, force=False):
+        """ download file from dropbox, file is streamed in chunks to a temporary
+            file that will replace the local file. Download is skipped if local file
+            has same content hash (unless forced). Returns dropbox metadata.
+        """
 
         # check download location
         f_info_local = Persistence.get_filepath_info(self.local_file)
@@ -382,10 +536,18 @@ class MyDropbox:
             print(f" MyDropbox.download: {self.local_file} is not a valid file or folder location")
             return None
 
+        if not force:
+            md = self.get_remote_metadata()
+            if self.is_in_sync(md):
+                return md
+
+        f_temp = self.local_file + ".download"
         try:
             md, res = self.dbx.files_download(self.remote_file)
-            bytestring = res.content
-            unicode_text = str(bytestring, 'utf-8')
+            with open(f_temp, 'wb') as f:
+                for chunk in res.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+            res.close()
         except ApiError as ex:
             print(f" MyDropbox.download ERROR: {ex.error}")
             traceback.print_exception(*sys.exc_info())
@@ -393,6 +555,8 @@ class MyDropbox:
         except Exception:
             print(" MyDropbox.download ERROR")
             traceback.print_exception(*sys.exc_info())
+            if os.path.isfile(f_temp):
+                os.remove(f_temp)
             return None
 
         if self.show_info:
@@ -402,7 +566,10 @@ class MyDropbox:
         if show_content:
             print(f"\n --- FILE {md.name} (Server time {md.server_modified}),"+
                   f" {md.size} bytes ---\n")
-            print(unicode_text)
+            with open(f_temp, 'rb') as f:
+                print(str(f.read(MAX_SHOW_CONTENT), 'utf-8', errors="replace"))
+            if md.size > MAX_SHOW_CONTENT:
+                print(f" ... (showing first {MAX_SHOW_CONTENT} bytes)")
             print(" -----------------------------")
 
         # make a backup of local file if set up
@@ -410,10 +577,8 @@ class MyDropbox:
 
         # save file
         try:
-            f = open(self.local_file, 'w+b')
-            f.write(bytestring)
-            f.close()
-            return bytestring
+            os.replace(f_temp, self.local_file)
+            return md
         except (OSError, IOError) as ex:
             print(f" ERROR MyDropbox.download: {ex}")
             traceback.print_exception(*sys.exc_info())
@@ -443,3 +608,202 @@ class MyDropbox:
                 print(f"\n MyDropbox.backup_local: {f_target}")
         except OSError:
             traceback.print_exception(*sys.exc_info())
+
+    def get_remote_tree(self, remote_path, cursor=None, remote_tree=None):
+        """ lists remote folder recursively using cursor pagination, returns dict
+            {relative file path: {content_hash, mtime}} and latest cursor. If the cursor
+            of a previous listing is supplied, only the changes since then are read and
+            applied to the supplied remote tree (incremental listing)
+        """
+        remote_tree = {} if remote_tree is None else dict(remote_tree)
+        remote_root = remote_path.rstrip("/").lower()
+
+        try:
+            if cursor is None:
+                remote_tree = {}
+                res = self.dbx.files_list_folder(remote_path, recursive=True)
+            else:
+                res = self.dbx.files_list_folder_continue(cursor)
+        except ApiError as ex:
+            if cursor is None:
+                raise
+            # cursor expired: read full listing
+            print(f" MyDropbox.get_remote_tree: cursor invalid ({ex.error}), read full listing")
+            return self.get_remote_tree(remote_path)
+
+        while True:
+            for entry in res.entries:
+                path_lower = getattr(entry, "path_lower", None)
+                if path_lower is None or not path_lower.startswith(remote_root + "/"):
+                    continue
+                rel_path = entry.path_display[len(remote_root)+1:]
+                if isinstance(entry, dropbox.files.FileMetadata):
+                    mtime = entry.client_modified.replace(tzinfo=timezone.utc).timestamp()
+                    remote_tree[rel_path] = {"content_hash": entry.content_hash, "mtime": mtime}
+                elif isinstance(entry, dropbox.files.DeletedMetadata):
+                    # deleted entries may also be folders
+                    remote_tree = {k: v for k, v in remote_tree.items()
+                                   if not (k.lower() == rel_path.lower() or
+                                           k.lower().startswith(rel_path.lower() + "/"))}
+            if not res.has_more:
+                break
+            res = self.dbx.files_list_folder_continue(res.cursor)
+
+        return (remote_tree, res.cursor)
+
+    @staticmethod
+    def get_local_tree(local_path, local_tree_cache=None, ignore_files=None):
+        """ lists local folder recursively, returns dict
+            {relative file path: {mtime, size, content_hash}}. Content hash is only taken
+            over from the cache if modification time and size are unchanged, otherwise it
+            is set to None and calculated on demand
+        """
+        local_tree = {}
+        local_tree_cache = {} if local_tree_cache is None else local_tree_cache
+        # files to be ignored are compared as absolute paths
+        ignore_files = [] if ignore_files is None else [os.path.abspath(f) for f in ignore_files]
+
+        for subpath, _, files in os.walk(local_path):
+            for f in files:
+                f_path = os.path.join(subpath, f)
+                if os.path.abspath(f_path) in ignore_files:
+                    continue
+                rel_path = os.path.relpath(f_path, local_path).replace(os.sep, "/")
+                stat = os.stat(f_path)
+                info = {"mtime": stat.st_mtime, "size": stat.st_size, "content_hash": None}
+                cached = local_tree_cache.get(rel_path, {})
+                if cached.get("mtime") == info["mtime"] and cached.get("size") == info["size"]:
+                    info["content_hash"] = cached.get("content_hash")
+                local_tree[rel_path] = info
+
+        return local_tree
+
+    @staticmethod
+    def get_sync_diff(local_path, local_tree, remote_tree, synced_tree=None):
+        """ compares local and remote tree, returns dict with lists of relative paths
+            to be uploaded / downloaded / skipped. Files existing on both sides
+            are compared by content hash. If they differ, the side that changed since
+            the last sync (synced_tree, content hashes of last sync) wins, if both
+            sides changed the newer file wins. Missing local content hashes will be
+            calculated and stored in local tree
+        """
+        sync_diff = {"upload": [], "download": [], "skip": []}
+        synced_tree = {} if synced_tree is None else synced_tree
+
+        for rel_path in sorted(set(local_tree.keys()).union(remote_tree.keys())):
+            local_info = local_tree.get(rel_path)
+            remote_info = remote_tree.get(rel_path)
+            if remote_info is None:
+                sync_diff["upload"].append(rel_path)
+                continue
+            if local_info is None:
+                sync_diff["download"].append(rel_path)
+                continue
+            if local_info["content_hash"] is None:
+                local_info["content_hash"] = MyDropbox.get_content_hash(
+                    os.path.join(local_path, *rel_path.split("/")))
+            if local_info["content_hash"] == remote_info["content_hash"]:
+                sync_diff["skip"].append(rel_path)
+                continue
+            synced_hash = synced_tree.get(rel_path, {}).get("content_hash")
+            local_changed = local_info["content_hash"] != synced_hash
+            remote_changed = remote_info["content_hash"] != synced_hash
+            if local_changed and not remote_changed:
+                sync_diff["upload"].append(rel_path)
+            elif remote_changed and not local_changed:
+                sync_diff["download"].append(rel_path)
+            elif local_info["mtime"] > remote_info["mtime"]:
+                sync_diff["upload"].append(rel_path)
+            else:
+                sync_diff["download"].append(rel_path)
+
+        return sync_diff
+
+    def transfer(self, local_file, remote_file, action):
+        """ uploads or downloads single file using the dropbox instance of this
+            object (no token refresh or reauthorization), returns dropbox metadata
+        """
+        my_dbx = MyDropbox(remote_file=remote_file, local_file=local_file,
+                           show_info=self.show_info, create_instance=False,
+                           chunk_size=self.chunk_size, max_retries=self.max_retries)
+        my_dbx.dbx = self.dbx
+
+        if action == "upload":
+            return my_dbx.upload(force=True)
+
+        os.makedirs(os.path.dirname(local_file), exist_ok=True)
+        return my_dbx.download(force=True)
+
+    def sync_folder(self, local_path, remote_path, max_workers=4, sync_file=None):
+        """ synchronizes local and remote folder in both directions. Trees are listed
+            once, the transfers are then run concurrently on a bounded thread pool
+            sharing the authenticated dropbox instance. Remote cursor and local content
+            hashes are persisted to sync_file (default: .dropbox_sync.json in local
+            path), so that the next run only reads remote changes. Deletions are not
+            synchronized. Returns dict with lists of transferred / skipped / failed files
+        """
+        if self.get_instance() is None:
+            print(" MyDropbox.sync_folder: No Dropbox instance")
+            return None
+
+        if not os.path.isdir(local_path):
+            print(f" MyDropbox.sync_folder: {local_path} is not a folder")
+            return None
+
+        remote_path = "/" + remote_path.strip("/")
+        if sync_file is None:
+            sync_file = os.path.join(local_path, SYNC_FILE)
+
+        sync_state = None
+        if os.path.isfile(sync_file):
+            sync_state = Persistence.read_json(sync_file)
+        if not (isinstance(sync_state, dict) and sync_state.get("remote_path") == remote_path):
+            sync_state = {}
+
+        remote_tree, cursor = self.get_remote_tree(remote_path, sync_state.get("cursor"),
+                                                   sync_state.get("remote_tree"))
+        local_tree = MyDropbox.get_local_tree(local_path, sync_state.get("local_tree"),
+                                              ignore_files=[os.path.abspath(sync_file)])
+        sync_diff = MyDropbox.get_sync_diff(local_path, local_tree, remote_tree,
+                                            sync_state.get("local_tree"))
+
+        if self.show_info:
+            print(f" MyDropbox.sync_folder: {len(sync_diff['upload'])} uploads, "+
+                  f"{len(sync_diff['download'])} downloads, {len(sync_diff['skip'])} unchanged")
+
+        sync_result = {"upload": [], "download": [], "skip": sync_diff["skip"], "error": []}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for action in ["upload", "download"]:
+                for rel_path in sync_diff[action]:
+                    local_file = os.path.join(local_path, *rel_path.split("/"))
+                    remote_file = remote_path + "/" + rel_path
+                    future = executor.submit(self.transfer, local_file, remote_file, action)
+                    futures[future] = (action, rel_path, local_file)
+
+            for future in as_completed(futures):
+                action, rel_path, local_file = futures[future]
+                try:
+                    md = future.result()
+                except Exception:
+                    traceback.print_exception(*sys.exc_info())
+                    md = None
+                if not md:
+                    sync_result["error"].append(rel_path)
+                    continue
+                sync_result[action].append(rel_path)
+                # both sides now have the same content
+                stat = os.stat(local_file)
+                local_tree[rel_path] = {"mtime": stat.st_mtime, "size": stat.st_size,
+                                        "content_hash": md.content_hash}
+                remote_tree[rel_path] = {"content_hash": md.content_hash,
+                    "mtime": md.client_modified.replace(tzinfo=timezone.utc).timestamp()}
+
+        # uploads are part of the next incremental listing anyway
+        sync_state = {"remote_path": remote_path, "cursor": cursor,
+                      "date_sync": datetime.now().isoformat("#", "seconds"),
+                      "remote_tree": remote_tree, "local_tree": local_tree}
+        Persistence.save_json(filepath=sync_file, data=sync_state)
+
+        return sync_result
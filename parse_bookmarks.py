@@ -3,17 +3,23 @@ import traceback
 import json
 import sys
 from datetime import datetime as DateTime
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 from pathlib import Path
 
+# size of chunks read from bookmark file
+CHUNK_SIZE=1024*1024
+
 def save(filepath,data):
-    """ Saves string data / string list """
-    if isinstance(data,list):
-        data = "\n".join(data)
+    """ Saves string data / string list (or any iterable of strings, written line by line) """
+    if isinstance(data,str):
+        data = [data]
 
     with open(filepath, 'w', encoding='utf-8') as f:
         try:
-            f.write(data)
+            for i,line in enumerate(data):
+                if i > 0:
+                    f.write("\n")
+                f.write(line)
         except:
             print(f"Exception writing file {filepath}")
             print(traceback.format_exc())
@@ -34,6 +40,7 @@ def save_json(filepath,data:dict):
 
 def get_soup_from_file(filename):
     """ phpbb """
+    from bs4 import BeautifulSoup
     try:
         with open(filename,'r',encoding='utf-8') as f:
             contents=f.read()
@@ -42,123 +49,162 @@ def get_soup_from_file(filename):
     except:
         print(traceback.format_exc())
 
-def get_bookmark_tree(f):
-    """ creates a dictionary containing all bookmarks and folders in a hirarchical dict tree """
-    num_link=0
-    soup = get_soup_from_file(f)
-    headers = soup.findAll('h3')
-    bookmark_tree={}
-    last_level=0
-    bookmark_tree={}
-    num_headers=0
-
-    for header in headers:
-        num_headers+=1
-        bookmark_folder={}
-
-        # get parents
-        header_parents=header.findParents()
-        # count the parents / level = <dl><p>
-        level=0
-        for header_parent in header_parents:
-            # we look for <dl><p>
-            if header_parent.name=="dl":
-                next_elem=header_parent.find_next()
-                if next and next_elem.name=="p":
-                    level+=1
-        level-=1
-        ts=header.get("add_date")
+def get_date(ts)->str:
+    """ date string from (bookmark) timestamp """
+    return DateTime.utcfromtimestamp(int(ts)).strftime('%Y-%m-%d')
+
+class BookmarkParser(HTMLParser):
+    """ streaming parser for exported bookmarks (netscape bookmark format),
+        nesting of folders is tracked with a stack of open <dl> lists,
+        folders and links are added to the bookmark tree as they are parsed
+    """
+
+    def __init__(self,bookmark_tree:dict=None) -> None:
+        super().__init__(convert_charrefs=True)
+        if bookmark_tree is None:
+            bookmark_tree = {}
+        self.bookmark_tree = bookmark_tree
+        self._num_headers = 0
+        self._num_link = 0
+        # folder index of each open <dl> (None: list without folder)
+        self._dl_stack = []
+        # last folder, its <dl> list is the next one
+        self._pending_folder = None
+        # attributes and text of <h3> or <a> currently parsed
+        self._tag = None
+        self._attrs = None
+        self._text = []
+
+    def handle_starttag(self,tag,attrs):
+        if tag == "dl":
+            self._dl_stack.append(self._pending_folder)
+            self._pending_folder = None
+        elif tag in ["h3","a"]:
+            self._tag = tag
+            self._attrs = dict(attrs)
+            self._text = []
+
+    def handle_data(self,data):
+        if self._tag:
+            self._text.append(data)
+
+    def handle_endtag(self,tag):
+        if tag == "dl":
+            if self._dl_stack:
+                self._dl_stack.pop()
+        elif tag == self._tag:
+            text = "".join(self._text)
+            if tag == "h3":
+                self._add_folder(text,self._attrs)
+            else:
+                self._add_link(text,self._attrs)
+            self._tag = None
+
+    def _get_parent(self)->int:
+        """ index of enclosing folder """
+        for index in reversed(self._dl_stack):
+            if index is not None:
+                return index
+        return 1
+
+    def _add_folder(self,text:str,attrs:dict)->None:
+        """ adds folder, level is number of enclosing lists """
+        self._num_headers += 1
+        num_headers = self._num_headers
+        ts = attrs.get("add_date")
+        header_info = text
         if ts:
-            date_s=DateTime.utcfromtimestamp(int(ts)).strftime('%Y-%m-%d')
-        header_info=header.text+" ("+date_s+")"
+            header_info += " ("+get_date(ts)+")"
         hash_value=str(abs(hash(str(num_headers)+header_info))) # hash value used as anchor for md
-        bookmark_folder={"index":num_headers,"text":header_info,"level":level,"timestamp":ts,"hash":hash_value}
-
-
-        # next part isthe <DL><p>... </DL> part
-        link_section=header.find_next()
-        links = []
-        if link_section:
-            links = link_section.findChildren("a")
-        # get all children links
-        link_list={}
-        for link in links:
-            num_link+=1
-            url=link.get("href")
-            text=link.text
-            if url:
-                ts=header.get("add_date",0)
-                if ts:
-                    date_s=DateTime.utcfromtimestamp(int(ts)).strftime('%Y-%m-%d')
-                    text = "["+str(num_link).zfill(4)+"] "+text+" ("+date_s+")"
-                link_list[num_link]={"url":url,"text":text}
-
-        bookmark_folder["links"]=link_list
-        bookmark_tree[num_headers] = bookmark_folder
-
-    # finally, determine parents
-    for index, bookmark_folder in bookmark_tree.items():
-        if index == 1:
-            bookmark_folder["parent"]=1
-            last_parent = 1
-            last_level = 0
-            continue
-        num = index
-        while not num <= 0:
-            num -= 1 # search previous elements having a lower level
-            if bookmark_tree[num]["level"] < bookmark_folder["level"]:
-                bookmark_folder["parent"]=num
-                last_level = bookmark_folder["level"]
-                last_parent = num
-                num = 0
-            elif bookmark_folder["level"] == last_level: # sibling, use last parent
-                bookmark_folder["parent"]=last_parent
-    return bookmark_tree
+        self.bookmark_tree[num_headers] = {"index":num_headers,"text":header_info,"level":len(self._dl_stack)-1,
+                                           "timestamp":ts,"hash":hash_value,"links":{},
+                                           "parent":self._get_parent()}
+        self._pending_folder = num_headers
+
+    def _add_link(self,text:str,attrs:dict)->None:
+        """ adds link to the folder of the enclosing list """
+        self._num_link += 1
+        folder = self._dl_stack[-1] if self._dl_stack else None
+        url = attrs.get("href")
+        if folder is None or not url:
+            return
+        ts = attrs.get("add_date")
+        if ts:
+            text = "["+str(self._num_link).zfill(4)+"] "+text+" ("+get_date(ts)+")"
+        self.bookmark_tree[folder]["links"][self._num_link] = {"url":url,"text":text}
+
+def get_bookmark_tree(f,chunk_size:int=CHUNK_SIZE):
+    """ creates a dictionary containing all bookmarks and folders in a hirarchical dict tree,
+        the file is parsed in chunks in a single pass
+    """
+    parser = BookmarkParser()
+    try:
+        with open(f,'r',encoding='utf-8') as fp:
+            while True:
+                chunk = fp.read(chunk_size)
+                if not chunk:
+                    break
+                parser.feed(chunk)
+        parser.close()
+    except:
+        print(traceback.format_exc())
+    return parser.bookmark_tree
 
-def create_markdown(bookmark_tree):
-    """ creates markdown version of the bookmark tree """
+def iter_markdown(bookmark_tree):
+    """ yields markdown lines of the bookmark tree: table of contents, then links of each folder.
+        the first top level folder is skipped and its subfolders start at heading level 1,
+        further top level folders are rendered at heading level 1 with their subfolders below
+    """
     def create_md_link(text,url):
         """ creates a markdown link """
         if not url.lower().startswith("http"): # local link
             url="#"+url
         return "["+text+"]("+url+")"
 
+    def get_md_level(index):
+        """ heading level, folders below other top level folders than the first are shifted by one """
+        level = bookmark_tree[index]["level"]
+        while bookmark_tree[index]["level"] > 0:
+            index = bookmark_tree[index]["parent"]
+        return level if index == 1 else level+1
+
     # statistics
     num_links = 0
     num_folders = len(bookmark_tree.keys())
     for index,bookmark_folders in bookmark_tree.items():
         num_links += len(bookmark_folders.get("links").keys())
     # table of coontents
-    toc = ["# TOC",f'## **STATS**: **{num_links}** links in **{num_folders}** folders ({DateTime.now().strftime("%Y-%m-%d %H:%M:%S")})']
-    link_list_md=[]
+    yield "# TOC"
+    yield f'## **STATS**: **{num_links}** links in **{num_folders}** folders ({DateTime.now().strftime("%Y-%m-%d %H:%M:%S")})'
 
-    for index in sorted(list(bookmark_tree.keys())):
+    indices = sorted(list(bookmark_tree.keys()))
+    for index in indices:
+        if index == 1:
+            continue
+        bookmark_folder = bookmark_tree[index]
+        level=get_md_level(index)
+        toc_line=(level-1)*2*" "+"* "
+        toc_line+=level*"#"+" "
+        toc_line+=create_md_link(bookmark_folder["text"],bookmark_folder["hash"])
+        yield toc_line
+
+    for index in indices:
         if index == 1:
             continue
         bookmark_folder = bookmark_tree[index]
         index_s="["+str(index).zfill(3)+"] "
-        hash_value=bookmark_folder["hash"]
-        text = bookmark_folder["text"]
-        level=bookmark_folder["level"]
-        header_line = level*"#"+" "+index_s+text
+        level=get_md_level(index)
+        yield "###### "+bookmark_folder["hash"]
+        yield level*"#"+" "+index_s+bookmark_folder["text"]
         links = bookmark_folder.get("links")
-        anchor="###### "+hash_value
-        # create the table of content
-        toc_line=""
-        if index > 1:
-            toc_line=(level-1)*2*" "+"* "
-        toc_line+=level*"#"+" "
-        toc_line+=create_md_link(text,hash_value)
-        toc.append(toc_line)
-        link_list_md.append(anchor)
-        link_list_md.append(header_line)
-        for index in sorted(list(links.keys())):
-            link_info = links[index]
-            md_link = create_md_link(link_info["text"],link_info["url"])
-            link_list_md.append("* "+md_link)
-        link_list_md.append("\n**[TOC](#toc)**\n")
-
-    return [*toc,*link_list_md]
+        for link_index in sorted(list(links.keys())):
+            link_info = links[link_index]
+            yield "* "+create_md_link(link_info["text"],link_info["url"])
+        yield "\n**[TOC](#toc)**\n"
+
+def create_markdown(bookmark_tree):
+    """ creates markdown version of the bookmark tree """
+    return list(iter_markdown(bookmark_tree))
 
 def run(link_file:str):
     """ create stuff """
@@ -172,8 +218,8 @@ def run(link_file:str):
     f_json=Path.joinpath(p.parent,filename+"json")
     f_md=Path.joinpath(p.parent,filename+"md")    
     bookmark_tree = get_bookmark_tree(link_file)
-    md_string = create_markdown(bookmark_tree)
-    save(f_md,md_string)
+    # markdown lines are written as they are created
+    save(f_md,iter_markdown(bookmark_tree))
     save_json(f_json,bookmark_tree)
     print(f"    Saving files: {str(f_md)}, {str(f_json)}")
 
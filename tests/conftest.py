@@ -6,6 +6,21 @@ import os
 from copy import deepcopy
 from pathlib import Path
 import logging
+import importlib.util
+
+# modules of the repo (util.*, wordle_solver) are imported from the repo root,
+# modules of the tools package (tools.*) from the parent directory of the repo
+p_root = Path(__file__).parent.parent
+if str(p_root) not in sys.path:
+    sys.path.insert(0,str(p_root))
+sys.path.append(str(p_root.parent))
+# repo checked out under a different folder name: register it as package tools
+if importlib.util.find_spec("tools") is None:
+    spec = importlib.util.spec_from_file_location("tools",str(p_root.joinpath("__init__.py")),
+                                                  submodule_search_locations=[str(p_root)])
+    tools = importlib.util.module_from_spec(spec)
+    sys.modules["tools"] = tools
+    spec.loader.exec_module(tools)
 
 @pytest.fixture
 def fixture_testpath()->Path:
@@ -0,0 +1,94 @@
+""" Testing the asyncio subprocess runner """
+
+import sys
+import asyncio
+
+from util.async_cmd_runner import AsyncCmdRunner
+
+PY = f'"{sys.executable}" -c'
+
+def py_cmd(code:str)->str:
+    """ python command line running code """
+    return f'{PY} "{code}"'
+
+def test_run_cmd():
+    """ output and return code of a single command """
+    result = AsyncCmdRunner().run_cmd(py_cmd("print('a');print('b');import sys;sys.exit(3)"))
+    assert result[AsyncCmdRunner.OUTPUT] == ["a\n","b\n"]
+    assert result[AsyncCmdRunner.RETURN_CODE] == 3
+
+def sleep_cmd(p:str,name:str)->str:
+    """ command that writes its pid to p/name.pid and creates p/name.done after 10s """
+    p = p.replace("\\","/")
+    return py_cmd(f"import os,time;open('{p}/{name}.pid','w').write(str(os.getpid()));"
+                  f"time.sleep(10);open('{p}/{name}.done','w').close()")
+
+def test_run_cmd_timeout(tmp_path):
+    """ process is killed after timeout """
+    result = AsyncCmdRunner(timeout=0.5).run_cmd(sleep_cmd(str(tmp_path),"a"))
+    assert result[AsyncCmdRunner.TIMEOUT]
+    assert result[AsyncCmdRunner.RETURN_CODE] is None
+    # the runner waits for the killed process, so it never reaches the end
+    assert not tmp_path.joinpath("a.done").exists()
+
+def test_run_cmd_bounded_output():
+    """ only the last lines of large outputs are kept """
+    runner = AsyncCmdRunner(max_output_lines=10,log_output=False)
+    result = runner.run_cmd(py_cmd("[print(i) for i in range(100000)]"))
+    assert result[AsyncCmdRunner.RETURN_CODE] == 0
+    assert result[AsyncCmdRunner.OUTPUT] == [f"{i}\n" for i in range(99990,100000)]
+
+def test_run_cmds_concurrency(tmp_path):
+    """ number of concurrent processes is limited """
+    p = str(tmp_path).replace("\\","/")
+    # each process registers, waits (max 10s) until 2 processes are registered
+    # and writes its start and end time
+    cmd = py_cmd(f"import os,sys,time;start=time.time();open('{p}/'+str(os.getpid()),'w').close();"
+                 f"ok=any([len(os.listdir('{p}'))>=2 or time.sleep(0.01) for _ in range(1000)]);"
+                 f"time.sleep(0.1);open('{p}/'+str(os.getpid())+'.time','w').write(f'{{start}} {{time.time()}}');"
+                 "sys.exit(0 if ok else 1)")
+    results = AsyncCmdRunner(max_concurrency=2).run_cmds([cmd]*4)
+    assert list(results.keys()) == [0,1,2,3]
+    assert all([r[AsyncCmdRunner.RETURN_CODE] == 0 for r in results.values()])
+    intervals = [[float(t) for t in f.read_text().split()] for f in tmp_path.glob("*.time")]
+    assert len(intervals) == 4
+    # max number of processes running at the same time
+    events = sorted([(start,1) for start,_ in intervals]+[(end,-1) for _,end in intervals],key=lambda e:(e[0],e[1]))
+    num_running = [sum([e[1] for e in events[:i+1]]) for i in range(len(events))]
+    assert max(num_running) == 2
+
+def test_run_cmds_cancel(tmp_path):
+    """ cancelled commands are killed """
+    async def run_and_cancel():
+        runner = AsyncCmdRunner(max_concurrency=2)
+        task = asyncio.ensure_future(runner.run_cmds_async([sleep_cmd(str(tmp_path),n) for n in ["a","b"]]))
+        # cancel once both processes are running
+        for _ in range(1000):
+            if len(list(tmp_path.glob("*.pid"))) == 2:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+    assert asyncio.run(run_and_cancel())
+    assert len(list(tmp_path.glob("*.pid"))) == 2
+    assert list(tmp_path.glob("*.done")) == []
+
+def test_run_cmd_running_loop():
+    """ synchronous facade can be used from within a running event loop """
+    async def run_in_loop():
+        return AsyncCmdRunner().run_cmd(py_cmd("print('a')"))
+    result = asyncio.run(run_in_loop())
+    assert result[AsyncCmdRunner.RETURN_CODE] == 0
+    assert result[AsyncCmdRunner.OUTPUT] == ["a\n"]
+
+def test_run_cmd_timeout_after_eof(tmp_path):
+    """ timeout also applies to processes running on after closing their output """
+    f_done = str(tmp_path.joinpath("done")).replace("\\","/")
+    cmd = py_cmd(f"import os,time;os.close(1);os.close(2);time.sleep(10);open('{f_done}','w').close()")
+    result = AsyncCmdRunner(timeout=0.5).run_cmd(cmd)
+    assert result[AsyncCmdRunner.TIMEOUT]
+    assert not tmp_path.joinpath("done").exists()
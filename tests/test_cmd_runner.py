@@ -0,0 +1,62 @@
+""" Testing the concurrent job execution of the cmd_client CmdRunner """
+
+import pytest
+
+import sys
+
+cmd_runner = pytest.importorskip("tools.cmd_client.cmd_runner")
+CmdRunner = cmd_runner.CmdRunner
+
+PY = f'"{sys.executable}" -c'
+
+def py_cmd(code:str)->str:
+    """ python command line running code """
+    return f'{PY} "{code}"'
+
+def barrier_cmd(p:str,parties:int)->str:
+    """ command that registers in folder p and waits (max 10s) until parties commands
+        are registered, fails if they don't run at the same time
+    """
+    p = p.replace("\\","/")
+    return py_cmd(f"import os,sys,time;open('{p}/'+str(os.getpid()),'w').close();"
+                  f"ok=any([len(os.listdir('{p}'))>={parties} or time.sleep(0.01) for _ in range(1000)]);"
+                  "print('done');sys.exit(0 if ok else 1)")
+
+def test_run_jobs_concurrent(tmp_path):
+    """ independent jobs run in parallel """
+    cmds = [barrier_cmd(str(tmp_path),4)]*4
+    results = CmdRunner().run_jobs(cmds,max_workers=4)
+    assert sorted(results.keys()) == [0,1,2,3]
+    assert all([r[CmdRunner.RETURN_CODE] == 0 for r in results.values()])
+    assert results[0][CmdRunner.OUTPUT] == ["done\n"]
+
+def test_run_jobs_graph(tmp_path):
+    """ jobs wait for their predecessors, jobs after failed jobs are skipped """
+    f_log = str(tmp_path.joinpath("log.txt")).replace("\\","/")
+    def log_cmd(name,sleep=0):
+        return py_cmd(f"import time;time.sleep({sleep});open('{f_log}','a').write('{name}')")
+    cmds = {"a":log_cmd("a",0.3),"b":log_cmd("b"),"c":log_cmd("c"),
+            "d":py_cmd("import sys;sys.exit(2)"),"e":log_cmd("e")}
+    depends_on = {"c":["a","b"],"e":["d"]}
+    results = CmdRunner().run_jobs(cmds,depends_on=depends_on,max_workers=2)
+    assert tmp_path.joinpath("log.txt").read_text() in ["bac","abc"]
+    assert results["c"][CmdRunner.RETURN_CODE] == 0
+    assert results["d"][CmdRunner.RETURN_CODE] == 2
+    assert results["e"][CmdRunner.SKIPPED]
+
+def test_run_jobs_cyclic():
+    """ jobs with cyclic dependencies are not run """
+    cmds = {"a":py_cmd("print(1)"),"b":py_cmd("print(2)")}
+    results = CmdRunner().run_jobs(cmds,depends_on={"a":["b"],"b":["a"]})
+    assert results["a"][CmdRunner.SKIPPED] and results["b"][CmdRunner.SKIPPED]
+
+def test_run_timeout(tmp_path):
+    """ timed out commands are killed and reported as failed """
+    f_done = str(tmp_path.joinpath("done.txt")).replace("\\","/")
+    cmd = py_cmd(f"import time;time.sleep(10);open('{f_done}','w').close()")
+    runner = CmdRunner()
+    assert runner.run_cmd(cmd,timeout=0.5) == 1
+    results = runner.run_jobs([py_cmd("print(1)"),cmd],timeout=0.5)
+    assert results[1][CmdRunner.TIMEOUT]
+    assert runner._return_code == 1
+    assert not tmp_path.joinpath("done.txt").exists()
@@ -0,0 +1,19 @@
+""" Testing the cmd_client ConfigCache """
+
+import pytest
+
+config_cache = pytest.importorskip("tools.cmd_client.config_cache")
+ConfigCache = config_cache.ConfigCache
+
+def test_cache_working_dir(tmp_path,monkeypatch):
+    """ paths are resolved against the working dir: cache is only valid for the same working dir """
+    f_config = tmp_path.joinpath("config.yaml")
+    f_config.write_text("root:\n  path: data\n",encoding="utf-8")
+    for p in ["a","b"]:
+        tmp_path.joinpath(p).mkdir()
+    monkeypatch.chdir(tmp_path.joinpath("a"))
+    config = {"root":{"path":"data","resolved_path":str(tmp_path.joinpath("a","data"))}}
+    assert ConfigCache(str(f_config)).save(config,{}) is not None
+    assert ConfigCache(str(f_config)).load()[ConfigCache.CONFIG] == config
+    monkeypatch.chdir(tmp_path.joinpath("b"))
+    assert ConfigCache(str(f_config)).load() is None
@@ -0,0 +1,77 @@
+""" Testing the compiled pattern templates against the original pattern filling """
+
+import pytest
+
+import re
+import random
+
+config_resolver = pytest.importorskip("tools.cmd_client.config_resolver")
+ConfigResolver = config_resolver.ConfigResolver
+PatternTemplate = config_resolver.PatternTemplate
+
+PARAMS = ["a","b","file","path"]
+TEXT = ["cmd"," ","  ","-x ","--opt=",'"',"'","/","\\","[","]","x"]
+
+def get_filled_pattern_reference(pattern,**kwargs):
+    """ original implementation of ConfigResolver.get_filled_pattern """
+    out = pattern
+    placeholders = re.findall(ConfigResolver.REGEX_PLACEHOLDER,pattern)
+    for placeholder in placeholders:
+        placeholder_out = placeholder
+        params = re.findall(ConfigResolver.REGEX_PARAM,placeholder)
+        complete = True
+        for param in params:
+            value = kwargs.get(param[1:-1].strip())
+            if not value:
+                complete = False
+                break
+            placeholder_out=placeholder_out.replace(param,value)
+        if complete:
+            out = out.replace(placeholder,placeholder_out[1:-1])
+        else:
+            out = out.replace(placeholder,"")
+    out = out.strip()
+    while '  ' in out:
+        out = out.replace('  ', ' ')
+    return out
+
+def get_random_pattern(rnd:random.Random)->str:
+    """ random pattern with text, params and placeholders """
+    parts = []
+    for _ in range(rnd.randint(0,8)):
+        match rnd.randint(0,3):
+            case 0:
+                parts.append(rnd.choice(TEXT))
+            case 1:
+                parts.append(f"[{rnd.choice(PARAMS)}]")
+            case _:
+                inner = [rnd.choice(TEXT) if rnd.random() < 0.5 else f"[ {rnd.choice(PARAMS)}]"
+                         for _ in range(rnd.randint(1,4))]
+                parts.append("{"+"".join(inner)+"}")
+    return "".join(parts)
+
+def get_random_params(rnd:random.Random)->dict:
+    """ random param values, values don't contain brackets """
+    values = [None,"","v","value with  spaces",'"c:/some path"',"'q'"]
+    return {p:rnd.choice(values) for p in PARAMS if rnd.random() < 0.8}
+
+def test_pattern_template_examples():
+    """ optional groups are dropped if a param has no value """
+    pattern = "my expression with {[parama]} and {[paramb]} and {[xyz paramc]}"
+    params = {"parama":"myvaluea","paramc":None}
+    assert ConfigResolver.get_filled_pattern(pattern,**params) == "my expression with myvaluea and and"
+    template = PatternTemplate.get_template('cmd {"[file]"} {-p [path]}')
+    assert template is PatternTemplate.get_template('cmd {"[file]"} {-p [path]}')
+    assert template.has_quotes("file")
+    assert not template.has_quotes("path")
+    assert template.render(file="f.txt",path="p") == 'cmd "f.txt" -p p'
+
+def test_pattern_template_random():
+    """ compiled template renders identical to the original implementation """
+    rnd = random.Random(42)
+    for _ in range(5000):
+        pattern = get_random_pattern(rnd)
+        params = get_random_params(rnd)
+        expected = get_filled_pattern_reference(pattern,**params)
+        assert PatternTemplate(pattern).render(**params) == expected, pattern
+        assert ConfigResolver.get_filled_pattern(pattern,**params) == expected, pattern
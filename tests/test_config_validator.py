@@ -0,0 +1,59 @@
+""" Testing the cmd_client ConfigValidator against the report of the sample config """
+
+import pytest
+
+import os
+import sys
+import types
+from pathlib import Path
+
+# configpath is a local (not versioned) module pointing to the user's config
+try:
+    import tools.cmd_client.configpath
+except ImportError:
+    configpath = types.ModuleType("tools.cmd_client.configpath")
+    configpath.CONFIG_PATH = configpath.VALIDATION_REPORT = None
+    sys.modules["tools.cmd_client.configpath"] = configpath
+
+config_validator = pytest.importorskip("tools.cmd_client.config_validator")
+ConfigValidator = config_validator.ConfigValidator
+
+P_TESTS = Path(__file__).parent
+F_CONFIG = str(P_TESTS.parent.joinpath("cmd_client","param_config_sample.yaml"))
+# report of the sample config, paths relative to the working dir are marked as <cwd>
+F_REPORT = str(P_TESTS.joinpath("data","param_config_sample_report.md"))
+
+@pytest.fixture
+def fixture_validator(tmp_path,monkeypatch)->ConfigValidator:
+    """ validator of the sample config, working dir is tmp_path """
+    monkeypatch.chdir(tmp_path)
+    return ConfigValidator(F_CONFIG,str(tmp_path.joinpath("report.md")))
+
+def test_report(fixture_validator,tmp_path):
+    """ validation report of the sample config is unchanged (except creation date) """
+    fixture_validator.check()
+    report = fixture_validator.create_report()
+    assert report[-1].startswith("CREATED:")
+    with open(F_REPORT,encoding="utf-8") as f:
+        expected = f.read()
+    assert "\n".join(report[:-1]).replace(str(tmp_path),"<cwd>")+"\n" == expected
+    with open(tmp_path.joinpath("report.md"),encoding="utf-8") as f:
+        assert f.read().splitlines() == "\n".join(report).splitlines()
+
+def test_stat_cache(fixture_validator,tmp_path,monkeypatch):
+    """ path and file values are checked once, also for missing paths """
+    stat_cache = fixture_validator._stat_cache
+    assert stat_cache["."] == (True,False)
+    assert stat_cache[str(tmp_path)] == (True,False)
+    assert stat_cache["C:/<PATH_TO>"] == (False,False)
+    f_file = tmp_path.joinpath("a.txt")
+    f_file.write_text("a")
+    os_objects = [str(f_file),str(tmp_path.joinpath("missing")),None]
+    assert [fixture_validator._stat(o) for o in os_objects] == [(False,True),(False,False),(False,False)]
+    assert fixture_validator._is_file(str(f_file)) and not fixture_validator._is_dir(str(f_file))
+    # cached results are used without file system access
+    def fail_stat(*args,**kwargs):
+        raise AssertionError("os.stat called")
+    monkeypatch.setattr(os,"stat",fail_stat)
+    assert [fixture_validator._stat(o) for o in os_objects] == [(False,True),(False,False),(False,False)]
+    assert fixture_validator._is_dir(".")
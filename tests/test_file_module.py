@@ -0,0 +1,192 @@
+""" Testing content extraction and markdown header index of file_module """
+
+import pytest
+
+import os
+import json
+import threading
+
+file_module = pytest.importorskip("tools.file_module")
+
+@pytest.fixture
+def fixture_files(tmp_path)->str:
+    """ text, json, custom and unknown file types in nested folders """
+    files = {"a.txt":"# comment\nline 1\n\nline 2\n","b.json":'{"k":"v"}',"c.xyz":"unknown",
+             "sub/d.txt":"0123456789abc\nxyz\n","sub/deep/e.json":"[1,2,3]"}
+    files.update({f"many/f{str(i).zfill(2)}.dat":f"dat {i}" for i in range(40)})
+    for f,data in files.items():
+        p = tmp_path.joinpath(f)
+        p.parent.mkdir(parents=True,exist_ok=True)
+        p.write_text(data,encoding="utf-8")
+    return str(tmp_path)
+
+@pytest.fixture
+def fixture_dat_extractor(monkeypatch)->list:
+    """ extractor for dat files, returns list of read files """
+    calls = []
+    lock = threading.Lock()
+    def read_dat(pf):
+        with lock:
+            calls.append(pf.name)
+        return pf.read_text()
+    monkeypatch.setitem(file_module.content_extractors,"dat",read_dat)
+    return calls
+
+def walk_files(fp)->list:
+    """ (subpath,filename) in walk order """
+    return [(subpath,f) for subpath,_,files in os.walk(fp) for f in files]
+
+def test_read_txt_file_max_size(tmp_path):
+    """ only max_size characters are read, also within lines """
+    f = tmp_path.joinpath("a.txt")
+    f.write_text("0123456789abc\nxyz\n",encoding="utf-8")
+    assert file_module.read_txt_file(f) == ["0123456789abc","xyz"]
+    assert file_module.read_txt_file(f,max_size=10) == ["0123456789"]
+    assert file_module.read_txt_file(f,max_size=15) == ["0123456789abc","x"]
+
+def test_extract_content(fixture_files):
+    """ content, size and truncation by file type """
+    p = os.path.join(fixture_files,"sub")
+    info = file_module.extract_content(os.path.join(p,"d.txt"),"txt")
+    assert info == {"content":["0123456789abc","xyz"],"size":18,"truncated":False}
+    info = file_module.extract_content(os.path.join(p,"d.txt"),"txt",max_size=10)
+    assert info == {"content":["0123456789"],"size":18,"truncated":True}
+    # other file types are not read partially
+    info = file_module.extract_content(os.path.join(p,"deep","e.json"),"json",max_size=3)
+    assert info == {"content":None,"size":7,"truncated":True}
+    assert file_module.extract_content(os.path.join(p,"deep","e.json"),"json")["content"] == [1,2,3]
+    assert file_module.extract_content(os.path.join(p,"missing.txt"),"txt")["size"] is None
+    assert file_module.truncate_content(["ab","cd","ef"],max_size=5) == (["ab","cd"],True)
+
+def test_iter_file_info(fixture_files,fixture_dat_extractor):
+    """ results in walk order, number of pending extractions is bounded """
+    max_workers = 2
+    max_pending = max_workers*file_module.PENDING_PER_WORKER
+    file_infos = []
+    for i,file_info in enumerate(file_module.iter_file_info(fixture_files,max_workers=max_workers)):
+        # files are only read ahead up to the pending limit
+        assert len(fixture_dat_extractor) <= i+1+max_pending
+        file_infos.append(file_info)
+    assert [(i["subpath"],i["filename"]) for i in file_infos] == walk_files(fixture_files)
+    assert len(fixture_dat_extractor) == 40
+    info_dict = {i["filename"]:i for i in file_infos}
+    assert info_dict["a.txt"] == {"subpath":fixture_files,"filename":"a.txt","filetype":"txt",
+                                  "content":["line 1","line 2"],"size":25,"truncated":False}
+    assert info_dict["f07.dat"]["content"] == "dat 7"
+    assert info_dict["c.xyz"] == {"subpath":fixture_files,"filename":"c.xyz","filetype":"xyz"}
+    assert info_dict["d.txt"]["subpath"] == os.path.join(fixture_files,"sub")
+    # comment lines count for max size
+    file_infos = list(file_module.iter_file_info(fixture_files,type_filters=["txt"],max_size=17))
+    assert [(i["filename"],i["content"],i["truncated"]) for i in file_infos] == \
+           [("a.txt",["line 1"],True),("d.txt",["0123456789abc","xyz"],True)]
+
+def test_iter_file_info_lazy(fixture_files,fixture_dat_extractor):
+    """ lazy content is only read on access """
+    file_infos = list(file_module.iter_file_info(fixture_files,type_filters=["dat"],lazy=True))
+    assert len(file_infos) == 40 and fixture_dat_extractor == []
+    handle = file_infos[3]["content"]
+    assert isinstance(handle,file_module.ContentHandle)
+    assert "size" not in file_infos[3] and "truncated" not in file_infos[3]
+    assert handle.content() == "dat "+str(int(file_infos[3]["filename"][1:3]))
+    assert (handle.size(),handle.truncated()) == (len(handle.content()),False)
+    assert fixture_dat_extractor == [file_infos[3]["filename"]]
+    subpath_dict = file_module.read_file_info(fixture_files,type_filters=["dat"],lazy=True)
+    assert len(subpath_dict[os.path.join(fixture_files,"many")]["file_details"]) == 40
+    assert len(fixture_dat_extractor) == 1
+
+def test_save_file_info_jsonl(fixture_files,tmp_path):
+    """ one json line per file """
+    f_jsonl = str(tmp_path.joinpath("files.jsonl"))
+    assert file_module.save_file_info_jsonl(fixture_files,f_jsonl,type_filters=["txt","json"]) == 4
+    with open(f_jsonl,encoding="utf-8") as f:
+        file_infos = [json.loads(line) for line in f]
+    assert sorted([i["filename"] for i in file_infos]) == ["a.txt","b.json","d.txt","e.json"]
+    assert {i["filename"]:i["content"] for i in file_infos}["e.json"] == [1,2,3]
+    assert all([i["truncated"] is False for i in file_infos])
+
+# headers in ``` and ~~~ code blocks, fences with info strings and longer fences
+MD_FENCES = """# Intro: Part (1)
+````markdown
+```python
+# not a header
+```
+# still in code
+````
+## [Linked](https://x.org)
+~~~
+```
+# in tilde block
+~~~
+   ```
+# in indented block
+   ```
+#no header
+### Last
+"""
+
+def test_get_md_headers(tmp_path):
+    """ headers outside of code blocks, file with BOM """
+    f_md = tmp_path.joinpath("fences.md")
+    f_md.write_text(MD_FENCES,encoding="utf-8")
+    assert file_module.get_md_headers(str(f_md)) == [[1,"Intro: Part (1)","intro-part-1"],
+                                                     [2,"Linked","linked"],[3,"Last","last"]]
+    f_bom = tmp_path.joinpath("bom.md")
+    f_bom.write_text("# Title\ntext\n",encoding="utf-8-sig")
+    assert f_bom.read_bytes().startswith(b"\xef\xbb\xbf")
+    assert file_module.get_md_headers(str(f_bom)) == [[1,"Title","title"]]
+    assert file_module.md2toc(str(f_md),as_string=False) == ["* [Intro: Part (1)](#intro-part-1)  ",
+                                                             "  * [Linked](#linked)  ","    * [Last](#last)  "]
+
+@pytest.fixture
+def fixture_md_files(tmp_path)->str:
+    """ markdown files in root and subfolder, other file types """
+    p_md = tmp_path.joinpath("md")
+    files = {"a.md":"# Setup\n## Usage\n","sub/b file.md":"# Usage\n# api\n","sub/c.txt":"# no markdown\n"}
+    for f,data in files.items():
+        p = p_md.joinpath(f)
+        p.parent.mkdir(parents=True,exist_ok=True)
+        p.write_text(data,encoding="utf-8")
+    return str(p_md)
+
+def test_index_md_headers_cache(fixture_md_files,tmp_path,monkeypatch):
+    """ only new and changed files are read, cache follows the files in path """
+    read_files = []
+    get_md_headers = file_module.get_md_headers
+    def get_md_headers_counted(f):
+        read_files.append(os.path.basename(f))
+        return get_md_headers(f)
+    monkeypatch.setattr(file_module,"get_md_headers",get_md_headers_counted)
+    f_cache = str(tmp_path.joinpath("md_cache.json"))
+    md_index = file_module.index_md_headers(fixture_md_files,f_cache)
+    assert sorted(read_files) == ["a.md","b file.md"]
+    f_b = os.path.join(fixture_md_files,"sub","b file.md")
+    assert md_index[os.path.abspath(f_b)]["headers"] == [[1,"Usage","usage"],[1,"api","api"]]
+    assert file_module.read_json(f_cache) == md_index
+    read_files.clear()
+    assert file_module.index_md_headers(fixture_md_files,f_cache) == md_index
+    assert read_files == []
+    # edited file
+    with open(f_b,"w",encoding="utf-8") as f:
+        f.write("# Usage\n# API Reference\n")
+    mtime = os.stat(f_b).st_mtime+10
+    os.utime(f_b,(mtime,mtime))
+    md_index = file_module.index_md_headers(fixture_md_files,f_cache)
+    assert read_files == ["b file.md"]
+    assert md_index[os.path.abspath(f_b)]["headers"][1] == [1,"API Reference","api-reference"]
+    # deleted file
+    read_files.clear()
+    os.remove(f_b)
+    md_index = file_module.index_md_headers(fixture_md_files,f_cache)
+    assert read_files == [] and len(md_index) == 1
+    assert file_module.read_json(f_cache) == md_index
+
+def test_md_cross_index(fixture_md_files):
+    """ labels sorted case insensitive with links relative to the root path """
+    md_index = file_module.index_md_headers(fixture_md_files)
+    assert file_module.md_cross_index(md_index,fixture_md_files,as_string=False) == [
+        "* api: [b file](sub/b%20file.md#api)",
+        "* Setup: [a](a.md#setup)",
+        "* Usage: [a](a.md#usage), [b file](sub/b%20file.md#usage)"]
+    cross_index = file_module.md_cross_index(md_index,os.path.join(fixture_md_files,"sub"))
+    assert cross_index.splitlines()[0] == "* api: [b file](b%20file.md#api)"
+    assert "[a](../a.md#setup)" in cross_index and cross_index.endswith("\n")
@@ -0,0 +1,67 @@
+""" Testing the /util/geo_cache module against a local stand-in nominatim server """
+
+import pytest
+
+import json
+import threading
+from functools import partial
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from util.geo_cache import GeoCache, nominatim_reverse
+
+class ReverseHandler(BaseHTTPRequestHandler):
+    """ answers reverse requests with the requested coordinates """
+    requests = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        ReverseHandler.requests.append(query)
+        data = {"lat":query["lat"][0],"lon":query["lon"][0],"display_name":"Stand-in Place"}
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type","application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self,*args):
+        pass
+
+@pytest.fixture
+def fixture_backend():
+    """ backend requesting a local stand-in server """
+    ReverseHandler.requests = []
+    server = HTTPServer(("127.0.0.1",0),ReverseHandler)
+    thread = threading.Thread(target=server.serve_forever,daemon=True)
+    thread.start()
+    yield partial(nominatim_reverse,url=f"http://127.0.0.1:{server.server_port}/reverse")
+    server.shutdown()
+    server.server_close()
+
+def test_reverse_batch(fixture_backend,tmp_path):
+    """ only cache misses are requested, cache is persisted """
+    f_cache = str(tmp_path.joinpath("geo_cache.json"))
+    geo_cache = GeoCache(f_cache,backend=fixture_backend,radius=0.1,min_interval=0)
+    # second coordinate is ~15m away from first one
+    results = geo_cache.reverse_batch([(49.0,8.0),(49.0001,8.0001),(49.01,8.0)])
+    assert len(ReverseHandler.requests) == 2
+    assert results[1] == results[0]
+    assert results[2]["lat"] == "49.01"
+    geo_cache = GeoCache(f_cache,backend=fixture_backend,min_interval=0)
+    assert len(geo_cache) == 2
+    assert geo_cache.reverse((49.0005,7.9995))["display_name"] == "Stand-in Place"
+    assert len(ReverseHandler.requests) == 2
+
+def test_import_gazetteer(fixture_backend,tmp_path):
+    """ gazetteer entries are looked up separately without backend requests """
+    f_gazetteer = tmp_path.joinpath("places.csv")
+    f_gazetteer.write_text("name,latitude,longitude\nKarlsruhe,49.00937,8.40444\n",encoding="utf-8")
+    geo_cache = GeoCache(backend=fixture_backend,radius=1,min_interval=0)
+    assert geo_cache.import_gazetteer(str(f_gazetteer)) == 1
+    assert geo_cache.lookup_gazetteer((49.01,8.41)) == {"name":"Karlsruhe"}
+    assert geo_cache.lookup_gazetteer((49.1,8.41)) is None
+    assert not ReverseHandler.requests
+    # gazetteer rows are not used as backend results
+    assert geo_cache.lookup((49.01,8.41)) is None
+    assert geo_cache.reverse((49.01,8.41))["display_name"] == "Stand-in Place"
+    assert len(ReverseHandler.requests) == 1
@@ -0,0 +1,51 @@
+""" Testing the gmic_runner batch jobs (gmic calls are replaced by a stand-in) """
+
+import pytest
+
+import os
+import subprocess
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+pytest.importorskip("pandas")
+gmic_runner = pytest.importorskip("tools.gmic_runner")
+
+FILTER = {"name":"Test Filter","command":"fx_test","parameters":[]}
+
+def fake_gmic(params,cwd,**kwargs):
+    """ writes the output file (relative to cwd), fails for input fail.jpg """
+    if params[2] == "fail.jpg":
+        with open(os.path.join(cwd,params[-1]),"w") as f:
+            f.write("partial")
+        return SimpleNamespace(returncode=1,stdout="",stderr="error")
+    if params[2] == "crash.jpg":
+        raise RuntimeError("crashed")
+    with open(os.path.join(cwd,params[-1]),"w") as f:
+        f.write("image")
+    return SimpleNamespace(returncode=0,stdout="ok",stderr="")
+
+@pytest.fixture
+def fixture_jobs(tmp_path,monkeypatch):
+    """ jobs for sample images using relative paths """
+    monkeypatch.setattr(gmic_runner,"get_param_string_from_dict",lambda *args:"1,2")
+    monkeypatch.setattr(subprocess,"run",fake_gmic)
+    monkeypatch.setattr(gmic_runner,"ProcessPoolExecutor",ThreadPoolExecutor)
+    tmp_path.joinpath("img").mkdir()
+    for f in ["ok.jpg","fail.jpg","crash.jpg"]:
+        tmp_path.joinpath("img",f).write_text(f)
+    monkeypatch.chdir(tmp_path)
+    return gmic_runner.get_job_list("img",["ok.jpg","fail.jpg","crash.jpg"],[FILTER])
+
+def test_run_batch(fixture_jobs,tmp_path):
+    """ only successful outputs are kept and used as cache, failing jobs don't abort the batch """
+    assert all([os.path.isabs(job["file_out"]) for job in fixture_jobs])
+    results = {r["file_in"]:r for r in gmic_runner.run_batch(fixture_jobs,verbose=False)}
+    assert results["ok.jpg"]["status"] == 0
+    assert results["fail.jpg"]["status"] == 1
+    assert results["crash.jpg"]["status"] == gmic_runner.JOB_ERROR
+    assert os.path.isfile(results["ok.jpg"]["file_out"])
+    assert sorted(os.listdir(tmp_path.joinpath("img"))) == sorted(["ok.jpg","fail.jpg","crash.jpg",
+                                                                    os.path.basename(results["ok.jpg"]["file_out"])])
+    results = {r["file_in"]:r for r in gmic_runner.run_batch(fixture_jobs,verbose=False)}
+    assert results["ok.jpg"]["status"] is None
+    assert results["fail.jpg"]["status"] == 1
@@ -0,0 +1,47 @@
+""" Testing the Pillow rendering of analysis images in img_analyzer """
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+ImageFont = pytest.importorskip("PIL.ImageFont")
+img_analyzer = pytest.importorskip("tools.img_analyzer")
+
+@pytest.fixture
+def fixture_jpg(tmp_path)->str:
+    """ gray jpeg image 2000x1500 """
+    f_jpg = str(tmp_path.joinpath("img.jpg"))
+    Image.new("RGB",(2000,1500),(128,128,128)).save(f_jpg,quality=90)
+    return f_jpg
+
+def test_render_ana_image(fixture_jpg,tmp_path):
+    """ resized image with focus box scaled to output size and text below """
+    f_out = str(tmp_path.joinpath("img_ana.jpg"))
+    metadata = {"SourceFile":"img.jpg","FocusLocation":"6000 4000 3000 2000","ImageWidth":6000,"ImageHeight":4000}
+    result,box = img_analyzer.render_ana_image(fixture_jpg,f_out,metadata,image_size=1000)
+    assert result == f_out
+    # box relative to the rendered image size
+    assert box == [[450,338],[500,375],[550,412]]
+    with Image.open(f_out) as img:
+        width,height = img.size
+        r,g,b = img.convert("RGB").getpixel((451,375))
+    assert width == 1000 and height > 750
+    # orange box outline
+    assert r > 200 and 100 < g < 220 and b < 80
+
+def test_render_ana_image_fallback_font(fixture_jpg,tmp_path,monkeypatch):
+    """ default font without size (Pillow < 10.1), unreadable input """
+    load_default = ImageFont.load_default
+    def load_default_without_size(*args,**kwargs):
+        if args or kwargs:
+            raise TypeError("load_default() got an unexpected keyword argument 'size'")
+        return load_default()
+    monkeypatch.setattr(ImageFont,"load_default",load_default_without_size)
+    draw_config = dict(img_analyzer.ImageAnalyzer.PIL_BOX_CONFIG,font="missing_font.ttf")
+    f_out = str(tmp_path.joinpath("img_ana.jpg"))
+    result,_ = img_analyzer.render_ana_image(fixture_jpg,f_out,{},image_size=200,draw_config=draw_config)
+    assert result == f_out
+    with Image.open(f_out) as img:
+        assert img.size[1] > 150
+    f_invalid = tmp_path.joinpath("invalid.jpg")
+    f_invalid.write_text("no image")
+    assert img_analyzer.render_ana_image(str(f_invalid),f_out,{}) == (None,None)
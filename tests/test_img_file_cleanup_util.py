@@ -0,0 +1,99 @@
+""" Testing the journaled cleanup engine of img_file_cleanup_util """
+
+import pytest
+
+import os
+import json
+
+cleanup = pytest.importorskip("tools.img_file_cleanup_util")
+
+def write_files(root,names:list)->None:
+    """ creates files with content in root """
+    for name in names:
+        p = root.joinpath(name)
+        p.parent.mkdir(parents=True,exist_ok=True)
+        p.write_text(name)
+
+def test_move_rollback(tmp_path):
+    """ moves are journaled and can be rolled back, existing journal is not overwritten """
+    write_files(tmp_path,["a.jpg","b.jpg"])
+    target = str(tmp_path.joinpath("70POST"))
+    fp_journal = str(tmp_path.joinpath(cleanup.JOURNAL_FILE))
+    operations = [{"op":cleanup.OP_MKDIR,"from":target}]
+    operations.extend([{"op":cleanup.OP_MOVE,"from":str(tmp_path.joinpath(f)),"to":os.path.join(target,f)}
+                       for f in ["a.jpg","b.jpg"]])
+    report = cleanup.execute_operations(operations,fp_journal,verbose=False)
+    assert report["num_ops"] == 3 and report["num_failed"] == 0
+    assert sorted(os.listdir(target)) == ["a.jpg","b.jpg"]
+    with pytest.raises(FileExistsError):
+        cleanup.execute_operations(operations,fp_journal,verbose=False)
+    assert len(cleanup.read_journal(fp_journal)["done"]) == 3
+    report = cleanup.rollback(fp_journal,verbose=False)
+    assert report["num_failed"] == 0
+    assert sorted(os.listdir(tmp_path)) == ["a.jpg","b.jpg"]
+
+def test_resume(tmp_path):
+    """ interrupted cleanup is resumed from the journal, done operations are skipped """
+    write_files(tmp_path,["tmp/a.xmp","tmp/b.xmp"])
+    fp_journal = str(tmp_path.joinpath(cleanup.JOURNAL_FILE))
+    files = [str(tmp_path.joinpath("tmp",f)) for f in ["a.xmp","b.xmp"]]
+    operations = [{"op":cleanup.OP_DELETE,"from":f} for f in files]
+    operations.append({"op":cleanup.OP_RMDIR,"from":str(tmp_path.joinpath("tmp"))})
+    # first file was deleted before the interruption, last line is incomplete
+    os.remove(files[0])
+    with open(fp_journal,"w",encoding="utf-8") as f:
+        f.write(json.dumps({"plan":operations})+"\n")
+        f.write(json.dumps({"done":0,"bytes":5})+"\n")
+        f.write('{"done":')
+    report = cleanup.resume(fp_journal,verbose=False)
+    assert report["num_ops"] == 2 and report["num_failed"] == 0
+    assert report["bytes_freed"] == len("tmp/b.xmp")
+    assert os.listdir(tmp_path) == []
+
+def test_delete_failing_rmdir(tmp_path,monkeypatch):
+    """ folder that can't be removed is reported, journal is kept """
+    write_files(tmp_path,["tmp/a.xmp","tmp/keep.geo"])
+    plan = {"folders":[str(tmp_path.joinpath("tmp"))],"files":[str(tmp_path.joinpath("tmp","a.xmp"))]}
+    monkeypatch.setattr(cleanup,"plan_delete",lambda *args,**kwargs:plan)
+    monkeypatch.setattr("builtins.input",lambda *args:"y")
+    result = cleanup.delete(str(tmp_path),verbose=False)
+    report = result["report"]
+    assert report["num_ops"] == 1 and report["num_failed"] == 1
+    assert report["failed"][0]["op"] == cleanup.OP_RMDIR
+    fp_journal = tmp_path.joinpath(cleanup.JOURNAL_FILE)
+    assert fp_journal.is_file()
+    assert cleanup.read_journal(str(fp_journal))["failed"] == {1:report["failed"][0]["error"]}
+    assert sorted(os.listdir(tmp_path.joinpath("tmp"))) == ["keep.geo"]
+
+def test_resume_unjournaled(tmp_path):
+    """ operations executed before their journal entry was written count as done on resume """
+    write_files(tmp_path,["a.xmp","b.jpg","c.jpg"])
+    fp_journal = str(tmp_path.joinpath(cleanup.JOURNAL_FILE))
+    target = str(tmp_path.joinpath("70POST"))
+    operations = [{"op":cleanup.OP_MKDIR,"from":target},
+                  {"op":cleanup.OP_DELETE,"from":str(tmp_path.joinpath("a.xmp"))}]
+    operations.extend([{"op":cleanup.OP_MOVE,"from":str(tmp_path.joinpath(f)),"to":os.path.join(target,f)}
+                       for f in ["b.jpg","c.jpg"]])
+    # delete and first move finished, but only mkdir was journaled
+    os.mkdir(target)
+    os.remove(operations[1]["from"])
+    os.rename(operations[2]["from"],operations[2]["to"])
+    with open(fp_journal,"w",encoding="utf-8") as f:
+        f.write(json.dumps({"plan":operations})+"\n")
+        f.write(json.dumps({"done":0,"bytes":0})+"\n")
+    report = cleanup.resume(fp_journal,verbose=False,keep_journal=True)
+    assert report["num_ops"] == 3 and report["num_failed"] == 0
+    assert sorted(os.listdir(target)) == ["b.jpg","c.jpg"]
+    report = cleanup.rollback(fp_journal,verbose=False)
+    assert report["num_failed"] == 0
+    assert sorted(os.listdir(tmp_path)) == ["b.jpg","c.jpg"]
+
+def test_move_existing_target(tmp_path):
+    """ move onto an existing file is skipped, not failed, journal is removed """
+    write_files(tmp_path,["a.jpg","70POST/a.jpg"])
+    operations = [{"op":cleanup.OP_MOVE,"from":str(tmp_path.joinpath("a.jpg")),
+                   "to":str(tmp_path.joinpath("70POST","a.jpg"))}]
+    report = cleanup._execute(str(tmp_path),operations,None,2,False,False,False)
+    assert (report["num_ops"],report["num_skipped"],report["num_failed"]) == (0,1,0)
+    assert not tmp_path.joinpath(cleanup.JOURNAL_FILE).exists()
+    assert tmp_path.joinpath("a.jpg").is_file()
@@ -0,0 +1,222 @@
+""" Testing folder classification, gpx reading and matching, batched metadata copy of img_file_info_xls """
+
+import pytest
+
+import os
+import sys
+from pathlib import Path
+from datetime import datetime as DateTime
+from datetime import timezone
+
+img_file = pytest.importorskip("tools.img_file_info_xls")
+np = pytest.importorskip("numpy")
+
+# waypoint without time, track points with offset and zulu timestamps
+GPX = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="test">
+  <wpt lat="50.0" lon="8.0"><name>no time</name></wpt>
+  <trk><trkseg>
+    <trkpt lat="50.0" lon="8.0"><ele>100</ele><time>2020-01-01T12:00:00+02:00</time></trkpt>
+    <trkpt lat="50.1" lon="8.1"><time>2020-01-01T10:10:00Z</time></trkpt>
+    <trkpt lat="50.2" lon="8.2"><time>2020-01-01T10:20:00Z</time></trkpt>
+  </trkseg></trk>
+</gpx>
+"""
+
+GPX_SINGLE = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="test">
+  <trk><trkseg><trkpt lat="48.0" lon="11.0"><time>2020-01-01T10:00:00Z</time></trkpt></trkseg></trk>
+</gpx>
+"""
+
+T0 = DateTime(2020,1,1,10,0,tzinfo=timezone.utc).timestamp()
+
+@pytest.fixture
+def fixture_gpx(tmp_path)->str:
+    """ gpx file with a waypoint and a track """
+    fp = tmp_path.joinpath("track.gpx")
+    fp.write_text(GPX,encoding="utf-8")
+    return str(fp)
+
+@pytest.fixture
+def fixture_gpx_single(tmp_path)->str:
+    """ gpx file with a single track point """
+    fp = tmp_path.joinpath("single.gpx")
+    fp.write_text(GPX_SINGLE,encoding="utf-8")
+    return str(fp)
+
+def test_read_gpx(fixture_gpx,fixture_gpx_single):
+    """ points of all types, missing time / elevation, offset timestamps """
+    gpx = img_file.read_gpx(fixture_gpx)
+    assert gpx["type"] == ["wpt","trkpt","trkpt","trkpt"]
+    assert gpx["name"] == ["no time",None,None,None]
+    assert np.isnan(gpx["time"][0])
+    assert gpx["time"][1:].tolist() == [T0,T0+600,T0+1200]
+    assert np.isnan(gpx["ele"][0]) and gpx["ele"][1] == 100
+    assert img_file.read_gpx(fixture_gpx,points=[img_file.GPX_WAYPOINT])["lat"].tolist() == [50.0]
+    assert img_file.read_gpx(fixture_gpx_single)["time"].tolist() == [T0]
+
+def test_match_time(fixture_gpx):
+    """ nearest point in time, max time difference and interpolation """
+    gpx_index = img_file.GpxIndex.from_gpx(fixture_gpx)
+    assert len(gpx_index) == 4
+    times = [T0+60,T0+300,T0+7200,np.nan]
+    matched = gpx_index.match_time(times)
+    assert matched["index"].tolist() == [1,1,3,-1]
+    assert matched["time_diff"][:3].tolist() == [60,300,6000]
+    matched = gpx_index.match_time(times,max_diff=600)
+    assert matched["index"].tolist() == [1,1,-1,-1]
+    assert np.isnan(matched["lat"][2])
+    matched = gpx_index.match_time(times,interpolate=True)
+    assert matched["lat"][:3] == pytest.approx([50.01,50.05,50.2])
+    assert matched["lon"][:3] == pytest.approx([8.01,8.05,8.2])
+
+def test_match_time_single_point(fixture_gpx_single):
+    """ single point is matched on both sides, also with interpolation """
+    gpx_index = img_file.GpxIndex.from_gpx(fixture_gpx_single)
+    times = [T0-100,T0+100]
+    matched = gpx_index.match_time(times,interpolate=True)
+    assert matched["index"].tolist() == [0,0]
+    assert matched["lat"].tolist() == [48.0,48.0]
+    assert matched["time_diff"].tolist() == [100,100]
+    assert gpx_index.match_time(times,max_diff=60)["index"].tolist() == [-1,-1]
+    assert img_file.GpxIndex([],[]).match_time(times)["index"].tolist() == [-1,-1]
+
+@pytest.mark.parametrize("use_scipy",[True,False])
+def test_match_space(fixture_gpx,monkeypatch,use_scipy):
+    """ nearest points with kd tree (scipy) and without """
+    if use_scipy:
+        pytest.importorskip("scipy.spatial")
+    else:
+        monkeypatch.setitem(sys.modules,"scipy.spatial",None)
+    gpx_index = img_file.GpxIndex.from_gpx(fixture_gpx)
+    assert (gpx_index.kdtree is not None) == use_scipy
+    matched = gpx_index.match_space([50.1,50.201,0],[8.1,8.2,0],max_dist=1,chunk_size=2)
+    assert matched["index"].tolist() == [2,3,-1]
+    assert matched["distance"][:2] == pytest.approx([0,0.111],abs=0.001)
+    assert np.isnan(matched["distance"][2])
+
+def test_geotag_images(fixture_gpx):
+    """ local exif times and aware datetimes are matched, invalid times are skipped """
+    img_datetime_dict = {"a.jpg":"2020:01:01 11:05:00","b.jpg":DateTime(2020,1,1,10,10,tzinfo=timezone.utc),
+                         "c.jpg":"invalid","d.jpg":None,"e.jpg":"2020:01:01 15:00:00"}
+    geotags = img_file.geotag_images(img_datetime_dict,fixture_gpx)
+    assert sorted(geotags.keys()) == ["a.jpg","b.jpg"]
+    assert (geotags["a.jpg"]["lat"],geotags["a.jpg"]["lon"]) == (50.05,8.05)
+    assert geotags["a.jpg"]["time_diff"] == 300
+    assert (geotags["b.jpg"]["lat"],geotags["b.jpg"]["time_diff"]) == (50.1,0)
+    geotags = img_file.geotag_images(img_datetime_dict,[fixture_gpx],time_offset=300,interpolate=False)
+    assert (geotags["a.jpg"]["lat"],geotags["a.jpg"]["time_diff"]) == (50.1,0)
+
+@pytest.fixture
+def fixture_img_tree(tmp_path)->str:
+    """ image folders: raw files with metadata templates and dotfile, empty folder,
+        folder containing only a subfolder and folder with a single template
+    """
+    files = ["20200101_trip/DSC01234.arw","20200101_trip/20200101_trip_01.arw",
+             "20200101_trip/metadata.tpl","20200101_trip/metadata_exif.tpl","20200101_trip/.hidden",
+             "only_sub/deep/x.geo","other/x.geo","other/default.tpl"]
+    for f in files:
+        p = tmp_path.joinpath(f)
+        p.parent.mkdir(parents=True,exist_ok=True)
+        p.write_text(f)
+    tmp_path.joinpath("empty").mkdir()
+    return str(tmp_path)
+
+def test_get_file_dict(fixture_img_tree):
+    """ folder classification: file types, regex rules, filetype classes """
+    file_dict = img_file.get_file_dict(fixture_img_tree)
+    p_root = Path(fixture_img_tree)
+    assert sorted(file_dict.keys()) == sorted([str(p_root.joinpath(p)) for p in
+                                               ["20200101_trip","empty","only_sub/deep","other"]])
+    fp_trip = str(p_root.joinpath("20200101_trip"))
+    p_info = file_dict[fp_trip]
+    assert (p_info["level"],p_info["num_files"]) == (1,5)
+    assert p_info["file_types"] == {"arw":2,"tpl":2,"":1}
+    assert (p_info["ARW"],p_info["TPL"],p_info[""]) == (2,2,1)
+    assert p_info["NUM_PATH_IN_NAME"] == img_file.num_path_in_name(file_dict,fp_trip) == 1
+    assert [p_info[rule] for rule in ["REGEX_INSTAONEX","REGEX_ORIGINAL_NAME","REGEX_METADATA_FILES"]] == [0,1,2]
+    # metadata templates are not counted as meta files
+    assert [p_info[c] for c in ["TYPE_RAW","TYPE_META","TYPE_JPG","TYPE_CLEANUP"]] == [True,False,False,True]
+    p_info = file_dict[str(p_root.joinpath("other"))]
+    assert [p_info[c] for c in ["TYPE_RAW","TYPE_META","TYPE_JPG","TYPE_CLEANUP"]] == [False,True,False,True]
+    p_info = file_dict[str(p_root.joinpath("empty"))]
+    assert (p_info["num_files"],p_info["files"],p_info["TYPE_META"]) == (0,[],False)
+    assert file_dict[str(p_root.joinpath("only_sub","deep"))]["level"] == 2
+
+def test_get_subpath_info_dict(fixture_img_tree):
+    """ status of direct subfolders containing files, same in combined folder info """
+    subpath_dict = img_file.get_subpath_info_dict(fixture_img_tree)
+    assert sorted(subpath_dict.keys()) == ["20200101_trip","other"]
+    subpath_info = subpath_dict["20200101_trip"]
+    assert sorted(subpath_info["suffix_list"]) == ["arw","tpl"]
+    assert subpath_info["num_files"] == 5
+    assert [subpath_info[k] for k in ["needs_jpg_export","contains_raw","needs_rename","needs_cleanup"]] == [True]*4
+    assert subpath_dict["other"]["contains_raw"] is False
+    file_dict,folder_subpath_dict = img_file.get_folder_info(fixture_img_tree)
+    assert folder_subpath_dict == subpath_dict
+    assert file_dict == img_file.get_file_dict(fixture_img_tree)
+
+# fake exiftool: keeps a copy of the argfile and its common args,
+# reports an updated file for each -execute block
+FAKE_EXIFTOOL = """#!PYTHON
+import sys,os,shutil
+args = sys.argv[1:]
+f_args = args[args.index("-@")+1]
+p_log = os.path.join(os.path.dirname(os.path.abspath(__file__)),"argfiles")
+os.makedirs(p_log,exist_ok=True)
+f_copy = os.path.join(p_log,os.path.basename(f_args))
+shutil.copy(f_args,f_copy)
+with open(f_copy+".common","w",encoding="utf-8") as f:
+    f.write(" ".join(args[args.index("-common_args")+1:]))
+with open(f_args,encoding="utf-8") as f:
+    for line in f:
+        if line.strip() == "-execute":
+            print("    1 image files updated")
+"""
+
+@pytest.fixture
+def fixture_exiftool(tmp_path,monkeypatch)->Path:
+    """ fake exiftool on PATH, returns folder of the copied argfiles """
+    if os.name == "nt":
+        pytest.skip("fake exiftool script needs a posix shell")
+    p_bin = tmp_path.joinpath("bin")
+    p_bin.mkdir()
+    f_exiftool = p_bin.joinpath("exiftool")
+    f_exiftool.write_text(FAKE_EXIFTOOL.replace("PYTHON",sys.executable),encoding="utf-8")
+    f_exiftool.chmod(0o755)
+    monkeypatch.setenv("PATH",str(p_bin)+os.pathsep+os.environ.get("PATH",""))
+    return p_bin.joinpath("argfiles")
+
+def read_argfiles(p_argfiles:Path)->list:
+    """ lines and common args of the copied argfiles """
+    return [(f.read_text(encoding="utf-8").splitlines(),Path(str(f)+".common").read_text(encoding="utf-8"))
+            for f in p_argfiles.glob("*.args")]
+
+def test_exiftool_copy_batch(fixture_exiftool):
+    """ argfile with one -TagsFromFile block per copy, number of updated files from output """
+    copy_list = [("/img/a b.arw","/img/a b.jpg"),("/img/c.arw","/img/c_01.jpg")]
+    assert img_file.exiftool_copy_batch(copy_list,exiftool="exiftool",debug=False) == 2
+    argfiles = read_argfiles(fixture_exiftool)
+    assert len(argfiles) == 1
+    lines,common_args = argfiles[0]
+    assert lines == ["-TagsFromFile","/img/a b.arw","-all:all>all:all","/img/a b.jpg","-execute",
+                     "-TagsFromFile","/img/c.arw","-all:all>all:all","/img/c_01.jpg","-execute"]
+    assert common_args == "-charset filename=utf8"
+    assert img_file.exiftool_copy_batch(copy_list,exiftool="missing_exiftool",debug=False) == 0
+
+def test_copy_metadata(fixture_exiftool):
+    """ copy operations of target file types are batched into argfiles """
+    copy_dict = {"/img":{"a":{"source_files":["a.arw","a.tif"],"target_files":[f"a_{i}.jpg" for i in range(5)]+["a.tif"]},
+                         "b":{"source_files":[],"target_files":["b.jpg"]}},
+                 "/img2":{"c":{"source_files":["c.arw"],"target_files":["c.JPG"]}}}
+    assert img_file.copy_metadata(copy_dict,display=False,exiftool="exiftool",debug=False) == 6
+    assert not fixture_exiftool.exists()
+    assert img_file.copy_metadata(copy_dict,display=False,save=True,exiftool="exiftool",debug=False,
+                                  batch_size=4,max_workers=2) == 6
+    argfiles = read_argfiles(fixture_exiftool)
+    assert sorted([len(lines) for lines,_ in argfiles]) == [2*5,4*5]
+    copied = sorted([(lines[i+1],lines[i+3]) for lines,_ in argfiles for i in range(0,len(lines),5)])
+    assert copied == sorted([(os.path.join("/img","a.arw"),os.path.join("/img",f"a_{i}.jpg")) for i in range(5)]+
+                            [(os.path.join("/img2","c.arw"),os.path.join("/img2","c.JPG"))])
+    assert img_file.copy_metadata(copy_dict,exiftool="missing_exiftool",debug=False) == -1
@@ -0,0 +1,120 @@
+""" Testing the /util/link_checker module against a local stand-in http server """
+
+import pytest
+
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from util.link_checker import LinkChecker, is_dead, is_gone, STATUS, REDIRECT, LAST_CHECKED, DEAD
+
+class LinkHandler(BaseHTTPRequestHandler):
+    """ answers requests depending on path """
+    protocol_version = "HTTP/1.1"
+    requests = []
+    # arrival time of each request
+    times = []
+    # requests to /concurrent only succeed if they are all in flight at the same time
+    barrier = None
+
+    def _answer(self,method:str):
+        LinkHandler.requests.append((method,self.path))
+        LinkHandler.times.append(time.monotonic())
+        concurrent = True
+        if self.path.startswith("/concurrent"):
+            try:
+                LinkHandler.barrier.wait()
+            except threading.BrokenBarrierError:
+                concurrent = False
+        if not concurrent:
+            status,headers = 500,{}
+        elif self.path == "/redirect":
+            status,headers = 301,{"Location":"/ok"}
+        elif self.path == "/nohead" and method == "HEAD":
+            status,headers = 405,{}
+        elif self.path == "/dead":
+            status,headers = 404,{}
+        elif self.path == "/gone":
+            status,headers = 410,{}
+        elif self.path == "/busy":
+            status,headers = 429,{}
+        else:
+            status,headers = 200,{}
+        body = b"" if method == "HEAD" else b"content"
+        self.send_response(status)
+        for k,v in headers.items():
+            self.send_header(k,v)
+        self.send_header("Content-Length",str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._answer("HEAD")
+
+    def do_GET(self):
+        self._answer("GET")
+
+    def log_message(self,*args):
+        pass
+
+@pytest.fixture
+def fixture_url():
+    """ base url of a local stand-in server """
+    LinkHandler.requests = []
+    LinkHandler.times = []
+    server = ThreadingHTTPServer(("127.0.0.1",0),LinkHandler)
+    thread = threading.Thread(target=server.serve_forever,daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def test_check_links(fixture_url,tmp_path):
+    """ HEAD with GET fallback, redirects, dead links and cached results """
+    f_cache = str(tmp_path.joinpath("link_cache.json"))
+    urls = [fixture_url+p for p in ["/ok","/nohead","/redirect","/dead"]]
+    results = LinkChecker(f_cache,min_interval=0).check_links(urls+["file:///local"])
+    assert [results[url][STATUS] for url in urls] == [200,200,200,404]
+    assert results[urls[2]][REDIRECT] == fixture_url+"/ok"
+    assert [is_dead(results[url]) for url in urls] == [False,False,False,True]
+    assert ("GET","/nohead") in LinkHandler.requests
+    num_requests = len(LinkHandler.requests)
+    link_checker = LinkChecker(f_cache,min_interval=0)
+    assert len(link_checker) == 4
+    assert link_checker.check_links(urls) == {url:results[url] for url in urls}
+    assert len(LinkHandler.requests) == num_requests
+
+def test_check_links_concurrent(fixture_url):
+    """ links are checked concurrently, requests of the same host are rate limited """
+    urls = [f"{fixture_url}/concurrent?{i}" for i in range(8)]
+    LinkHandler.barrier = threading.Barrier(len(urls),timeout=5)
+    results = LinkChecker(max_per_host=8,min_interval=0).check_links(urls)
+    assert [results[url][STATUS] for url in urls] == 8*[200]
+    LinkHandler.times = []
+    urls = [f"{fixture_url}/ok?{i}" for i in range(4)]
+    LinkChecker(max_per_host=8,min_interval=0.2).check_links(urls)
+    assert len(LinkHandler.times) == 4
+    # small tolerance for the time between sending and receiving a request
+    assert min([t2-t1 for t1,t2 in zip(LinkHandler.times,LinkHandler.times[1:])]) >= 0.15
+
+def test_is_gone(fixture_url):
+    """ only definite answers count as gone, transient errors are dead but not gone """
+    urls = [fixture_url+p for p in ["/dead","/gone","/busy","/ok"]]
+    results = LinkChecker(min_interval=0).check_links(urls)
+    assert [is_dead(results[url]) for url in urls] == [True,True,True,False]
+    assert [is_gone(results[url]) for url in urls] == [True,True,False,False]
+    assert not is_gone({STATUS:None})
+
+def test_save_links_skip_dead(tmp_path):
+    """ links that are gone are skipped, transient errors are only flagged """
+    link_tool = pytest.importorskip("tools.link_tool")
+    fp = str(tmp_path.joinpath("links.json"))
+    status_list = [404,410,429,None,200]
+    link_list = [{"url":f"https://example.com/{status}"} for status in status_list]
+    check_results = {link["url"]:{STATUS:status,REDIRECT:None,LAST_CHECKED:None}
+                     for link,status in zip(link_list,status_list)}
+    link_tool.save_links(fp,link_list,check_results,skip_dead=True)
+    with open(fp,encoding="utf-8") as f:
+        links = json.load(f)
+    assert [(link[STATUS],link[DEAD]) for link in links] == [(429,True),(None,True),(200,False)]
@@ -0,0 +1,240 @@
+""" Testing the my_dropbox module against a local mock of the Dropbox API """
+
+import pytest
+
+import os
+import hashlib
+from types import SimpleNamespace
+from datetime import datetime
+
+dropbox = pytest.importorskip("dropbox")
+pytest.importorskip("win32clipboard")
+pytest.importorskip("image_meta")
+
+from dropbox.exceptions import ApiError
+from my_dropbox import MyDropbox
+
+CHUNK_SIZE = 16
+HASH_BLOCK_SIZE = 4
+
+class MockDropbox():
+    """ local stand in for the dropbox.Dropbox client, keeps files in memory """
+
+    def __init__(self,fail_on_append=0,page_size=2):
+        self.files = {}
+        self.client_modified = {}
+        # log of changed paths, cursor is the position in the log
+        self.changes = []
+        self.page_size = page_size
+        self.sessions = {}
+        self.calls = []
+        # number of append calls to fail (simulates broken connection)
+        self.fail_on_append = fail_on_append
+
+    def _metadata(self,path):
+        """ returns metadata object containing content hash """
+        content = self.files[path]
+        client_modified = self.client_modified.get(path,datetime(2020,1,1))
+        return dropbox.files.FileMetadata(name=path.split("/")[-1],id=path,size=len(content),
+                                          client_modified=client_modified,
+                                          server_modified=client_modified,rev="0123456789",
+                                          path_lower=path.lower(),path_display=path,
+                                          content_hash=MockDropbox.content_hash(content))
+
+    def put(self,path,content,client_modified=None):
+        """ stores file """
+        self.files[path] = content
+        self.client_modified[path] = client_modified or datetime.utcnow().replace(microsecond=0)
+        self.changes.append(path)
+
+    @staticmethod
+    def content_hash(content:bytes):
+        """ dropbox content hash using block size of the test """
+        blocks = [content[i:i+HASH_BLOCK_SIZE] for i in range(0,len(content),HASH_BLOCK_SIZE)]
+        digests = b"".join([hashlib.sha256(b).digest() for b in blocks])
+        return hashlib.sha256(digests).hexdigest()
+
+    def files_get_metadata(self,path):
+        self.calls.append("files_get_metadata")
+        if not path in self.files:
+            return None
+        return self._metadata(path)
+
+    def files_upload(self,data,path,**kwargs):
+        self.calls.append("files_upload")
+        self.put(path,data,kwargs.get("client_modified"))
+        return self._metadata(path)
+
+    def files_upload_session_start(self,data):
+        self.calls.append("files_upload_session_start")
+        session_id = f"session{len(self.sessions)}"
+        self.sessions[session_id] = data
+        return SimpleNamespace(session_id=session_id)
+
+    def files_upload_session_append_v2(self,data,cursor):
+        self.calls.append("files_upload_session_append_v2")
+        if self.fail_on_append > 0:
+            self.fail_on_append -= 1
+            raise ConnectionError("connection lost")
+        if len(self.sessions[cursor.session_id]) != cursor.offset:
+            # append errors contain the offset error directly
+            correct_offset = SimpleNamespace(correct_offset=len(self.sessions[cursor.session_id]))
+            error = SimpleNamespace(is_incorrect_offset=lambda:True,get_incorrect_offset=lambda:correct_offset)
+            raise ApiError("request_id",error,None,None)
+        self.sessions[cursor.session_id] += data
+
+    def files_upload_session_finish(self,data,cursor,commit):
+        self.calls.append("files_upload_session_finish")
+        assert len(self.sessions[cursor.session_id]) == cursor.offset
+        self.put(commit.path,self.sessions.pop(cursor.session_id) + data,commit.client_modified)
+        return self._metadata(commit.path)
+
+    def files_download(self,path):
+        self.calls.append("files_download")
+        content = self.files[path]
+        def iter_content(chunk_size):
+            for i in range(0,len(content),chunk_size):
+                yield content[i:i+chunk_size]
+        res = SimpleNamespace(iter_content=iter_content,close=lambda:None)
+        return self._metadata(path),res
+
+    def _list_result(self,paths,position):
+        """ returns one page of list folder result """
+        page = paths[position:position+self.page_size]
+        has_more = len(paths) > position + self.page_size
+        cursor = f"{position+self.page_size}" if has_more else f"log:{len(self.changes)}"
+        entries = [self._metadata(p) for p in page]
+        return SimpleNamespace(entries=entries,has_more=has_more,cursor=cursor)
+
+    def files_list_folder(self,path,recursive=False):
+        self.calls.append("files_list_folder")
+        self._listing = sorted([p for p in self.files if p.startswith(path+"/")])
+        return self._list_result(self._listing,0)
+
+    def files_list_folder_continue(self,cursor):
+        self.calls.append("files_list_folder_continue")
+        if cursor.startswith("log:"):
+            self._listing = sorted(set(self.changes[int(cursor[4:]):]))
+            return self._list_result(self._listing,0)
+        return self._list_result(self._listing,int(cursor))
+
+@pytest.fixture
+def fixture_dropbox(tmp_path,monkeypatch):
+    """ MyDropbox instance using the mock api """
+    monkeypatch.setattr("my_dropbox.DROPBOX_HASH_BLOCK_SIZE",HASH_BLOCK_SIZE)
+    my_dbx = MyDropbox(remote_file="/remote/file.bin",local_file=str(tmp_path.joinpath("file.bin")),
+                       create_instance=False,chunk_size=CHUNK_SIZE)
+    my_dbx.dbx = MockDropbox()
+    monkeypatch.setattr(my_dbx,"get_instance",lambda:my_dbx.dbx)
+    return my_dbx
+
+def test_content_hash(fixture_dropbox,tmp_path):
+    """ content hash is calculated block wise """
+    content = b"0123456789"*10
+    f = tmp_path.joinpath("file.bin")
+    f.write_bytes(content)
+    assert MyDropbox.get_content_hash(str(f)) == MockDropbox.content_hash(content)
+
+def test_upload_chunked(fixture_dropbox,tmp_path):
+    """ large files are uploaded in a session """
+    content = b"0123456789"*10
+    tmp_path.joinpath("file.bin").write_bytes(content)
+    md = fixture_dropbox.upload()
+    assert md.size == len(content)
+    assert fixture_dropbox.dbx.files["/remote/file.bin"] == content
+    assert "files_upload" not in fixture_dropbox.dbx.calls
+    assert fixture_dropbox.upload_session is None
+
+def test_upload_resume(fixture_dropbox,tmp_path):
+    """ interrupted upload resumes from last offset """
+    content = b"0123456789"*10
+    tmp_path.joinpath("file.bin").write_bytes(content)
+    fixture_dropbox.dbx.fail_on_append = 1
+    assert fixture_dropbox.upload() is None
+    offset = fixture_dropbox.upload_session["offset"]
+    assert offset == CHUNK_SIZE
+    md = fixture_dropbox.upload()
+    assert md.size == len(content)
+    assert fixture_dropbox.dbx.calls.count("files_upload_session_start") == 1
+    assert fixture_dropbox.dbx.files["/remote/file.bin"] == content
+
+def test_upload_correct_offset(fixture_dropbox,tmp_path):
+    """ upload continues from the offset expected by the server """
+    content = b"0123456789"*10
+    tmp_path.joinpath("file.bin").write_bytes(content)
+    fixture_dropbox.dbx.fail_on_append = 1
+    assert fixture_dropbox.upload() is None
+    fixture_dropbox.upload_session["offset"] = 0
+    md = fixture_dropbox.upload()
+    assert md.size == len(content)
+    assert fixture_dropbox.dbx.files["/remote/file.bin"] == content
+
+def test_upload_changed_same_size(fixture_dropbox,tmp_path):
+    """ upload session is not resumed for a changed file of same size """
+    f = tmp_path.joinpath("file.bin")
+    f.write_bytes(b"0123456789"*10)
+    fixture_dropbox.dbx.fail_on_append = 1
+    assert fixture_dropbox.upload() is None
+    content = b"abcdefghij"*10
+    f.write_bytes(content)
+    os.utime(f,(1,1))
+    md = fixture_dropbox.upload()
+    assert md.size == len(content)
+    assert fixture_dropbox.dbx.calls.count("files_upload_session_start") == 2
+    assert fixture_dropbox.dbx.files["/remote/file.bin"] == content
+
+def test_upload_skip_identical(fixture_dropbox,tmp_path):
+    """ upload is skipped for identical content """
+    tmp_path.joinpath("file.bin").write_bytes(b"small")
+    fixture_dropbox.upload()
+    assert fixture_dropbox.dbx.calls.count("files_upload") == 1
+    fixture_dropbox.upload()
+    assert fixture_dropbox.dbx.calls.count("files_upload") == 1
+    fixture_dropbox.upload(force=True)
+    assert fixture_dropbox.dbx.calls.count("files_upload") == 2
+
+def test_download_streamed(fixture_dropbox,tmp_path):
+    """ download is streamed to file and skipped for identical content """
+    content = b"abcdefghij"*10
+    fixture_dropbox.dbx.put("/remote/file.bin",content)
+    md = fixture_dropbox.download()
+    assert md.size == len(content)
+    assert tmp_path.joinpath("file.bin").read_bytes() == content
+    assert not tmp_path.joinpath("file.bin.download").exists()
+    fixture_dropbox.download()
+    assert fixture_dropbox.dbx.calls.count("files_download") == 1
+
+def test_sync_folder(fixture_dropbox,tmp_path):
+    """ folder sync in both directions, next sync is incremental """
+    local_path = tmp_path.joinpath("local")
+    local_path.joinpath("sub").mkdir(parents=True)
+    local_path.joinpath("a.txt").write_bytes(b"local a")
+    local_path.joinpath("sub","b.txt").write_bytes(b"local b newer")
+    dbx = fixture_dropbox.dbx
+    dbx.put("/sync/sub/b.txt",b"remote b older",datetime(2000,1,1))
+    dbx.put("/sync/c.txt",b"remote c")
+    dbx.put("/sync/sub/d.txt",b"remote d")
+    sync_result = fixture_dropbox.sync_folder(str(local_path),"/sync",max_workers=2)
+    assert sorted(sync_result["upload"]) == ["a.txt","sub/b.txt"]
+    assert sorted(sync_result["download"]) == ["c.txt","sub/d.txt"]
+    assert not sync_result["error"]
+    assert dbx.files["/sync/sub/b.txt"] == b"local b newer"
+    assert local_path.joinpath("sub","d.txt").read_bytes() == b"remote d"
+    assert local_path.joinpath(".dropbox_sync.json").is_file()
+    # incremental sync, only remote change is transferred
+    dbx.calls = []
+    dbx.put("/sync/c.txt",b"remote c changed")
+    sync_result = fixture_dropbox.sync_folder(str(local_path),"/sync",max_workers=2)
+    assert "files_list_folder" not in dbx.calls
+    assert sync_result["download"] == ["c.txt"]
+    assert sync_result["upload"] == []
+    assert local_path.joinpath("c.txt").read_bytes() == b"remote c changed"
+
+def test_sync_folder_relative_path(fixture_dropbox,tmp_path,monkeypatch):
+    """ sync state file is not uploaded for relative local paths """
+    tmp_path.joinpath("local").mkdir()
+    tmp_path.joinpath("local","a.txt").write_bytes(b"local a")
+    monkeypatch.chdir(tmp_path)
+    assert fixture_dropbox.sync_folder("local","/sync",max_workers=2)["upload"] == ["a.txt"]
+    assert fixture_dropbox.sync_folder("local","/sync",max_workers=2)["upload"] == []
+    assert not "/sync/.dropbox_sync.json" in fixture_dropbox.dbx.files
@@ -0,0 +1,73 @@
+""" Testing the streaming bookmark parser and markdown export of parse_bookmarks """
+
+import pytest
+
+from parse_bookmarks import get_bookmark_tree, create_markdown
+
+# export with nested folders and several top level folders
+BOOKMARKS = """<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3 ADD_DATE="1577880000">Bookmarks bar</H3>
+    <DL><p>
+        <DT><A HREF="https://a.com" ADD_DATE="1577880000">A &amp; B</A>
+        <DT><H3 ADD_DATE="1577880000">Dev</H3>
+        <DL><p>
+            <DT><A HREF="https://python.org">Python</A>
+            <DT><H3>Deep</H3>
+            <DL><p>
+                <DT><A HREF="https://deep.org">Deep</A>
+            </DL><p>
+        </DL><p>
+        <DT><A HREF="https://b.com">B</A>
+    </DL><p>
+    <DT><H3>Other bookmarks</H3>
+    <DL><p>
+        <DT><A HREF="https://c.com">C</A>
+        <DT><H3>Sub</H3>
+        <DL><p>
+            <DT><A HREF="https://d.com">D</A>
+        </DL><p>
+    </DL><p>
+    <DT><H3>Mobile</H3>
+    <DL><p>
+    </DL><p>
+</DL><p>
+"""
+
+@pytest.fixture
+def fixture_bookmarks(tmp_path)->str:
+    """ bookmark export file """
+    fp = tmp_path.joinpath("bookmarks.html")
+    fp.write_text(BOOKMARKS,encoding="utf-8")
+    return str(fp)
+
+def test_get_bookmark_tree(fixture_bookmarks):
+    """ levels, parents and links of folders, parsed in tiny chunks """
+    bookmark_tree = get_bookmark_tree(fixture_bookmarks,chunk_size=7)
+    assert bookmark_tree == get_bookmark_tree(fixture_bookmarks)
+    assert [(f["text"],f["level"],f["parent"]) for f in bookmark_tree.values()] == [
+        ("Bookmarks bar (2020-01-01)",0,1),("Dev (2020-01-01)",1,1),("Deep",2,2),
+        ("Other bookmarks",0,1),("Sub",1,4),("Mobile",0,1)]
+    assert bookmark_tree[1]["links"] == {1:{"url":"https://a.com","text":"[0001] A & B (2020-01-01)"},
+                                         4:{"url":"https://b.com","text":"B"}}
+    assert [list(f["links"].keys()) for f in bookmark_tree.values()] == [[1,4],[2],[3],[5],[6],[]]
+    assert bookmark_tree[5]["links"][6] == {"url":"https://d.com","text":"D"}
+
+def test_create_markdown(fixture_bookmarks):
+    """ toc and folder headings, top level folders after the first are rendered at level 1 """
+    bookmark_tree = get_bookmark_tree(fixture_bookmarks)
+    md = create_markdown(bookmark_tree)
+    h = {i:bookmark_tree[i]["hash"] for i in bookmark_tree}
+    assert md[0] == "# TOC"
+    assert md[1].startswith("## **STATS**: **6** links in **6** folders")
+    assert md[2:7] == [f"* # [Dev (2020-01-01)](#{h[2]})",f"  * ## [Deep](#{h[3]})",
+                       f"* # [Other bookmarks](#{h[4]})",f"  * ## [Sub](#{h[5]})",f"* # [Mobile](#{h[6]})"]
+    assert md[7:11] == [f"###### {h[2]}","# [002] Dev (2020-01-01)","* [Python](https://python.org)",
+                        "\n**[TOC](#toc)**\n"]
+    headings = [l for l in md[7:] if l.startswith("#") and not l.startswith("######")]
+    assert headings == ["# [002] Dev (2020-01-01)","## [003] Deep","# [004] Other bookmarks",
+                        "## [005] Sub","# [006] Mobile"]
+    assert "* [D](https://d.com)" in md
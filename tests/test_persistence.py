@@ -0,0 +1,62 @@
+""" Testing the /util/persistence module """
+
+import pytest
+
+from util.persistence import Persistence
+
+@pytest.fixture
+def fixture_headerdict()->dict:
+    """ sample header dict with different columns """
+    return {"key1":{"status":"open","comment":"a,b"},
+            "key2":{"status":"ignore"},
+            "key3":{"prio":1,"status":"open"}}
+
+def test_headerdict2list(fixture_headerdict):
+    """ missing columns are padded using union of all columns """
+    out = Persistence.headerdict2list(fixture_headerdict)
+    assert out[1] == {"num":"02","id":"key2","comment":"","prio":"","status":"ignore"}
+    assert [list(l.keys()) for l in out] == [["num","id","comment","prio","status"]]*3
+    out = Persistence.headerdict2list(fixture_headerdict,column_list=["status","prio"])
+    assert out[0] == {"id":"key1","status":"open","prio":""}
+    out = Persistence.headerdict2list(fixture_headerdict,filter_list=[{"status":"ignore"}],
+                                      column_list=["status","prio"])
+    assert out == [{"id":"key1","status":"open"},{"id":"key3","status":"open","prio":"1"}]
+
+def test_save_csv(fixture_headerdict,tmp_path):
+    """ rows are written using the columns of the first row """
+    data = Persistence.headerdict2list(fixture_headerdict)
+    lines = Persistence.dicts2csv(data)
+    assert lines[0] == "num,id,comment,prio,status"
+    assert lines[1] == '01,key1,"a,b",,open'
+    f_save = str(tmp_path.joinpath("test.csv"))
+    assert Persistence.save_csv(f_save,(d for d in data),csv_sep=";") == f_save
+    assert Persistence.read_txt_file(f_save)[1] == "01;key1;a,b;;open"
+
+def test_save_read_csv(tmp_path):
+    """ values with separators, quotes and line breaks are read back as saved """
+    f_save = str(tmp_path.joinpath("test.csv"))
+    data = [{"a":"x;y","b":"1"},{"a":'say "hi"',"b":"2"},{"a":"line\nbreak","b":"3"}]
+    Persistence.save_csv(f_save,data)
+    assert Persistence(f_read=f_save).read() == data
+    Persistence.save_csv(f_save,data,csv_sep=",")
+    assert Persistence(f_read=f_save,csv_sep=",").read() == data
+
+@pytest.mark.parametrize("suffix",[".json",".json.gz"])
+def test_save_json(suffix,tmp_path):
+    """ json is saved atomically, optionally compressed or using orjson """
+    f_save = str(tmp_path.joinpath("test"+suffix))
+    data = {"key":["ä",1,None]}
+    Persistence.save_json(f_save,data)
+    assert Persistence.read_json(f_save) == data
+    Persistence.save_json(f_save,{"key":2},use_orjson=True)
+    assert Persistence.read_json(f_save) == {"key":2}
+    assert [p.name for p in tmp_path.iterdir()] == ["test"+suffix]
+
+def test_save_atomic(tmp_path):
+    """ existing file is kept if writing fails """
+    f_save = str(tmp_path.joinpath("test.txt.gz"))
+    assert Persistence.save_list(f_save,(l for l in ["a","b"])) == f_save
+    assert Persistence.read_txt_file(f_save) == ["a","b"]
+    assert Persistence.save_list(f_save,["c",None]) is None
+    assert Persistence.read_txt_file(f_save) == ["a","b"]
+    assert len(list(tmp_path.iterdir())) == 1
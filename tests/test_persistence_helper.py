@@ -0,0 +1,45 @@
+""" Testing yaml reading of the cmd_client PersistenceHelper """
+
+import pytest
+
+import os
+
+persistence_helper = pytest.importorskip("tools.cmd_client.persistence_helper")
+PersistenceHelper = persistence_helper.PersistenceHelper
+
+YAML = """---
+# comment
+root:
+  a: 1
+  # comment
+  sub:
+    b: x
+  flow: { c: 2 }
+  items:
+    - d: 3
+      e: 4
+"""
+
+def test_read_yaml_lines(tmp_path):
+    """ mappings get the line number of their key """
+    f = tmp_path.joinpath("test.yaml")
+    f.write_text(YAML)
+    data = PersistenceHelper.read_yaml(str(f),line_key="line")
+    assert data["line"] == "1"
+    assert data["root"]["line"] == "3"
+    assert data["root"]["sub"] == {"b":"x","line":"6"}
+    assert data["root"]["flow"] == {"c":2,"line":"8"}
+    assert data["root"]["items"][0] == {"d":3,"e":4,"line":"10"}
+    assert PersistenceHelper.read_yaml(str(f)) == {"root":{"a":1,"sub":{"b":"x"},"flow":{"c":2},
+                                                          "items":[{"d":3,"e":4}]}}
+
+def test_read_yaml_cache(tmp_path):
+    """ cached data is returned as copy, changed files are read again """
+    f = tmp_path.joinpath("test.yaml")
+    f.write_text("a: 1\n")
+    data = PersistenceHelper.read_yaml(str(f))
+    data["a"] = 2
+    assert PersistenceHelper.read_yaml(str(f)) == {"a":1}
+    f.write_text("a: 10\n")
+    os.utime(f,ns=(0,10**18))
+    assert PersistenceHelper.read_yaml(str(f)) == {"a":10}
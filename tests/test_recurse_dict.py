@@ -0,0 +1,80 @@
+""" Testing the /util/recurse_dict module """
+
+import pytest
+
+import copy
+
+from util.recurse_dict import DictParser, DictFilter, Filter, ROOT
+
+@pytest.fixture
+def fixture_dict()->dict:
+    """ nested dict with lists """
+    return {"k1":"value1","test_key":500,
+            "k2":{"k2.1":5,"k2.2":"v2.2","k2.3":["l1","test value",{"k2.3.1":[1,2]}]},
+            "k3":[],"k4":{}}
+
+def test_dict_parser_lazy(fixture_dict):
+    """ lazy parsing results in the same key lists, leaves and itemized dict """
+    input_dict = copy.deepcopy(fixture_dict)
+    dict_parser = DictParser(fixture_dict)
+    lazy_parser = DictParser(fixture_dict,lazy=True)
+    assert fixture_dict == input_dict
+    hierarchy = dict_parser.hierarchy
+    lazy_hierarchy = lazy_parser.hierarchy
+    assert len(hierarchy) == len(lazy_hierarchy) == 15
+    # default parsing moves values behind containers, so nodes are compared in key list order
+    assert sorted([(i["keylist"],i["level"]) for i in hierarchy.values()]) == \
+           sorted([(i["keylist"],i["level"]) for i in lazy_hierarchy.values()])
+    assert lazy_hierarchy[ROOT]["keylist"] == [] and lazy_hierarchy[ROOT]["parent"] is None
+
+    def get_parents(h:dict)->list:
+        return sorted([(i["keylist"],h[i["parent"]]["keylist"]) for i in h.values() if i["parent"] is not None])
+
+    assert get_parents(hierarchy) == get_parents(lazy_hierarchy)
+
+    def get_leaves(h:dict)->list:
+        return sorted([(i["keylist"],i["object"]) for i in h.values()
+                       if "object" in i and not isinstance(i["object"],(dict,list))],key=lambda l:l[0])
+
+    assert get_leaves(hierarchy) == get_leaves(lazy_hierarchy)
+    assert ["k2","k2.3","(L)2","k2.3.1","(L)1"] in [l[0] for l in get_leaves(lazy_hierarchy)]
+    assert lazy_parser.itemized_dict == dict_parser.itemized_dict
+    assert lazy_parser.itemized_dict["k2"]["k2.3"]["(L)2"] == {"k2.3.1":{"(L)0":1,"(L)1":2}}
+    assert len(lazy_parser.tree.hierarchy) == len(dict_parser.tree.hierarchy)
+
+def test_dict_parser_lazy_list_type(fixture_dict):
+    """ lazy hierarchy keeps original lists (obj_type list), default itemizes them (obj_type dict) """
+    obj_info = lambda h,keylist:[i for i in h.values() if i["keylist"] == keylist][0]
+    info = obj_info(DictParser(fixture_dict).hierarchy,["k2","k2.3"])
+    lazy_info = obj_info(DictParser(fixture_dict,lazy=True).hierarchy,["k2","k2.3"])
+    assert (info["obj_type"],lazy_info["obj_type"]) == ("dict","list")
+    assert lazy_info["object"] is fixture_dict["k2"]["k2.3"]
+    assert info["object"] == DictParser.get_itemized(lazy_info["object"])
+
+def test_filter_compiled():
+    """ compiled filters give the same result as filter, evaluated over all nodes at once """
+    bench_dict = {f"key_{i}":{"name":f"value {i}","items":[f"item {j}" for j in range(10)]}
+                  for i in range(500)}
+    # filter only works on string objects
+    hierarchy = {node_id:info for node_id,info in DictParser(bench_dict,lazy=True).hierarchy.items()
+                 if isinstance(info.get("object"),str)}
+    dict_filter = DictFilter()
+    dict_filter.add_regex_filter("item [1-3]",filter_object=Filter.OBJECT,filter_level_min=2)
+    dict_filter.add_value_filter("L",filter_level_range=[2,4])
+    passed_ids = [node_id for node_id,info in hierarchy.items() if dict_filter.filter(info)]
+    assert len(passed_ids) == 3*500
+    assert dict_filter.filter_nodes(hierarchy) == passed_ids
+    dict_filter.clear_filters()
+    dict_filter.add_filter(filter_value="name",filter_object=Filter.KEY,filter_type=Filter.EQUAL)
+    passed_ids = [node_id for node_id,info in hierarchy.items() if dict_filter.filter(info)]
+    assert len(passed_ids) == 500
+    assert dict_filter.filter_nodes(hierarchy) == passed_ids
+
+def test_filter_invalid_props():
+    """ dicts without dict properties don't pass (None) in both filter methods """
+    dict_filter = DictFilter()
+    dict_filter.add_value_filter("test")
+    assert dict_filter.filter({"other":"test"}) is None
+    assert dict_filter.filter_compiled({"other":"test"}) is None
+    info = {"key":"my test_key","object":"value","level":2}
+    assert dict_filter.filter(info) is dict_filter.filter_compiled(info) is True
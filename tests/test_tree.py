@@ -0,0 +1,68 @@
+""" Testing the /util/tree module """
+
+import pytest
+
+from util.tree import Tree
+
+@pytest.fixture
+def fixture_tree()->Tree:
+    """ sample tree """
+    tree_dict={
+        1:{"parent":None,"value":"value 1"},
+        2:{"parent":1,"value":"value 2"},
+        4:{"parent":2,"value":"value 4"},
+        5:{"parent":2,"value":"value 5"},
+        3:{"parent":1,"value":"value 3"},
+        6:{"parent":3,"value":"value 6"},
+        7:{"parent":6,"value":"value 7"},
+        8:{"parent":6,"value":"value 8"},
+        9:{"parent":6,"value":"value 9"},
+    }
+    tree=Tree()
+    tree.create_tree(tree_dict)
+    return tree
+
+def test_hierarchy(fixture_tree):
+    """ hierarchy and levels """
+    assert fixture_tree.root_id == 1
+    assert fixture_tree.max_level == 4
+    assert fixture_tree.hierarchy[6] == {"parent":3,"name":"6","children":[7,8,9],"level":2}
+    assert fixture_tree.get_level(7) == 3
+
+def test_children(fixture_tree):
+    """ children are returned level by level """
+    assert fixture_tree.get_children(1) == [2,3,4,5,6,7,8,9]
+    assert fixture_tree.get_children(1,only_leaves=True) == [4,5,7,8,9]
+    assert fixture_tree.get_children(3) == [6,7,8,9]
+    assert fixture_tree.get_children(9) == []
+    assert fixture_tree.get_children(100) is None
+    assert fixture_tree.get_num_children(1) == 8
+
+def test_predecessors_siblings(fixture_tree):
+    """ predecessors, siblings and leaves """
+    assert fixture_tree.get_predecessors(8) == [6,3,1]
+    assert fixture_tree.is_predecessor(3,8)
+    assert not fixture_tree.is_predecessor(2,8)
+    assert not fixture_tree.is_predecessor(8,8)
+    assert fixture_tree.get_siblings(8) == [7,9]
+    assert fixture_tree.get_siblings(2,only_leaves=False) == [3]
+    assert fixture_tree.get_leaves() == [4,5,7,8,9]
+    assert fixture_tree.get_leaf_siblings() == [[[4,5],[2,1]],[[7,8,9],[6,3,1]]]
+    assert fixture_tree.get_key_path(7) == ["1","3","6","7"]
+
+def test_nested_tree(fixture_tree):
+    """ nested tree """
+    assert fixture_tree.get_nested_tree() == {1:{2:{4:{},5:{}},3:{6:{7:{},8:{},9:{}}}}}
+
+def test_large_tree():
+    """ large tree with deep and wide branches """
+    num_nodes = 50000
+    tree_dict = {1:{"parent":None}}
+    for i in range(2,num_nodes+1):
+        tree_dict[i] = {"parent":i//2 if i < num_nodes//2 else i-1}
+    tree = Tree()
+    tree.create_tree(tree_dict)
+    assert tree.get_num_children(1) == num_nodes-1
+    assert len(tree.get_children(1)) == num_nodes-1
+    assert tree.is_predecessor(1,num_nodes)
+    assert tree.get_predecessors(num_nodes)[-1] == 1
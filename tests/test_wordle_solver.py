@@ -0,0 +1,49 @@
+""" Testing the wordle solver bitset index """
+
+import pytest
+
+from wordle_solver import WordIndex, get_pattern, pattern2str
+
+WORDS = ["abide","speed","eerie","rosas","hosts","mocks","bosom","boxes","sassy","geese","robot"]
+
+@pytest.fixture
+def fixture_word_index()->WordIndex:
+    """ index of sample words """
+    return WordIndex(WORDS+["toolong","a1b2c"])
+
+def test_query(fixture_word_index):
+    """ fixed, misplaced and missing letters """
+    assert len(fixture_word_index) == len(WORDS)
+    assert fixture_word_index.query(["s****"],"*o***","enibt") == ["mocks","rosas"]
+    # missing letter that is also fixed: number of occurences is limited
+    assert fixture_word_index.query([],"*o***","o") == ["boxes","hosts","mocks","rosas"]
+    assert fixture_word_index.query(["e****"],"","") == ["abide","boxes","geese","speed"]
+
+def test_patterns(fixture_word_index):
+    """ vectorized patterns are scored like wordle, also for repeated letters """
+    assert pattern2str(get_pattern("speed","abide")) == "--m-m"
+    assert pattern2str(get_pattern("eerie","abide")) == "---mf"
+    assert pattern2str(get_pattern("sassy","rosas")) == "mmf--"
+    indices = list(range(len(fixture_word_index)))
+    patterns = fixture_word_index.get_patterns(indices,indices)
+    words = fixture_word_index.words
+    assert patterns.tolist() == [[get_pattern(g,a) for a in words] for g in words]
+
+def test_rank_guesses(fixture_word_index):
+    """ guesses splitting the candidates best are ranked first """
+    mask = fixture_word_index.query_mask([],"*o***","")
+    ranked = fixture_word_index.rank_guesses(mask,num=3)
+    assert len(ranked) == 3
+    assert ranked[0][1] >= ranked[1][1] >= ranked[2][1]
+    candidates = fixture_word_index.rank_guesses(mask,candidates_only=True)
+    assert {w for w,_ in candidates} == {"bosom","boxes","hosts","mocks","robot","rosas"}
+
+def test_query_repeated_letters():
+    """ letter that is fixed, misplaced and missing is limited but never excludes the answer """
+    word_index = WordIndex(["daeep","dated","chest","cheek","sheet"])
+    assert pattern2str(get_pattern("eoeae","daeep")) == "m-fm-"
+    assert word_index.query(["e**a*"],"**e**","oe") == ["daeep"]
+    # fixed and misplaced letters of different guesses (eater, shelf) for answer chest
+    assert pattern2str(get_pattern("eater","chest")) == "m-m--"
+    assert pattern2str(get_pattern("shelf","chest")) == "mff--"
+    assert word_index.query(["e*t**","s****"],"*he**","aerlf") == ["chest"]
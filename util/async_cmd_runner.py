@@ -0,0 +1,221 @@
+""" Async Cmd Runner: Runs (many) OS Commands concurrently from one asyncio event loop """
+import sys
+import os
+import subprocess
+import shlex
+import logging
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class AsyncCmdRunner():
+    """ Runs OS Commands as asyncio subprocesses with bounded concurrency,
+        timeouts and bounded output buffers. run_cmd / run_cmds are the
+        synchronous facade, use the *_async methods from within an event loop
+    """
+    # keys of command results
+    CMD = "cmd"
+    RETURN_CODE = "return_code"
+    TIME = "time"
+    OUTPUT = "output"
+    SKIPPED = "skipped"
+    TIMEOUT = "timeout"
+    # bytes read from a pipe at once
+    READ_SIZE = 65536
+    # max number of output lines kept per command (oldest lines are dropped)
+    MAX_OUTPUT_LINES = 10000
+    # lines longer than this are split
+    MAX_LINE_LENGTH = 1024*1024
+
+    def __init__(self,cwd:str=None,max_concurrency:int=None,timeout:float=None,
+                 max_output_lines:int=MAX_OUTPUT_LINES,log_output:bool=True) -> None:
+        """ constructor
+            max_concurrency: max number of running processes (default cpu count)
+            timeout: default timeout in seconds for each command, process is killed after timeout
+            max_output_lines: max number of output lines kept for each command
+            log_output: log each output line (prefixed with command name)
+        """
+        if not cwd:
+            cwd = os.getcwd()
+        if not os.path.isdir(cwd):
+            logger.error(f"{cwd} is not a path, check input")
+        self._cwd = os.path.abspath(cwd)
+        if max_concurrency is None:
+            max_concurrency = os.cpu_count() or 1
+        self._max_concurrency = max_concurrency
+        self._timeout = timeout
+        self._max_output_lines = max_output_lines
+        self._log_output = log_output
+
+    @staticmethod
+    def get_result(os_cmd,return_code:int=1,cmd_time:float=0,output:list=None,
+                   skipped:bool=False,timeout:bool=False)->dict:
+        """ command result dict """
+        ar = AsyncCmdRunner
+        return {ar.CMD:os_cmd,ar.RETURN_CODE:return_code,ar.TIME:cmd_time,
+                ar.OUTPUT:output if output is not None else [],
+                ar.SKIPPED:skipped,ar.TIMEOUT:timeout}
+
+    async def _create_process(self,os_cmd):
+        """ starts the subprocess, command string is split into args """
+        args = shlex.split(os_cmd) if isinstance(os_cmd,str) else list(os_cmd)
+        if os.name == "nt":
+            # same as Popen(args,shell=True): use cmd shell
+            return await asyncio.create_subprocess_shell(subprocess.list2cmdline(args),
+                                                         stdout=subprocess.PIPE,stderr=subprocess.STDOUT,
+                                                         cwd=self._cwd)
+        return await asyncio.create_subprocess_exec(*args,stdout=subprocess.PIPE,stderr=subprocess.STDOUT,
+                                                    cwd=self._cwd)
+
+    async def _read_output(self,stream:asyncio.StreamReader,output:deque,prefix:str=None)->None:
+        """ reads output line by line into bounded buffer, reading the pipe
+            continuously so that the process never blocks on a full pipe
+        """
+        pending = b""
+        while True:
+            chunk = await stream.read(AsyncCmdRunner.READ_SIZE)
+            if not chunk:
+                break
+            lines = (pending+chunk).split(b"\n")
+            pending = lines.pop()
+            if len(pending) > AsyncCmdRunner.MAX_LINE_LENGTH:
+                lines.append(pending)
+                pending = b""
+            for line in lines:
+                self._add_line(line,output,prefix)
+        if pending:
+            self._add_line(pending,output,prefix)
+
+    async def _read_output_and_wait(self,process,output:deque,prefix:str=None)->int:
+        """ reads output until EOF and waits for the process, returns return code """
+        await self._read_output(process.stdout,output,prefix)
+        return await process.wait()
+
+    def _add_line(self,line:bytes,output:deque,prefix:str=None)->None:
+        """ decodes and stores output line """
+        # encoding for german umlauts
+        line = line.decode("utf8",errors="ignore").replace("\r","")
+        output.append(line+"\n")
+        if self._log_output:
+            if prefix is not None:
+                line = f"[{prefix}] {line}"
+            logger.info(line)
+
+    async def run_cmd_async(self,os_cmd,name:str=None,timeout:float=None)->dict:
+        """ runs a command (string or list of args), returns result dict
+            (cmd,return_code,time,output,skipped,timeout). if the task
+            gets cancelled, the process is killed
+        """
+        logger.info(f"RUN COMMAND [{os_cmd}]")
+        if not os_cmd:
+            logger.warning("No command submitted, return")
+            return AsyncCmdRunner.get_result(os_cmd,skipped=True)
+        if timeout is None:
+            timeout = self._timeout
+        output = deque(maxlen=self._max_output_lines)
+        start = time.perf_counter()
+        try:
+            process = await self._create_process(os_cmd)
+        except OSError as e:
+            logger.error(f"EXCEPTION OCCURED {e}, command {os_cmd}")
+            return AsyncCmdRunner.get_result(os_cmd,output=[str(e)])
+        is_timeout = False
+        try:
+            return_code = await asyncio.wait_for(self._read_output_and_wait(process,output,name),timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"TIMEOUT ({timeout}s), command {os_cmd}")
+            is_timeout = True
+            return_code = None
+        finally:
+            # timeout or cancellation
+            if process.returncode is None:
+                process.kill()
+                await asyncio.shield(process.wait())
+        cmd_time = round(time.perf_counter()-start,3)
+        if return_code:
+            logger.error(f"ERROR OCCURED, return code {return_code}, command {os_cmd}")
+        return AsyncCmdRunner.get_result(os_cmd,return_code,cmd_time,list(output),timeout=is_timeout)
+
+    async def run_cmds_async(self,cmds,depends_on:dict=None,stop_on_error:bool=True,
+                             timeout:float=None)->dict:
+        """ runs a list or dict (name:command) of commands concurrently,
+            at most max_concurrency processes at the same time
+            depends_on: dict name:[names] the command has to wait for,
+            for a list the names are the list indices
+            stop_on_error: commands depending on a failed command are skipped
+            returns dict name:result
+        """
+        if isinstance(cmds,list):
+            cmds = dict(enumerate(cmds))
+        if depends_on is None:
+            depends_on = {}
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        tasks = {}
+        missing = {}
+
+        async def run_task(name,os_cmd):
+            predecessors = depends_on.get(name,[])
+            if predecessors:
+                results = await asyncio.gather(*[tasks[p] for p in predecessors])
+                failed = [p for p,r in zip(predecessors,results) if r[AsyncCmdRunner.RETURN_CODE] != 0]
+                if stop_on_error and failed:
+                    logger.warning(f"Command [{name}] skipped, failed predecessors {failed}")
+                    return AsyncCmdRunner.get_result(os_cmd,skipped=True)
+            async with semaphore:
+                return await self.run_cmd_async(os_cmd,name,timeout)
+
+        # create tasks in dependency order, commands in cycles or with missing
+        # predecessors are not run
+        pending = dict(cmds)
+        while pending:
+            ready = [n for n in pending if all([p in tasks for p in depends_on.get(n,[])])]
+            if not ready:
+                missing = pending
+                logger.error(f"Commands {list(missing.keys())} have missing or cyclic dependencies, skipped")
+                break
+            for name in ready:
+                tasks[name] = asyncio.ensure_future(run_task(name,pending.pop(name)))
+        start = time.perf_counter()
+        try:
+            results = await asyncio.gather(*tasks.values())
+        except asyncio.CancelledError:
+            # gather cancels all tasks, wait until their processes are killed
+            await asyncio.wait(tasks.values())
+            raise
+        out = dict(zip(tasks.keys(),results))
+        for name,os_cmd in missing.items():
+            out[name] = AsyncCmdRunner.get_result(os_cmd,skipped=True)
+        logger.info(f"Finished {len(out)} commands in {round(time.perf_counter()-start,3)}s")
+        return {name:out[name] for name in cmds.keys()}
+
+    @staticmethod
+    def _run_sync(coro_func,*args):
+        """ runs coroutine function to completion, from within a running event loop
+            (eg notebooks, async callers) it is run in its own event loop in a worker thread
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro_func(*args))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run,coro_func(*args)).result()
+
+    def run_cmd(self,os_cmd,name:str=None,timeout:float=None)->dict:
+        """ synchronous facade for run_cmd_async """
+        return AsyncCmdRunner._run_sync(self.run_cmd_async,os_cmd,name,timeout)
+
+    def run_cmds(self,cmds,depends_on:dict=None,stop_on_error:bool=True,timeout:float=None)->dict:
+        """ synchronous facade for run_cmds_async """
+        return AsyncCmdRunner._run_sync(self.run_cmds_async,cmds,depends_on,stop_on_error,timeout)
+
+if __name__ == "__main__":
+    loglevel = logging.DEBUG
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(module)s:[%(name)s.%(funcName)s(%(lineno)d)]: %(message)s',
+                        level=loglevel, stream=sys.stdout, datefmt="%Y-%m-%d %H:%M:%S")
+    runner = AsyncCmdRunner(max_concurrency=4,timeout=10)
+    cmd = f'"{sys.executable}" -c "import time;time.sleep(1);print(1)"'
+    results = runner.run_cmds([cmd]*8)
+    print({n:(r[AsyncCmdRunner.RETURN_CODE],r[AsyncCmdRunner.TIME]) for n,r in results.items()})
@@ -1,10 +1,10 @@
 """ Cnd Runner: Runs OS Commands locally """
 import sys
 import os
-import subprocess
-import shlex
 import logging
 
+from util.async_cmd_runner import AsyncCmdRunner
+
 logger = logging.getLogger(__name__)
 
 class CmdRunner():
@@ -20,35 +20,15 @@ class CmdRunner():
             logger.error(f"{cwd} is not a path, check input")
         self._cwd = os.path.abspath(cwd)
 
-    def run_cmd(self,os_cmd:str):
-        """ runs command line command """        
-        logger.info(f"RUN COMMAND [{os_cmd}]")
+    def run_cmd(self,os_cmd:str,timeout:float=None):
+        """ runs command line command """
         if not os_cmd:
             logger.warning("No command submitted, return")
             return
-        oscmd_shlex=shlex.split(os_cmd)
-        # special case: output contains keywords (in this case its displaying a logfile)
-        self._output=[]
-        self._return_code=0
-        try:
-            # encoding for german umlauts
-            with subprocess.Popen(oscmd_shlex, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                    errors='ignore',universal_newlines=True,encoding="utf8",cwd=self._cwd) as popen:
-                for line in popen.stdout:
-                    self._output.append(line)
-                    line=line.replace("\n","")
-                    logger.info(line)
-
-            # popen.stdout.close()
-            if popen.stderr:
-                logger.error(f"ERROR OCCURED: {popen.stderr}")
-
-            self._return_code = popen.returncode
-            if self._return_code:
-                raise subprocess.CalledProcessError(self._return_code, os_cmd)
-        except subprocess.CalledProcessError as e:
-            self._return_code=1
-            logger.error(f"EXCEPTION OCCURED {e}, command {os_cmd}")
+        result = AsyncCmdRunner(self._cwd).run_cmd(os_cmd,timeout=timeout)
+        self._output = result[AsyncCmdRunner.OUTPUT]
+        # return code None: process timed out
+        self._return_code = 0 if result[AsyncCmdRunner.RETURN_CODE] == 0 else 1
         return self._return_code
 
     def get_output(self,as_string=True):
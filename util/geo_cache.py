@@ -0,0 +1,216 @@
+""" Geo Cache: persistent reverse geocoding cache, only cache misses are sent
+    to the (rate limited) reverse geocoding backend (eg Nominatim)
+"""
+import sys
+import os
+import csv
+import json
+import math
+import time
+import logging
+import urllib.request
+import urllib.parse
+from urllib.error import URLError
+
+# reference python path (also when imported as tools.util.geo_cache)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from util.persistence import Persistence
+
+logger = logging.getLogger(__name__)
+
+# nominatim reverse api, see https://nominatim.org/release-docs/develop/api/Reverse/
+URL_NOMINATIM_REVERSE = "https://nominatim.openstreetmap.org/reverse"
+USER_AGENT = "aiventures-tools-geocache"
+# nominatim usage policy: max 1 request per second
+MIN_REQUEST_INTERVAL = 1.0
+EARTH_RADIUS = 6371.0 # km
+# keys of cached entries: requested coordinates and reverse geocoding result
+LATLON = "latlon"
+GEO_INFO = "geo_info"
+# column names for lat lon in gazetteer files (geonames uses latitude / longitude)
+GAZETTEER_LAT = ["lat","latitude"]
+GAZETTEER_LON = ["lon","lng","longitude"]
+
+def get_distance(latlon1,latlon2)->float:
+    """ great circle distance in km (haversine) """
+    lat1,lon1,lat2,lon2 = map(math.radians,[*latlon1,*latlon2])
+    a = math.sin((lat2-lat1)/2)**2+math.cos(lat1)*math.cos(lat2)*math.sin((lon2-lon1)/2)**2
+    return 2*EARTH_RADIUS*math.asin(min(1.0,math.sqrt(a)))
+
+def nominatim_reverse(latlon,url:str=URL_NOMINATIM_REVERSE,user_agent:str=USER_AGENT,
+                      timeout:float=10,**params)->dict:
+    """ reverse geocoding request to nominatim (compatible) server, returns json response """
+    query = {"format":"jsonv2","lat":latlon[0],"lon":latlon[1],"addressdetails":1,**params}
+    request = urllib.request.Request(f"{url}?{urllib.parse.urlencode(query)}",
+                                     headers={"User-Agent":user_agent})
+    with urllib.request.urlopen(request,timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+class GeoCache():
+    """ Persistent reverse geocoding cache
+        entries are stored in a grid of rounded lat lon cells, a lookup returns the
+        nearest cached entry within the radius (km). backend is a function
+        latlon -> dict doing the actual (rate limited) reverse geocoding.
+        Entries of a local gazetteer are kept in a separate grid (they don't have the
+        schema of the backend results), see import_gazetteer / lookup_gazetteer
+    """
+
+    def __init__(self,f_cache:str=None,backend=nominatim_reverse,radius:float=0.1,
+                 precision:int=3,min_interval:float=MIN_REQUEST_INTERVAL) -> None:
+        """ constructor
+            f_cache: json file of cache (optionally compressed, eg .json.gz), None: memory only
+            radius: tolerance in km, cached entries within radius are used
+            precision: decimals of grid cells (3: ~0.1km latitude)
+            min_interval: min time in seconds between backend requests
+        """
+        self._f_cache = f_cache
+        self._backend = backend
+        self._radius = radius
+        self._precision = precision
+        self._cell_size = 10**-precision
+        self._min_interval = min_interval
+        self._last_request = None
+        self._changed = False
+        # grid cell key: list of entries
+        self._cells = {}
+        self._num_entries = 0
+        # grid of gazetteer entries (not persisted)
+        self._gazetteer_cells = {}
+        if f_cache and os.path.isfile(f_cache):
+            entries = Persistence.read_json(f_cache) or []
+            for entry in entries:
+                self.add(entry[LATLON],entry[GEO_INFO])
+            self._changed = False
+            logger.info(f"Read {len(entries)} geo cache entries from {f_cache}")
+
+    def __len__(self):
+        return self._num_entries
+
+    def _get_cell(self,latlon)->tuple:
+        """ grid cell indices of coordinates """
+        return (math.floor(latlon[0]/self._cell_size),math.floor(latlon[1]/self._cell_size))
+
+    def _add_entry(self,cells:dict,latlon,geo_info:dict)->None:
+        """ adds entry to grid """
+        latlon = [round(float(latlon[0]),6),round(float(latlon[1]),6)]
+        cells.setdefault(self._get_cell(latlon),[]).append({LATLON:latlon,GEO_INFO:geo_info})
+
+    def add(self,latlon,geo_info:dict)->None:
+        """ adds reverse geocoding result for coordinates """
+        self._add_entry(self._cells,latlon,geo_info)
+        self._num_entries += 1
+        self._changed = True
+
+    def lookup(self,latlon,radius:float=None)->dict:
+        """ geo info of nearest cached coordinates within radius (km) or None """
+        return self._lookup_entry(self._cells,latlon,radius)
+
+    def lookup_gazetteer(self,latlon,radius:float=None)->dict:
+        """ gazetteer row (without coordinates) of nearest place within radius (km) or None """
+        return self._lookup_entry(self._gazetteer_cells,latlon,radius)
+
+    def _lookup_entry(self,cells:dict,latlon,radius:float=None)->dict:
+        """ geo info of nearest entry of grid within radius (km) or None """
+        if radius is None:
+            radius = self._radius
+        lat,lon = float(latlon[0]),float(latlon[1])
+        # cells to be searched
+        d_lat = math.ceil(math.degrees(radius/EARTH_RADIUS)/self._cell_size)
+        cos_lat = max(math.cos(math.radians(min(abs(lat)+math.degrees(radius/EARTH_RADIUS),90))),1e-6)
+        d_lon = min(math.ceil(d_lat/cos_lat),math.ceil(180/self._cell_size))
+        c_lat,c_lon = self._get_cell((lat,lon))
+        found = None
+        found_distance = radius
+        for i in range(c_lat-d_lat,c_lat+d_lat+1):
+            for j in range(c_lon-d_lon,c_lon+d_lon+1):
+                for entry in cells.get((i,j),[]):
+                    distance = get_distance((lat,lon),entry[LATLON])
+                    if distance <= found_distance:
+                        found = entry[GEO_INFO]
+                        found_distance = distance
+        return found
+
+    def _request(self,latlon)->dict:
+        """ backend request, waits only as long as needed between requests """
+        if self._last_request is not None:
+            wait = self._min_interval-(time.monotonic()-self._last_request)
+            if wait > 0:
+                time.sleep(wait)
+        try:
+            return self._backend(latlon)
+        except (URLError,OSError,ValueError) as e:
+            logger.error(f"Reverse geocoding of {latlon} failed: {e}")
+            return None
+        finally:
+            self._last_request = time.monotonic()
+
+    def reverse(self,latlon,save:bool=True)->dict:
+        """ reverse geocoding using cache, backend is only requested for cache miss """
+        return self.reverse_batch([latlon],save)[0]
+
+    def reverse_batch(self,latlon_list:list,save:bool=True)->list:
+        """ reverse geocoding for list of coordinates, each cache miss is requested only once
+            (coordinates close to a previous miss use its result), cache is saved once
+            returns list of geo info dicts (None if not found)
+        """
+        out = []
+        num_requests = 0
+        for latlon in latlon_list:
+            geo_info = self.lookup(latlon)
+            if geo_info is None:
+                geo_info = self._request(latlon)
+                num_requests += 1
+                if geo_info is not None:
+                    self.add(latlon,geo_info)
+            out.append(geo_info)
+        logger.info(f"Reverse geocoding of {len(latlon_list)} coordinates, {num_requests} backend requests")
+        if save:
+            self.save()
+        return out
+
+    def import_gazetteer(self,f_gazetteer:str,delimiter:str=None,fieldnames:list=None,
+                         encoding:str="utf-8")->int:
+        """ bulk import of a local gazetteer file (csv / tsv, optionally compressed)
+            for offline lookups (lookup_gazetteer), each row becomes an entry.
+            fieldnames: column names for files without header row (eg geonames dumps).
+            returns number of imported entries
+        """
+        if delimiter is None:
+            delimiter = "\t" if ".tsv" in f_gazetteer or ".txt" in f_gazetteer else ","
+        n = 0
+        with Persistence.open_file(f_gazetteer,encoding=encoding) as fp:
+            reader = csv.DictReader(fp,fieldnames=fieldnames,delimiter=delimiter)
+            columns = reader.fieldnames or []
+            lat_key = next((c for c in columns if c.lower() in GAZETTEER_LAT),None)
+            lon_key = next((c for c in columns if c.lower() in GAZETTEER_LON),None)
+            if lat_key is None or lon_key is None:
+                logger.error(f"No lat lon columns found in {f_gazetteer}, columns {columns}")
+                return 0
+            for row in reader:
+                try:
+                    latlon = (float(row[lat_key]),float(row[lon_key]))
+                except (TypeError,ValueError):
+                    logger.warning(f"Invalid coordinates in {f_gazetteer}: {row}")
+                    continue
+                geo_info = {k:v for k,v in row.items() if k not in [lat_key,lon_key,None]}
+                self._add_entry(self._gazetteer_cells,latlon,geo_info)
+                n += 1
+        logger.info(f"Imported {n} entries from {f_gazetteer}")
+        return n
+
+    def save(self,f_cache:str=None)->str:
+        """ saves cache (if changed), returns file name """
+        if f_cache is None:
+            f_cache = self._f_cache
+        if not f_cache or not self._changed:
+            return None
+        entries = [entry for cell in self._cells.values() for entry in cell]
+        Persistence.save_json(f_cache,entries,indent=None,use_orjson=True)
+        self._changed = False
+        logger.info(f"Saved {len(entries)} geo cache entries to {f_cache}")
+        return f_cache
+
+if __name__ == "__main__":
+    loglevel = logging.DEBUG
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(module)s:[%(name)s.%(funcName)s(%(lineno)d)]: %(message)s',
+                        level=loglevel, stream=sys.stdout, datefmt="%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,260 @@
+""" Link Checker: checks the health of (many) links concurrently from one asyncio event loop,
+    results are cached on disk so that links are only checked again after max_age
+"""
+import sys
+import os
+import ssl
+import time
+import logging
+import asyncio
+import http.client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime as DateTime
+from urllib.parse import urlsplit, urljoin
+
+# reference python path (also when imported as tools.util.link_checker)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from util.persistence import Persistence
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "Mozilla/5.0 (compatible; aiventures-tools-linkchecker)"
+# keys of link check results
+URL = "url"
+STATUS = "status"
+REDIRECT = "redirect"
+ERROR = "error"
+LAST_CHECKED = "last_checked"
+DEAD = "dead"
+# status codes for which HEAD is not supported / allowed, GET is used instead
+HEAD_FALLBACK_STATUS = [400,403,404,405,429,500,501,503]
+# redirect status codes
+REDIRECT_STATUS = [301,302,303,307,308]
+MAX_REDIRECTS = 10
+# status codes of links that are definitely gone (timeouts, 429 and 5xx might be transient)
+GONE_STATUS = [404,410]
+# bytes of a GET response body that are read to keep the connection open
+MAX_BODY_SIZE = 65536
+
+def is_dead(result:dict)->bool:
+    """ link is dead if it couldn't be reached or returned client / server error """
+    if not result:
+        return False
+    status = result.get(STATUS)
+    return status is None or status >= 400
+
+def is_gone(result:dict)->bool:
+    """ link is gone if the server answered definitely (not found / gone) """
+    if not result:
+        return False
+    return result.get(STATUS) in GONE_STATUS
+
+class LinkChecker():
+    """ Checks links concurrently: asyncio with bounded concurrency, pooled keep alive
+        connections (per host), per host rate limiting and HEAD request with GET fallback.
+        check_links is the synchronous facade, use check_links_async from within an event loop
+    """
+
+    def __init__(self,f_cache:str=None,max_concurrency:int=20,max_per_host:int=2,
+                 min_interval:float=0.5,timeout:float=10,max_age:float=86400,
+                 user_agent:str=USER_AGENT) -> None:
+        """ constructor
+            f_cache: json file of link check results (optionally compressed), None: memory only
+            max_concurrency: max number of concurrent requests
+            max_per_host: max number of concurrent requests (and pooled connections) per host
+            min_interval: min time in seconds between requests to the same host
+            timeout: timeout of a single request in seconds
+            max_age: cached results younger than max_age seconds are not checked again
+        """
+        self._f_cache = f_cache
+        self._max_concurrency = max_concurrency
+        self._max_per_host = max_per_host
+        self._min_interval = min_interval
+        self._timeout = timeout
+        self._max_age = max_age
+        self._user_agent = user_agent
+        self._ssl_context = ssl.create_default_context()
+        # idle connections per (scheme,host,port)
+        self._pool = {}
+        # per host: semaphore, lock and time of last request
+        self._host_semaphores = {}
+        self._host_locks = {}
+        self._host_last_request = {}
+        self._changed = False
+        self._cache = {}
+        if f_cache and os.path.isfile(f_cache):
+            self._cache = Persistence.read_json(f_cache) or {}
+            logger.info(f"Read {len(self._cache)} link check results from {f_cache}")
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get_result(self,url:str)->dict:
+        """ cached link check result or None """
+        return self._cache.get(url)
+
+    def _is_valid(self,result:dict)->bool:
+        """ cached result is younger than max age """
+        if not result or not result.get(LAST_CHECKED):
+            return False
+        checked = DateTime.fromisoformat(result[LAST_CHECKED])
+        return (DateTime.now()-checked).total_seconds() < self._max_age
+
+    def _get_connection(self,key:tuple)->http.client.HTTPConnection:
+        """ idle connection from pool or new connection """
+        idle = self._pool.get(key)
+        if idle:
+            try:
+                return idle.popleft()
+            except IndexError:
+                pass
+        scheme,host,port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host,port,timeout=self._timeout,context=self._ssl_context)
+        return http.client.HTTPConnection(host,port,timeout=self._timeout)
+
+    def _release_connection(self,key:tuple,connection)->None:
+        """ puts connection back into pool """
+        idle = self._pool.setdefault(key,deque())
+        if len(idle) < self._max_per_host:
+            idle.append(connection)
+        else:
+            connection.close()
+
+    def _request(self,method:str,url:str)->tuple:
+        """ blocking request using a pooled connection, returns (status,location) """
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme,parts.hostname,port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?"+parts.query
+        headers = {"User-Agent":self._user_agent,"Accept":"*/*"}
+        # a pooled connection may have been closed by the server: retry once with a new one
+        for attempt in range(2):
+            connection = self._get_connection(key)
+            try:
+                connection.request(method,path,headers=headers)
+                response = connection.getresponse()
+                status,location = response.status,response.getheader("Location")
+                body = response.read(MAX_BODY_SIZE) if method == "GET" else response.read()
+                if response.isclosed() or (method == "GET" and len(body) >= MAX_BODY_SIZE):
+                    connection.close()
+                else:
+                    self._release_connection(key,connection)
+                return status,location
+            except (http.client.RemoteDisconnected,BrokenPipeError,ConnectionResetError):
+                connection.close()
+                if attempt > 0:
+                    raise
+            except Exception:
+                connection.close()
+                raise
+
+    async def _wait_for_host(self,host:str)->None:
+        """ rate limiting: waits only as long as needed between requests to the same host """
+        lock = self._host_locks.setdefault(host,asyncio.Lock())
+        async with lock:
+            last_request = self._host_last_request.get(host)
+            if last_request is not None:
+                wait = self._min_interval-(time.monotonic()-last_request)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            self._host_last_request[host] = time.monotonic()
+
+    async def _fetch(self,method:str,url:str,executor)->tuple:
+        """ rate limited request of the host """
+        host = urlsplit(url).hostname
+        semaphore = self._host_semaphores.setdefault(host,asyncio.Semaphore(self._max_per_host))
+        async with semaphore:
+            await self._wait_for_host(host)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor,self._request,method,url)
+
+    async def _check_link(self,url:str,executor,semaphore)->dict:
+        """ checks single link: HEAD with GET fallback, redirects are followed """
+        result = {URL:url,STATUS:None,REDIRECT:None,ERROR:None}
+        async with semaphore:
+            current_url = url
+            try:
+                for _ in range(MAX_REDIRECTS+1):
+                    status,location = await self._fetch("HEAD",current_url,executor)
+                    if status in HEAD_FALLBACK_STATUS:
+                        status,location = await self._fetch("GET",current_url,executor)
+                    if status in REDIRECT_STATUS and location:
+                        current_url = urljoin(current_url,location)
+                        continue
+                    break
+                else:
+                    result[ERROR] = f"More than {MAX_REDIRECTS} redirects"
+                result[STATUS] = status
+            except Exception as e:
+                result[ERROR] = f"{type(e).__name__}: {e}"
+            if current_url != url:
+                result[REDIRECT] = current_url
+        result[LAST_CHECKED] = DateTime.now().isoformat(timespec="seconds")
+        return result
+
+    async def check_links_async(self,urls:list,force:bool=False)->dict:
+        """ checks links concurrently, cached results are used unless force is set
+            returns dict url: link check result
+        """
+        urls = list(dict.fromkeys([url for url in urls if url]))
+        out = {}
+        to_check = []
+        for url in urls:
+            cached = self._cache.get(url)
+            if not force and self._is_valid(cached):
+                out[url] = cached
+            elif urlsplit(url).scheme not in ["http","https"]:
+                out[url] = {URL:url,STATUS:None,REDIRECT:None,ERROR:"Unsupported url",LAST_CHECKED:None}
+            else:
+                to_check.append(url)
+        logger.info(f"Checking {len(to_check)} of {len(urls)} links ({len(urls)-len(to_check)} cached)")
+        # asyncio primitives are bound to the running event loop
+        self._host_semaphores = {}
+        self._host_locks = {}
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+        with ThreadPoolExecutor(max_workers=self._max_concurrency) as executor:
+            try:
+                results = await asyncio.gather(*[self._check_link(url,executor,semaphore) for url in to_check])
+            finally:
+                self.close()
+        for result in results:
+            out[result[URL]] = result
+            self._cache[result[URL]] = result
+            self._changed = True
+            if is_dead(result):
+                logger.warning(f"Dead link {result[URL]}: status {result[STATUS]} {result[ERROR] or ''}")
+        return {url:out[url] for url in urls}
+
+    def check_links(self,urls:list,force:bool=False,save:bool=True)->dict:
+        """ checks links concurrently (synchronous facade), cache is saved once """
+        out = asyncio.run(self.check_links_async(urls,force))
+        if save:
+            self.save()
+        return out
+
+    def close(self)->None:
+        """ closes all pooled connections """
+        for idle in self._pool.values():
+            while idle:
+                idle.popleft().close()
+        self._pool = {}
+
+    def save(self,f_cache:str=None)->str:
+        """ saves cache (if changed), returns file name """
+        if f_cache is None:
+            f_cache = self._f_cache
+        if not f_cache or not self._changed:
+            return None
+        Persistence.save_json(f_cache,self._cache,indent=None,use_orjson=True)
+        self._changed = False
+        logger.info(f"Saved {len(self._cache)} link check results to {f_cache}")
+        return f_cache
+
+if __name__ == "__main__":
+    loglevel = logging.DEBUG
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(module)s:[%(name)s.%(funcName)s(%(lineno)d)]: %(message)s',
+                        level=loglevel, stream=sys.stdout, datefmt="%Y-%m-%d %H:%M:%S")
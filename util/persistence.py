@@ -5,6 +5,11 @@ from pathlib import Path
 import logging
 from datetime import datetime as DateTime
 import json
+import csv
+import io
+import gzip
+import tempfile
+from contextlib import contextmanager
 
 # when doing tests add this to reference python path
 if __name__ == "__main__":
@@ -26,10 +31,13 @@ class Persistence():
     """ Helper class to read / write (single) file """
 
     NUM_COL_TITLE = "num" # csv column title for number
+    CSV_SEP = ";" # default csv separator for reading and saving csv files
     ID_TITLE = "id" # column name of object header
     TEMPLATE_DEFAULT_VALUE = "undefined" # default value for template value
     LINE_KEY = "line" # dict key for lines attribute when reading yaml
     ALLOWED_FILE_TYPES = ["yaml","txt","json","plantuml","md"]
+    BUFFER_SIZE = 1024*1024 # write buffer size in bytes
+    COMPRESSION_SUFFIXES = {".gz":"gzip",".zst":"zstd"} # compressed file types
 
     def __init__(self,f_read:str=None,f_save:str=None,**kwargs) -> None:
         """ constructor """
@@ -47,7 +55,7 @@ class Persistence():
             self._f_save = f_save
         # get more params form kwargs
         self._dec_sep = kwargs.get("dec_sep",",")
-        self._csv_sep = kwargs.get("csv_sep",";")
+        self._csv_sep = kwargs.get("csv_sep",Persistence.CSV_SEP)
         self._add_timestamp = kwargs.get("add_timestamp",False)
 
         logger.debug(f"Decimal Separator: {self._dec_sep}, CSV Separator: {self._csv_sep}")
@@ -172,7 +180,7 @@ class Persistence():
             Persistence.save_json(p_file,template)
         elif p_suffix.lower().endswith("csv"):
             csv_data = Persistence.headerdict2list(template)
-            Persistence.save_list(f,csv_data)
+            Persistence.save_csv(p_file,csv_data)
         else:
             logger.error("File template creation only allowed for type yaml,json,csv")
         logger.info(f"Created Template file {p_file}")
@@ -213,67 +221,141 @@ class Persistence():
             return passed
 
         num_col_title = Persistence.NUM_COL_TITLE
-        out_list = []
-        columns=[]
-        column_counts=[]
+        rows = []
+        # column union in order of appearance, computed once
+        columns = {}
+        column_counts = set()
         index = 1
         for header,value_dict in d.items():
             if filter_list:
                 passed = is_passed(header,value_dict)
                 if passed is False:
                     continue
-            keys = list(value_dict.keys())
-            # get some stats
-            columns.append(keys)
-            columns = list(set(keys))
-            column_counts.append(len(keys))
-            column_counts=list(set(column_counts))
-            line_dict = {num_col_title:str(index).zfill(2),header_name:header}
+            column_counts.add(len(value_dict))
+            columns.update(dict.fromkeys(value_dict))
+            rows.append((str(index).zfill(2),header,value_dict))
             index += 1
-            for k in keys:
-                line_dict[k]=str(value_dict[k])
-            out_list.append(line_dict)
+        columns = list(columns)
+        logger.debug(f"Created {len(rows)} entries, columns {columns}")
 
-        logger.debug(f"Created {len(out_list)} entries, columns {columns}")
-        if len(column_counts) > 1:
+        # emit all lines in one pass: column subset (ensures column order),
+        # columns padded with empty values or the columns of each entry
+        padded = len(column_counts) > 1
+        if padded:
             logger.debug("Different Columns present for each line, appending missing columns")
-            out_list_new = []
-            for line_dict in out_list:
-                out_dict_new={num_col_title:line_dict[num_col_title],header_name:line_dict[header_name]}
-                for column in sorted(columns):
-                    v = line_dict.get(column)
-                    if v is None:
-                        logger.debug(f"Adding empty value for line with key {line_dict[header_name]}")
-                        v = ""
-                    out_dict_new[column]=v
-                out_list_new.append(out_dict_new)
-            out_list = out_list_new
-
         if column_list:
-            # create column subset only / use to ensure column order
-            out_list_new = []
-            for line_dict in out_list:
-                out_dict_new={header_name:line_dict[header_name]}
+            # missing values only for columns present in any entry
+            pad_columns = set(columns) if padded else set()
+            out_list = []
+            for _,header,value_dict in rows:
+                line_dict = {header_name:header}
                 for column in column_list:
-                    v = line_dict.get(column)
-                    if v is not None:
-                        out_dict_new[column]=v
-                out_list_new.append(out_dict_new)
-            out_list = out_list_new
+                    if column in value_dict:
+                        line_dict[column]=str(value_dict[column])
+                    elif column in pad_columns:
+                        line_dict[column]=""
+                out_list.append(line_dict)
+        elif padded:
+            columns = sorted(columns)
+            out_list = []
+            for num,header,value_dict in rows:
+                line_dict = {num_col_title:num,header_name:header}
+                for column in columns:
+                    line_dict[column]=str(value_dict[column]) if column in value_dict else ""
+                out_list.append(line_dict)
+        else:
+            out_list = [{num_col_title:num,header_name:header,**{k:str(v) for k,v in value_dict.items()}}
+                        for num,header,value_dict in rows]
 
         return out_list
 
+    @staticmethod
+    def get_columns(data_list:list)->list:
+        """ union of all keys of a list of dictionaries in order of appearance """
+        columns = {}
+        for data in data_list:
+            columns.update(dict.fromkeys(data))
+        return list(columns)
+
+    @staticmethod
+    def write_csv(fp,data_list,columns:list=None,csv_sep:str=CSV_SEP)->int:
+        """ writes dictionaries (list or any iterable) as csv rows into open text file object,
+            columns default to the keys of the first row, missing values are left empty,
+            values containing the separator are quoted. returns number of rows
+        """
+        writer = None
+        n = 0
+        for data in data_list:
+            if writer is None:
+                if columns is None:
+                    columns = list(data.keys())
+                writer = csv.DictWriter(fp,fieldnames=columns,delimiter=csv_sep,restval="",
+                                        extrasaction="ignore",lineterminator="\n")
+                writer.writeheader()
+            writer.writerow(data)
+            n += 1
+        return n
+
+    @staticmethod
+    def save_csv(f_save:str,data_list,columns:list=None,csv_sep:str=CSV_SEP,encoding:str="utf-8",
+                 atomic:bool=True)->str:
+        """ streams dictionaries (list or any iterable, eg generator) into a csv file
+            (optionally atomic / compressed by suffix), returns saved file name
+        """
+        try:
+            with Persistence.open_save_file(f_save,encoding=encoding,atomic=atomic,newline="") as fp:
+                n = Persistence.write_csv(fp,data_list,columns,csv_sep)
+        except:
+            logger.error(f"Exception writing file {f_save}",exc_info=True)
+            return None
+        logger.info(f"Saved {n} rows to csv file {f_save}")
+        return f_save
+
+    @staticmethod
+    def export_dataframe(f_save:str,data_list:list,columns:list=None,**kwargs)->str:
+        """ exports list of dictionaries using pandas as csv, xlsx or parquet (by file suffix),
+            requires pandas (and openpyxl / pyarrow for xlsx / parquet), kwargs are passed
+            to the pandas export method. returns saved file name
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            logger.error("Export requires pandas, install it (pip install pandas)")
+            return None
+        suffix = Path(f_save).suffix[1:].lower()
+        if columns is None:
+            columns = Persistence.get_columns(data_list)
+        df = pd.DataFrame.from_records(data_list,columns=columns)
+        try:
+            if suffix == "csv":
+                df.to_csv(f_save,index=False,**kwargs)
+            elif suffix == "xlsx":
+                df.to_excel(f_save,index=False,**kwargs)
+            elif suffix == "parquet":
+                df.to_parquet(f_save,index=False,**kwargs)
+            else:
+                logger.error(f"File {f_save}: export only allowed for type csv,xlsx,parquet")
+                return None
+        except ImportError as e:
+            logger.error(f"Missing library for export of {f_save}: {e}")
+            return None
+        logger.info(f"Exported {len(df)} rows to {f_save}")
+        return f_save
+
     def _csv2dict(self,lines)->dict:
-        """ transform csv lines to dictionary """
+        """ transform csv lines (list or open file) to dictionary, quoted values may contain
+            separators, quotes and line breaks
+        """
         out_list = []
-        if len(lines) <= 1:
+        rows = [r for r in csv.reader(lines,delimiter=self._csv_sep) if r]
+        if len(rows) <= 1:
             logger.warning("Too few lines in CSV")
             return {}
-        keys = lines[0].split( self._csv_sep)
+        keys = rows[0]
         num_keys = len(keys)
         logger.debug(f"CSV COLUMNS ({num_keys}): {keys}")
-        for i,l in enumerate(lines[1:]):
-            values = l.split( self._csv_sep)
+        for i,values in enumerate(rows[1:]):
+            l = self._csv_sep.join(values)
             if len(values) != num_keys:
                 logger.warning(f"Entry [{i}]: Wrong number of entries, expected {num_keys} {l}")
                 continue
@@ -283,31 +365,110 @@ class Persistence():
 
     @staticmethod
     def dicts2csv(data_list:list,csv_sep:str=",")->list:
-        """ try to convert a list of dictionaries into csv format """
-        out = []
+        """ try to convert a list of dictionaries into csv format
+            (note: separator defaults to "," unlike CSV_SEP used for reading / saving files)
+        """
         if not data_list:
             logger.warning("no data in list")
             return None
-        key_row = data_list[0]
-        if not isinstance(key_row,dict):
+        if not isinstance(data_list[0],dict):
             logger.warning("List data is ot a dictionary, nothing will be returned")
             return None
-        keys = list(key_row.keys())
-        out.append(csv_sep.join(keys))
-        for data in data_list:
-            data_row = []
-            for k in keys:
-                v=data.get(k,"")
-                if csv_sep in v:
-                    logger.warning(f"CSV Separator {v} found in {k}:{v}, will be replaced by _sep_")
-                    v = v.replace(csv_sep,"_sep_")
-                data_row.append(v)
-            out.append(csv_sep.join(data_row))
-        return out
+        fp = io.StringIO()
+        Persistence.write_csv(fp,data_list,csv_sep=csv_sep)
+        return fp.getvalue().splitlines()
+
+    @staticmethod
+    def get_compression(filepath:str)->str:
+        """ compression type (gzip,zstd) from file suffix or None """
+        return Persistence.COMPRESSION_SUFFIXES.get(Path(filepath).suffix.lower())
+
+    @staticmethod
+    def _compressed_stream(fp,compression:str,mode:str="rb"):
+        """ wraps binary file object into compressing / decompressing stream """
+        if compression == "gzip":
+            return gzip.GzipFile(fileobj=fp,mode=mode)
+        # zstd is optional
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("zstd compression requires zstandard (pip install zstandard)") from e
+        if "r" in mode:
+            return zstandard.ZstdDecompressor().stream_reader(fp,closefd=False)
+        return zstandard.ZstdCompressor().stream_writer(fp,closefd=False)
+
+    @staticmethod
+    @contextmanager
+    def open_file(filepath:str,mode:str="r",encoding:str="utf-8",errors:str=None,newline:str=None):
+        """ opens file for reading, gzip / zstd compressed files (.gz / .zst) are decompressed """
+        compression = Persistence.get_compression(filepath)
+        binary = "b" in mode
+        if compression is None:
+            with open(filepath,"rb" if binary else "r",encoding=None if binary else encoding,
+                      errors=None if binary else errors,newline=None if binary else newline) as fp:
+                yield fp
+            return
+        with open(filepath,"rb") as fp_raw:
+            with Persistence._compressed_stream(fp_raw,compression,"rb") as fp_bin:
+                if binary:
+                    yield fp_bin
+                    return
+                with io.TextIOWrapper(fp_bin,encoding=encoding,errors=errors,newline=newline) as fp:
+                    yield fp
+
+    @staticmethod
+    @contextmanager
+    def open_save_file(filepath:str,mode:str="w",encoding:str="utf-8",atomic:bool=True,
+                       buffering:int=BUFFER_SIZE,newline:str=None):
+        """ opens file for writing (text or binary mode "wb"), gzip / zstd compressed by
+            file suffix (.gz / .zst). atomic: data is written into a temp file in the same
+            folder replacing the file only after successful write, so that readers never see a
+            partially written file and an existing file is kept if writing fails
+        """
+        filepath = os.path.abspath(filepath)
+        compression = Persistence.get_compression(filepath)
+        binary = "b" in mode
+        f_tmp = None
+        if atomic:
+            fd,f_tmp = tempfile.mkstemp(prefix=f".{os.path.basename(filepath)}.",suffix=".tmp",
+                                        dir=os.path.dirname(filepath))
+            fp_raw = os.fdopen(fd,"wb",buffering=buffering)
+        else:
+            fp_raw = open(filepath,"wb",buffering=buffering)
+        try:
+            with fp_raw:
+                fp_bin = fp_raw
+                if compression:
+                    fp_bin = Persistence._compressed_stream(fp_raw,compression,"wb")
+                if binary:
+                    with fp_bin:
+                        yield fp_bin
+                else:
+                    # closing the wrapper also closes the compressor, writing the file trailer
+                    with io.TextIOWrapper(fp_bin,encoding=encoding,newline=newline) as fp:
+                        yield fp
+            if atomic:
+                Persistence._copy_file_mode(filepath,f_tmp)
+                os.replace(f_tmp,filepath)
+        finally:
+            if f_tmp and os.path.isfile(f_tmp):
+                os.remove(f_tmp)
+
+    @staticmethod
+    def _copy_file_mode(filepath:str,f_tmp:str)->None:
+        """ temp files are created with owner permissions only, use permissions
+            of existing file or default permissions instead
+        """
+        if os.path.isfile(filepath):
+            os.chmod(f_tmp,os.stat(filepath).st_mode & 0o7777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(f_tmp,0o666 & ~umask)
 
     @staticmethod
     def read_txt_file(filepath,encoding='utf-8',comment_marker="# ",skip_blank_lines=True,strip_lines=True,with_line_nums:bool=False)->list:
-        """ reads data as lines from file, optionally as dict with line numbers
+        """ reads data as lines from file (optionally compressed), optionally as dict with line numbers
         """
         if with_line_nums:
             lines = {}
@@ -315,7 +476,7 @@ class Persistence():
             lines = []
         bom_check = False
         try:
-            with open(filepath,encoding=encoding,errors='backslashreplace') as fp:
+            with Persistence.open_file(filepath,encoding=encoding,errors='backslashreplace') as fp:
                 for n,line in enumerate(fp):
                     if not bom_check:
                         bom_check = True
@@ -337,10 +498,10 @@ class Persistence():
         return lines
 
     @staticmethod
-    def save_txt_file(filepath,data:str,encoding='utf-8')->None:
-        """ saves string to file  """
+    def save_txt_file(filepath,data:str,encoding='utf-8',atomic:bool=True)->None:
+        """ saves string to file (optionally atomic / compressed by suffix, see open_save_file) """
         try:
-            with open(filepath,encoding=encoding,mode="+wt") as fp:
+            with Persistence.open_save_file(filepath,encoding=encoding,atomic=atomic) as fp:
                 fp.write(data)
         except:
             logger.error(f"Exception writing file {filepath}",exc_info=True)
@@ -348,14 +509,14 @@ class Persistence():
 
     @staticmethod
     def read_json(filepath:str)->dict:
-        """ Reads JSON file"""
+        """ Reads JSON file (optionally compressed, see open_file)"""
         data = None
 
         if not os.path.isfile(filepath):
             logger.warning(f"File path {filepath} does not exist. Exiting...")
             return None
         try:
-            with open(filepath,encoding='utf-8') as json_file:
+            with Persistence.open_file(filepath,encoding='utf-8') as json_file:
                 data = json.load(json_file)
         except:
             logger.error(f"Error opening {filepath} ****",exc_info=True)
@@ -363,18 +524,33 @@ class Persistence():
         return data
 
     @staticmethod
-    def save_json(filepath,data:dict)->None:
-        """ Saves dictionary data as UTF8 json """
+    def save_json(filepath,data:dict,indent:int=4,use_orjson:bool=False,atomic:bool=True)->None:
+        """ Saves dictionary data as UTF8 json (optionally atomic / compressed by suffix, see open_save_file)
+            use_orjson: use orjson if installed (much faster, indent 2 or none only),
+            otherwise data is streamed by the json module
+        """
         # TODO encode date time see
         # https://stackoverflow.com/questions/11875770/how-to-overcome-datetime-datetime-not-json-serializable
-
-        with open(filepath, 'w', encoding='utf-8') as json_file:
+        orjson = None
+        if use_orjson:
             try:
-                json.dump(data, json_file, indent=4,ensure_ascii=False)
-            except:
-                logger.error("Exception writing file {filepath}",exc_info=True)
+                import orjson
+            except ImportError:
+                logger.warning("orjson is not installed, using json module")
 
-            return None
+        try:
+            if orjson is not None:
+                option = orjson.OPT_INDENT_2 if indent else 0
+                data_bytes = orjson.dumps(data,option=option|orjson.OPT_NON_STR_KEYS)
+                with Persistence.open_save_file(filepath,mode="wb",atomic=atomic) as json_file:
+                    json_file.write(data_bytes)
+            else:
+                with Persistence.open_save_file(filepath,encoding='utf-8',atomic=atomic) as json_file:
+                    json.dump(data, json_file, indent=indent,ensure_ascii=False)
+        except:
+            logger.error(f"Exception writing file {filepath}",exc_info=True)
+
+        return None
 
     def read(self,line_key:str=None):
         """ read file, depending on file extension
@@ -386,10 +562,12 @@ class Persistence():
         out = None
         p = Path(self._f_read)
         suffix = p.suffix[1:].lower()
-        if suffix in ["txt","plantuml","csv"]:
+        if suffix == "csv":
+            # utf-8-sig skips BOM
+            with Persistence.open_file(self._f_read,encoding="utf-8-sig",newline="") as fp:
+                out = self._csv2dict(fp)
+        elif suffix in ["txt","plantuml"]:
             out = Persistence.read_txt_file(self._f_read)
-            if suffix == "csv":
-                out = self._csv2dict(out)
         # elif suffix == "yaml":
         #     out = PersistenceHelper.read_yaml(self._f_read,line_key)
         elif suffix == "json":
@@ -434,19 +612,26 @@ class Persistence():
         return f_save
 
     @staticmethod
-    def save_list(f_save:str,data:list)->str:
-        """ save data in a list as string data, returns saved file name """
-        data = None
-        if not f_save or not isinstance(data,list):
+    def save_list(f_save:str,data,atomic:bool=True)->str:
+        """ save data in a list (or any iterable) as string lines, lines are streamed
+            into the file (optionally atomic / compressed by suffix), returns saved file name
+        """
+        if not f_save or isinstance(data,(str,dict)) or not hasattr(data,"__iter__"):
             logger.error(f"Can't Save file {f_save}")
             return
         try:
-            data = "\n".join(data)
+            with Persistence.open_save_file(f_save,atomic=atomic) as fp:
+                for i,line in enumerate(data):
+                    if i > 0:
+                        fp.write("\n")
+                    fp.write(line)
         except TypeError:
             logger.error(f"Data to save to {f_save} is not a list of strings")
-        Persistence.save_txt_file(f_save,data)            
+            return
+        except:
+            logger.error(f"Exception writing file {f_save}",exc_info=True)
+            return
         return f_save
-        
 
     # make it static
     # def save(self,data,f_save:str=None)->str:
@@ -13,6 +13,9 @@ from tools.util.tree import Tree
 
 logger = logging.getLogger(__name__)
 
+# id of root node in DictParser hierarchy
+ROOT = "ROOT"
+
 class Filter(Enum):
     """ filter values """
     OBJECT  = "filter_object"
@@ -66,6 +69,8 @@ class DictFilter():
         self._allowed_filters = Filter.get_values()
         self._allowed_dict_props = DictProps.get_values()
         self._filters = []
+        # compiled filters, see compile()
+        self._compiled_filters = None
 
     def add_filter(self,filter_value,**kwargs):
         """ adding filters with generic interface
@@ -100,6 +105,7 @@ class DictFilter():
         filter_object = filter_dict[Filter.OBJECT].value.replace("filter_","")
         logger.debug(f"Adding Filter for [{filter_object}][{filter_type}]:({filter_value}), [{len(filter_dict)-3}] additional params")
         self._filters.append(filter_dict)
+        self._compiled_filters = None
 
     def add_value_filter(self,filter_value,**kwargs):
         """ convenience method for value filter, simply filter for any values """
@@ -114,6 +120,7 @@ class DictFilter():
         """ removes all filters """
         logger.debug(f"Clear [{len(self._filters)}] Object Filters")
         self._filters = []
+        self._compiled_filters = None
 
     def _filter_level(self,level,object_filter:dict)->bool:
         """ filter by level """
@@ -191,21 +198,122 @@ class DictFilter():
         logger.debug(f"Filter {info_dict}, filters_passed: {filters_passed}")
         return all(filters_passed)
 
+    def compile(self)->list:
+        """ compiles the filters into a list of tuples
+            (dict property, filter type, filter value or compiled regex, level min, level max)
+            level filters are merged into one range (None if not set)
+        """
+        self._compiled_filters = []
+        for object_filter in self._filters:
+            filter_object = object_filter.get(Filter.OBJECT)
+            if filter_object == Filter.KEY:
+                dict_prop = DictProps.KEY.value
+            elif filter_object == Filter.VALUE or filter_object == Filter.OBJECT:
+                dict_prop = DictProps.OBJECT.value
+            else:
+                logger.warning(f"Filter {object_filter} has no valid Filter Object")
+                continue
+
+            filter_type = object_filter.get(Filter.TYPE)
+            filter_value = object_filter.get(Filter.VALUE)
+            if filter_type == Filter.REGEX:
+                filter_value = re.compile(filter_value)
+            elif not filter_type in [Filter.CONTAINS,Filter.EQUAL]:
+                logger.warning(f"Filter {object_filter} has no valid Filter Type")
+                continue
+
+            level_mins = []
+            level_maxs = []
+            if object_filter.get(Filter.LEVEL_MIN):
+                level_mins.append(object_filter[Filter.LEVEL_MIN])
+            if object_filter.get(Filter.LEVEL_MAX):
+                level_maxs.append(object_filter[Filter.LEVEL_MAX])
+            level_range = object_filter.get(Filter.LEVEL_RANGE)
+            if level_range:
+                level_mins.append(level_range[0])
+                level_maxs.append(level_range[1])
+            level_min = max(level_mins) if level_mins else None
+            level_max = min(level_maxs) if level_maxs else None
+
+            self._compiled_filters.append((dict_prop,filter_type,filter_value,level_min,level_max))
+
+        logger.debug(f"Compiled [{len(self._compiled_filters)}] Object Filters")
+        return self._compiled_filters
+
+    def filter_compiled(self,info_dict:dict)->bool:
+        """ filter dict using the compiled filters (compiled on first use), same result as
+            filter for string objects, objects of other type don't pass CONTAINS / REGEX
+            filters. Level ranges are checked before the object
+        """
+        if not any([p in info_dict for p in self._allowed_dict_props]):
+            logger.warning(f"passed dict has no proper keys ({list(info_dict.keys())})")
+            return
+        if self._compiled_filters is None:
+            self.compile()
+        level = info_dict.get(DictProps.LEVEL.value)
+        for dict_prop,filter_type,filter_value,level_min,level_max in self._compiled_filters:
+            filtered_object = info_dict.get(dict_prop)
+            if not filtered_object:
+                continue
+            if level:
+                if level_min is not None and level < level_min:
+                    return False
+                if level_max is not None and level > level_max:
+                    return False
+            if filter_type == Filter.EQUAL:
+                if not filter_value == filtered_object:
+                    return False
+            elif filter_type == Filter.CONTAINS:
+                if not (isinstance(filtered_object,(str,dict,list)) and
+                        filter_value in filtered_object):
+                    return False
+            elif not (isinstance(filtered_object,str) and
+                      filter_value.search(filtered_object) is not None):
+                return False
+        return True
+
+    def filter_nodes(self,hierarchy)->list:
+        """ evaluates the compiled filters over all hierarchy entries of a
+            DictParser (or its hierarchy dict), returns list of matching node ids
+        """
+        if isinstance(hierarchy,DictParser):
+            hierarchy = hierarchy.hierarchy
+        self.compile()
+        filter_compiled = self.filter_compiled
+        node_ids = [node_id for node_id,info_dict in hierarchy.items()
+                    if filter_compiled(info_dict)]
+        logger.debug(f"Filtered [{len(hierarchy)}] nodes, [{len(node_ids)}] passed")
+        return node_ids
+
 class DictParser():
     """ parsing a dict into a tree structure """
 
-    def __init__(self,input_dict:dict) -> None:
-        """ constructor """
+    def __init__(self,input_dict:dict,lazy:bool=False) -> None:
+        """ constructor
+            lazy: the input dict is walked once without copying it, nodes get integer ids
+                  and key lists are computed during the walk. The itemized dict and the
+                  tree are only created when accessed. Note that the hierarchy object of a
+                  list is the original list (and not its itemized dict), so its obj_type is
+                  list instead of dict
+        """
         self._hierarchy = {}
         self._num_nodes = 0
+        self._lazy = lazy
+        self._tree = None
+        if lazy:
+            self._input_dict = input_dict
+            self._dict = None
+            self._parse_dict(input_dict)
+            self._hierarchy[ROOT]={"parent":None,"key":ROOT,"keylist":[],"level":0}
+            return
         self._dict = copy.deepcopy(input_dict)
         # turn lists into dicts
         self._dict = self._itemized_dict(self._dict,None)
         # get the dict index
         self._hierarchy = {}
         self._num_nodes = 0
-        self._dict=self._itemized_dict(self._dict,"ROOT")
-        self._hierarchy["ROOT"]={"parent":None,"key":"ROOT"}
+        self._dict=self._itemized_dict(self._dict,ROOT)
+        self._hierarchy[ROOT]={"parent":None,"key":ROOT}
         # get the tree object
         self._tree = Tree()
         self._tree.create_tree(self._hierarchy,name_field="key")
@@ -215,13 +323,60 @@ class DictParser():
     @property
     def itemized_dict(self):
         """ itemized dict """
+        if self._dict is None:
+            self._dict = DictParser.get_itemized(self._input_dict)
         return self._dict
 
     @property
     def tree(self):
         """ tree object """
+        if self._tree is None:
+            self._tree = Tree()
+            self._tree.create_tree(self._hierarchy,name_field="key")
         return self._tree
 
+    @property
+    def hierarchy(self):
+        """ hierarchy dict: node id and node info (DictProps) """
+        return self._hierarchy
+
+    @staticmethod
+    def get_items(obj):
+        """ returns key value pairs of dict or list (list index is key as in itemized dict) """
+        if isinstance(obj,dict):
+            return obj.items()
+        return (("(L)"+str(i),item) for i,item in enumerate(obj))
+
+    @staticmethod
+    def get_itemized(obj):
+        """ returns itemized copy of containers, lists are turned into dicts,
+            other values are not copied
+        """
+        if isinstance(obj,(dict,list)):
+            return {k:DictParser.get_itemized(v) for k,v in DictParser.get_items(obj)}
+        return obj
+
+    def _parse_dict(self,d:dict):
+        """ walks through the dict once in the order of the itemized dict (without
+            recursion), nodes get an integer id, key lists are derived from parent
+        """
+        stack=[(iter(DictParser.get_items(d)),ROOT,[])]
+        while stack:
+            items,parent_id,parent_keylist=stack[-1]
+            for k,v in items:
+                self._num_nodes += 1
+                obj_id = self._num_nodes
+                keylist = [*parent_keylist,k]
+                self._hierarchy[obj_id]={"parent":parent_id,"key":k,"object":v,
+                                         "obj_type":type(v).__name__,"id":obj_id,
+                                         "keylist":keylist,"level":len(keylist)}
+                if isinstance(v,(dict,list)):
+                    stack.append((iter(DictParser.get_items(v)),obj_id,keylist))
+                    break
+            else:
+                stack.pop()
+        logger.debug(f"Parsed dict, {self._num_nodes} nodes")
+
     @staticmethod
     def get_hash(s: str):
         """ calculate hash """
@@ -3,6 +3,7 @@
 import logging
 import sys
 import json
+from array import array
 import yaml
 logger = logging.getLogger(__name__)
 
@@ -24,6 +25,17 @@ class Tree():
         self._name_field=Tree.NAME
         self._parent_field=Tree.PARENT
         self._max_level=0
+        # array representation (see _get_hierarchy)
+        self._node_ids=[]
+        self._node_index={}
+        self._parents=None
+        self._children_offset=None
+        self._children=None
+        self._depth=None
+        self._tin=None
+        self._tout=None
+        self._preorder=None
+        self._leaves=[]
 
     @property
     def hierarchy(self):
@@ -73,138 +85,182 @@ class Tree():
         return self._nodes_dict
 
     def _get_hierarchy(self):
-        """ creates children hierarchy """
+        """ creates children hierarchy. Nodes are mapped to integer indices and the
+            relations are kept in arrays: parent index, children in CSR format
+            (children of node i: _children[_children_offset[i]:_children_offset[i+1]]),
+            depth and preorder (euler tour) intervals (node j is a descendant of node i
+            if _tin[i] < _tin[j] < _tout[i])
+        """
         logger.debug("Tree Get Node Hierarchy")
 
-        all_nodes=[]
-
-        def get_children_recursive(nodes):
-            """ build up hierarchy """
-            logger.debug(f"get children for nodes {nodes}")
-            children=[]
-            if len(nodes)>0:
-                for parent_node in nodes:
-                    for node_id,parent_id in parent_dict.items():
-                        if parent_id == parent_node:
-                            children.append(node_id)
-                for children_id in children:
-                    parent_dict.pop(children_id)
-                if children:
-                    all_nodes.append(children)
-                    get_children_recursive(children)
+        node_ids = list(self._nodes_dict.keys())
+        num_nodes = len(node_ids)
+        self._node_ids = node_ids
+        self._node_index = {node_id:i for i,node_id in enumerate(node_ids)}
+
+        # parent array, number of children
+        parents = array("l",[-1]*num_nodes)
+        roots = []
+        num_children = [0]*(num_nodes+1)
+        for i,node_id in enumerate(node_ids):
+            parent_id = self._nodes_dict[node_id].get(self._parent_field)
+            parent_index = self._node_index.get(parent_id,-1) if parent_id else -1
+            if parent_id and parent_index == -1:
+                logger.warning(f"Parent {parent_id} of node {node_id} not found, node is treated as root")
+            parents[i] = parent_index
+            if parent_index == -1:
+                roots.append(i)
             else:
-                return
-
-        parent_dict={}
-        # get a simple dictionary with node ids and parent
-        root_node=[]
+                num_children[parent_index+1] += 1
+
+        # children adjacency in CSR format, keeps the order of the nodes dict
+        children_offset = array("l",num_children)
+        for i in range(num_nodes):
+            children_offset[i+1] += children_offset[i]
+        children = array("l",[0]*children_offset[num_nodes])
+        fill_position = list(children_offset[:-1])
+        for i in range(num_nodes):
+            parent_index = parents[i]
+            if parent_index >= 0:
+                children[fill_position[parent_index]] = i
+                fill_position[parent_index] += 1
+
+        # depth and preorder (iterative depth first search)
+        depth = array("l",[-1]*num_nodes)
+        tin = array("l",[-1]*num_nodes)
+        preorder = array("l")
+        for root in roots:
+            depth[root] = 0
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                tin[node] = len(preorder)
+                preorder.append(node)
+                node_children = children[children_offset[node]:children_offset[node+1]]
+                for child in reversed(node_children):
+                    depth[child] = depth[node]+1
+                    stack.append(child)
+
+        # subtree sizes in reversed preorder determine end of euler interval
+        subtree_size = [1]*num_nodes
+        for node in reversed(preorder):
+            if parents[node] >= 0:
+                subtree_size[parents[node]] += subtree_size[node]
+        tout = array("l",[tin[i]+subtree_size[i] for i in range(num_nodes)])
+
+        self._parents = parents
+        self._children_offset = children_offset
+        self._children = children
+        self._depth = depth
+        self._tin = tin
+        self._tout = tout
+        self._preorder = preorder
+        self._max_level = max(depth)+1 if num_nodes else 0
+        self._leaves = [node_ids[i] for i in range(num_nodes)
+                        if children_offset[i] == children_offset[i+1]]
+
+        # hierarchy dictionary
         hierarchy_nodes_dict={}
-        for node_id, node_dict in self._nodes_dict.items():
-            if node_dict.get(self._parent_field):
-                parent_dict[node_id]=node_dict.get(self._parent_field)
-            else:
-                parent_dict[node_id]=None
-                root_node.append(node_id)
-                all_nodes.append(root_node)
+        for i,node_id in enumerate(node_ids):
+            node_dict = self._nodes_dict[node_id]
             hier_node_dict={}
-            hier_node_dict[self._parent_field]=parent_dict[node_id]
+            hier_node_dict[self._parent_field]=node_ids[parents[i]] if parents[i] >= 0 else None
             hier_node_dict[self._name_field]=node_dict.get(self._name_field)
-            hier_node_dict[Tree.CHILDREN]=[]
+            hier_node_dict[Tree.CHILDREN]=self._get_children_ids(i)
+            if depth[i] >= 0:
+                hier_node_dict[Tree.LEVEL]=depth[i]
             hierarchy_nodes_dict[node_id]=hier_node_dict
 
-        # create layered relations
-        get_children_recursive(root_node)
-        # determine level
-        level=0
-        for nodes in all_nodes:
-            for node in nodes:
-                hierarchy_nodes_dict[node][Tree.LEVEL]=level
-            level+=1
-        self._max_level=level
-
-        # get children
-        for node,hierarchy_node_dict in hierarchy_nodes_dict.items():
-            parent = hierarchy_node_dict.get(self._parent_field)
-            if parent:
-                hierarchy_nodes_dict[parent][Tree.CHILDREN].append(node)
-
         return hierarchy_nodes_dict
 
+    def _get_children_indices(self,index:int):
+        """ direct children indices of node with given index """
+        return self._children[self._children_offset[index]:self._children_offset[index+1]]
+
+    def _get_children_ids(self,index:int)->list:
+        """ direct children node ids of node with given index """
+        return [self._node_ids[i] for i in self._get_children_indices(index)]
+
+    def _is_leaf(self,index:int)->bool:
+        """ checks if node with given index is leaf """
+        return self._children_offset[index] == self._children_offset[index+1]
+
     def get_children(self,node_id,only_leaves=False)->list:
         """ gets children nodes as list (option to select only leaves) """
         logger.debug("Get Children Nodes")
-        children_nodes = []
-        parent_node=self._hierarchy_nodes_dict.get(node_id)
+        index=self._node_index.get(node_id)
 
-        if not parent_node:
+        if index is None:
             logger.warning(f"Parent node with node id {node_id} was not found")
             return
 
+        # level by level traversal
+        children_indices = []
+        level_indices = list(self._get_children_indices(index))
+        while level_indices:
+            children_indices.extend(level_indices)
+            next_level_indices = []
+            for child in level_indices:
+                next_level_indices.extend(self._get_children_indices(child))
+            level_indices = next_level_indices
 
-        def get_children_recursive(child_list):
-            logger.debug(f"get children recursive {child_list}")
-            new_children=[]
-            if len(child_list) > 0:
-                for child in child_list:
-                    children_nodes.append(child)
-                    new_children.extend(self._hierarchy_nodes_dict.get(child)[Tree.CHILDREN])
-                get_children_recursive(new_children)
-            else:
-                return
+        if only_leaves:
+            children_indices=[i for i in children_indices if self._is_leaf(i)]
 
-        parent_children=parent_node[Tree.CHILDREN]
-        get_children_recursive(parent_children)
+        return [self._node_ids[i] for i in children_indices]
 
-        if only_leaves:
-            leaves=[]
-            for child in children_nodes:
-                child_info = self._hierarchy_nodes_dict.get(child)
-                if not child_info.get(Tree.CHILDREN):
-                    leaves.append(child)
-            children_nodes=leaves
+    def get_num_children(self,node_id)->int:
+        """ number of all children nodes (from euler interval) """
+        index=self._node_index.get(node_id)
+        if index is None:
+            logger.warning(f"Node with ID {node_id} not found")
+            return
+        return self._tout[index]-self._tin[index]-1
+
+    def get_level(self,node_id)->int:
+        """ returns level of node (root has level 0) """
+        index=self._node_index.get(node_id)
+        if index is None:
+            logger.warning(f"Node with ID {node_id} not found")
+            return
+        return self._depth[index]
 
-        return children_nodes
+    def is_predecessor(self,node_id,child_id)->bool:
+        """ checks whether node is a predecessor of child node (from euler interval) """
+        index=self._node_index.get(node_id)
+        child_index=self._node_index.get(child_id)
+        if index is None or child_index is None:
+            return False
+        return self._tin[index] < self._tin[child_index] < self._tout[index]
 
     def get_predecessors(self,node_id)->list:
         """ gets the parent nodes in a list """
         parents=[]
-        current_node=self._hierarchy_nodes_dict.get(node_id)
-        while current_node is not None:
-            parent_id=current_node[self._parent_field]
-            if parent_id:
-                current_node=self._hierarchy_nodes_dict.get(parent_id)
-                parents.append(parent_id)
-            else:
-                current_node=None
+        index=self._node_index.get(node_id)
+        if index is None:
+            return parents
+        parent_index=self._parents[index]
+        while parent_index >= 0:
+            parents.append(self._node_ids[parent_index])
+            parent_index=self._parents[parent_index]
 
         return parents
 
     def get_siblings(self,node_id,only_leaves=True)->list:
         """ gets the list of siblings and only leaves """
-
-        def is_leaf(node_id):
-            """ checks if node is leaf """
-            node_info=self._hierarchy_nodes_dict.get(node_id)
-            if not node_info.get(Tree.CHILDREN):
-                return True
-            else:
-                return False
-
         siblings=[]
-        current_node=self._hierarchy_nodes_dict.get(node_id)
-        if not current_node:
+        index=self._node_index.get(node_id)
+        if index is None:
             logger.warning(f"Node with ID {node_id} not found")
             return
-        parent_id=current_node.get(self._parent_field)
-        if parent_id:
-            parent_node=self._hierarchy_nodes_dict.get(parent_id)
-            siblings=parent_node.get(Tree.CHILDREN)
-            siblings=[elem for elem in siblings if not elem==node_id]
+        parent_index=self._parents[index]
+        if parent_index >= 0:
+            siblings=[i for i in self._get_children_indices(parent_index) if not i==index]
 
         if only_leaves:
-            siblings=[elem for elem in siblings if is_leaf(elem)]
+            siblings=[i for i in siblings if self._is_leaf(i)]
 
-        return siblings
+        return [self._node_ids[i] for i in siblings]
 
     def get_key_path(self,node_id):
         """ returns the keys list required to navigate to the element """
@@ -223,12 +279,7 @@ class Tree():
 
     def get_leaves(self)->list:
         """ returns the leaves of the tree """
-        leaves=[]
-        for node,node_info in self._hierarchy_nodes_dict.items():
-            if node_info.get(Tree.CHILDREN):
-                continue
-            leaves.append(node)
-        return leaves
+        return list(self._leaves)
 
     def get_leaf_siblings(self)->dict:
         """ gets sibling leaves alongside with parent node path """
@@ -74,15 +74,19 @@ def get_regex(misplaced_letter_list=[],fixed_letters="",missing_letters=""):
 
     return re.compile(regex_var_s + regex_missing_s + regex_misplaced_letters_s + regex_fix_s)
 
-f = r"<Path To>\FiveLetterWords.txt"
-words = read_file(f)
-# patterns need to be 5 characters with '*' serving as place holder
-# pattern string containing letter in correct order
-fixed_letters = "*o***"
-# pattern strings containing the correct letters in wrong order
-misplaced_letter_patterns = ["****s","**as*"]
-# letters not contained in final word
-missing_letters = "enibt"
-regex = get_regex(misplaced_letter_patterns,fixed_letters,missing_letters)
-print("REGEX:",regex.pattern,"\n")
-print([word for word in words if regex.match(word)])
+if __name__ == "__main__":
+    from tools.wordle_solver import WordIndex
+    f = r"<Path To>\FiveLetterWords.txt"
+    # word list is read once into a bitset index
+    word_index = WordIndex.from_file(f)
+    # patterns need to be 5 characters with '*' serving as place holder
+    # pattern string containing letter in correct order
+    fixed_letters = "*o***"
+    # pattern strings containing the correct letters in wrong order
+    misplaced_letter_patterns = ["****s","**as*"]
+    # letters not contained in final word
+    missing_letters = "enibt"
+    mask = word_index.query_mask(misplaced_letter_patterns,fixed_letters,missing_letters)
+    print([word_index.words[i] for i in word_index.mask2indices(mask)])
+    # best next guesses (information gain in bits)
+    print("GUESSES:",word_index.rank_guesses(mask,num=10))
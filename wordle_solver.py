@@ -0,0 +1,213 @@
+""" wordle solver: word list is loaded once into a bitset index (position x letter masks and
+    letter count vectors), constraint queries are answered with vectorized bitwise operations
+    and guesses are ranked by information gain over the remaining candidates
+"""
+
+import traceback
+import numpy as np
+
+WORD_LENGTH = 5
+# placeholder in patterns
+ANY_LETTER = "*"
+# number of feedback patterns (each position: 0 missing, 1 misplaced, 2 fixed)
+NUM_PATTERNS = 3**WORD_LENGTH
+# number of (guess,answer) pairs scored at once
+CHUNK_SIZE = 256*1024
+
+def read_words(f:str)->list:
+    """ reading UTF8 txt File with one word per line, only words of WORD_LENGTH are kept """
+    words = []
+    try:
+        with open(f,encoding="utf-8") as fp:
+            for line in fp:
+                word = line.strip().lower()
+                if len(word) == WORD_LENGTH and word.isalpha():
+                    words.append(word)
+    except:
+        print(f"Exception reading file {f}")
+        print(traceback.format_exc())
+    return sorted(set(words))
+
+def pattern2str(pattern:int)->str:
+    """ feedback pattern as string (f: fixed, m: misplaced, -: missing) """
+    out = ""
+    for _ in range(WORD_LENGTH):
+        out += "-mf"[pattern%3]
+        pattern //= 3
+    return out
+
+def get_pattern(guess:str,answer:str)->int:
+    """ feedback pattern of a single guess """
+    pattern = 0
+    left = [a for g,a in zip(guess,answer) if g != a]
+    for p,(g,a) in enumerate(zip(guess,answer)):
+        if g == a:
+            pattern += 2*3**p
+        elif g in left:
+            left.remove(g)
+            pattern += 3**p
+    return pattern
+
+class WordIndex():
+    """ bitset index of a word list
+        masks[position,letter]: packed bitset of words having letter at position
+        counts[word,letter]: number of occurences of letter in word
+    """
+
+    def __init__(self,words:list) -> None:
+        self.words = sorted(set([w.lower() for w in words if len(w) == WORD_LENGTH and w.isalpha()]))
+        self.letters = sorted(set("".join(self.words)))
+        self._letter_index = {l:i for i,l in enumerate(self.letters)}
+        num_words = len(self.words)
+        # letter codes of each word
+        self.codes = np.array([[self._letter_index[l] for l in w] for w in self.words],
+                              dtype=np.uint8).reshape(num_words,WORD_LENGTH)
+        num_letters = len(self.letters)
+        self.counts = np.zeros((num_words,num_letters),dtype=np.uint8)
+        for p in range(WORD_LENGTH):
+            np.add.at(self.counts,(np.arange(num_words),self.codes[:,p]),1)
+        position_letter = self.codes[None,:,:].T == np.arange(num_letters)[None,None,:]
+        # shape (WORD_LENGTH,num_letters,bytes)
+        self.masks = np.packbits(position_letter.transpose(0,2,1),axis=-1)
+        self._all = np.packbits(np.ones(num_words,dtype=bool))
+
+    @staticmethod
+    def from_file(f:str):
+        """ index of words from text file """
+        return WordIndex(read_words(f))
+
+    def __len__(self):
+        return len(self.words)
+
+    def _count_mask(self,letter:str,min_count:int=1,max_count:int=None)->np.ndarray:
+        """ packed bitset of words containing letter min_count to max_count times """
+        li = self._letter_index.get(letter)
+        if li is None:
+            counts = np.zeros(len(self.words),dtype=np.uint8)
+        else:
+            counts = self.counts[:,li]
+        selected = counts >= min_count
+        if max_count is not None:
+            selected &= counts <= max_count
+        return np.packbits(selected)
+
+    def _position_mask(self,position:int,letter:str)->np.ndarray:
+        """ packed bitset of words having letter at position """
+        li = self._letter_index.get(letter)
+        if li is None:
+            return np.zeros_like(self._all)
+        return self.masks[position,li]
+
+    def query_mask(self,misplaced_letter_list:list=None,fixed_letters:str="",missing_letters:str="")->np.ndarray:
+        """ packed bitset of words matching the constraints
+            fixed_letters: pattern string containing letters in correct position, eg "*o***"
+            misplaced_letter_list: pattern strings containing letters in wrong position, eg ["****s","**as*"]
+            missing_letters: letters not contained in final word, if a missing letter is also
+            fixed or misplaced, its number of occurences is limited to the known ones
+            (fixed plus misplaced letters of a guess, patterns may stem from different guesses)
+        """
+        misplaced_letter_list = misplaced_letter_list or []
+        fixed_letters = fixed_letters or WORD_LENGTH*ANY_LETTER
+        mask = self._all.copy()
+        # min and max number of occurences of each known letter: a fixed letter of one guess
+        # may be the misplaced letter of another, so fixed and misplaced counts can't be added
+        # for the min, but a guess containing a missing letter shows all of its occurences
+        fixed_counts = {l:fixed_letters.count(l) for l in set(fixed_letters.replace(ANY_LETTER,""))}
+        min_counts = dict(fixed_counts)
+        max_misplaced = {}
+        for pattern in misplaced_letter_list:
+            for letter in set(pattern.replace(ANY_LETTER,"")):
+                min_counts[letter] = max(min_counts.get(letter,0),pattern.count(letter))
+                max_misplaced[letter] = max(max_misplaced.get(letter,0),pattern.count(letter))
+        for p,letter in enumerate(fixed_letters[:WORD_LENGTH]):
+            if letter != ANY_LETTER:
+                mask &= self._position_mask(p,letter)
+        for pattern in misplaced_letter_list:
+            for p,letter in enumerate(pattern[:WORD_LENGTH]):
+                if letter != ANY_LETTER:
+                    mask &= ~self._position_mask(p,letter)
+        for letter in set(missing_letters)|set(min_counts.keys()):
+            min_count = min_counts.get(letter,0)
+            max_count = None
+            if letter in missing_letters:
+                max_count = fixed_counts.get(letter,0)+max_misplaced.get(letter,0)
+            mask &= self._count_mask(letter,min_count,max_count)
+        return mask
+
+    def query(self,misplaced_letter_list:list=None,fixed_letters:str="",missing_letters:str="")->list:
+        """ words matching the constraints (see query_mask) """
+        return [self.words[i] for i in self.mask2indices(
+                self.query_mask(misplaced_letter_list,fixed_letters,missing_letters))]
+
+    def mask2indices(self,mask:np.ndarray)->np.ndarray:
+        """ word indices of packed bitset """
+        return np.flatnonzero(np.unpackbits(mask,count=len(self.words)))
+
+    def get_patterns(self,guess_indices:np.ndarray,answer_indices:np.ndarray)->np.ndarray:
+        """ feedback patterns (0..NUM_PATTERNS-1) of all guesses against all answers,
+            shape (guesses,answers), repeated letters are scored as in wordle
+            (misplaced only as often as they are left in the answer)
+        """
+        guesses = self.codes[guess_indices]
+        answers = self.codes[answer_indices]
+        # occurences of each letter in each answer, shape (letters,answers)
+        counts = self.counts[answer_indices].T.astype(np.int8)
+        contains = (counts > 0).astype(np.uint8)
+        patterns = np.zeros((len(guesses),len(answers)),dtype=np.uint8)
+        for p in range(WORD_LENGTH):
+            letters = guesses[:,p]
+            fixed = letters[:,None] == answers[None,:,p]
+            # letter only once in guess: misplaced if answer contains it (2: fixed 1: misplaced 0: missing)
+            value = contains[letters]
+            value += fixed
+            # repeated letter in guess: misplaced only as often as left in the answer
+            same = guesses == letters[:,None]
+            same[:,p] = False
+            rows = np.flatnonzero(same.any(axis=1))
+            if len(rows) > 0:
+                available = counts[letters[rows]]
+                for q in range(WORD_LENGTH):
+                    if q < p:
+                        # earlier occurences are scored first
+                        available -= same[rows,q][:,None]
+                    elif q > p:
+                        # later fixed occurences
+                        available -= same[rows,q][:,None] & (guesses[rows,q][:,None] == answers[None,:,q])
+                value[rows] = 2*fixed[rows]+(~fixed[rows] & (available > 0))
+            value *= 3**p
+            patterns += value
+        return patterns
+
+    def get_entropies(self,guess_indices:np.ndarray=None,answer_indices:np.ndarray=None)->np.ndarray:
+        """ information gain (bits) of each guess over the remaining answers """
+        if guess_indices is None:
+            guess_indices = np.arange(len(self.words))
+        if answer_indices is None:
+            answer_indices = np.arange(len(self.words))
+        num_answers = len(answer_indices)
+        entropies = np.zeros(len(guess_indices))
+        if num_answers == 0:
+            return entropies
+        chunk = max(1,CHUNK_SIZE//num_answers)
+        for start in range(0,len(guess_indices),chunk):
+            indices = guess_indices[start:start+chunk]
+            patterns = self.get_patterns(indices,answer_indices).astype(np.int64)
+            patterns += (np.arange(len(indices))*NUM_PATTERNS)[:,None]
+            histogram = np.bincount(patterns.ravel(),minlength=len(indices)*NUM_PATTERNS)
+            p = histogram.reshape(len(indices),NUM_PATTERNS)/num_answers
+            with np.errstate(divide="ignore",invalid="ignore"):
+                entropies[start:start+chunk] = -np.nansum(p*np.log2(p),axis=1)
+        return entropies
+
+    def rank_guesses(self,mask:np.ndarray=None,num:int=10,candidates_only:bool=False)->list:
+        """ best guesses (word,information gain in bits) for the remaining candidates,
+            on equal gain candidates are preferred
+        """
+        answer_indices = self.mask2indices(self._all if mask is None else mask)
+        if len(answer_indices) <= 2:
+            return [(self.words[i],0.0) for i in answer_indices]
+        guess_indices = answer_indices if candidates_only else np.arange(len(self.words))
+        entropies = self.get_entropies(guess_indices,answer_indices)
+        is_candidate = np.isin(guess_indices,answer_indices)
+        order = np.lexsort((~is_candidate,-entropies))[:num]
+        return [(self.words[guess_indices[i]],float(entropies[i])) for i in order]